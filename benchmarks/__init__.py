@@ -0,0 +1,2 @@
+# benchmarks/__init__.py
+# 性能基准脚本，使用 python -m benchmarks.<name> 运行
\ No newline at end of file
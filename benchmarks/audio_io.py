@@ -0,0 +1,130 @@
+"""
+音频 I/O 抗负载基准：在模拟 LLM 生成的 Python 负载下同时采集和播放，
+对比进程内回调（原方式）与独立音频子进程的溢出/欠载计数。
+
+用法:
+    python -m benchmarks.audio_io [--seconds 20] [--threads 2] [--buffer 0.2] [--mode both]
+"""
+import argparse
+import math
+import threading
+import time
+
+import numpy as np
+
+from src.core.audio_process import AudioIOProcess, AudioIOSettings
+from src.core.ring_buffer import AudioRingBuffer
+
+SAMPLE_RATE = 16000
+OUTPUT_RATE = 24000
+CHUNK = 1600
+
+
+def python_load(stop: threading.Event) -> None:
+    """纯 Python 循环：和 generate 里逐 token 的 Python 开销一样长时间持有 GIL"""
+    x = 0
+    while not stop.is_set():
+        for i in range(20000):
+            x += i * i
+
+
+def numpy_load(stop: threading.Event) -> None:
+    """矩阵乘法：大部分时间释放 GIL，模拟 torch/ONNX 的计算"""
+    a = np.random.rand(256, 256).astype(np.float32)
+    while not stop.is_set():
+        a = a @ a
+        a /= np.abs(a).max() + 1e-6
+
+
+def feed_playback(ring: AudioRingBuffer, target: float, stop: threading.Event) -> None:
+    """按 TTS 的方式往播放环里写音频，只保持 target 秒的缓冲，负载下容易欠载"""
+    t = np.arange(CHUNK * OUTPUT_RATE // SAMPLE_RATE) / OUTPUT_RATE
+    tone = (0.05 * np.sin(2 * math.pi * 440 * t)).astype(np.float32)
+    while not stop.is_set():
+        if ring.available() < target * OUTPUT_RATE:
+            ring.write(tone)
+        else:
+            time.sleep(0.005)
+    ring.end()
+
+
+def run_in_process(seconds: float, buffer_seconds: float, stop: threading.Event) -> dict:
+    import sounddevice as sd
+
+    counts = {"input_overflows": 0, "output_underflows": 0}
+    capture = AudioRingBuffer(SAMPLE_RATE * 10)
+    playback = AudioRingBuffer(OUTPUT_RATE * 10)
+
+    def on_input(indata, frames, time_info, status):
+        if status.input_overflow:
+            counts["input_overflows"] += 1
+        capture.write(indata[:, 0])
+
+    def on_output(outdata, frames, time_info, status):
+        if status.output_underflow:
+            counts["output_underflows"] += 1
+        playback.read_into(outdata[:, 0])
+
+    block = np.zeros(CHUNK, dtype=np.float32)
+    feeder = threading.Thread(target=feed_playback, args=(playback, buffer_seconds, stop), daemon=True)
+    with sd.InputStream(samplerate=SAMPLE_RATE, channels=1, dtype=np.float32, blocksize=CHUNK, callback=on_input), \
+            sd.OutputStream(samplerate=OUTPUT_RATE, channels=1, dtype=np.float32, blocksize=1024,
+                            latency="low", callback=on_output):
+        feeder.start()
+        deadline = time.time() + seconds
+        while time.time() < deadline:
+            if capture.available() >= CHUNK:
+                capture.read_into(block)
+            else:
+                time.sleep(0.01)
+        stop.set()
+    feeder.join()
+    return {"capture_overruns": capture.overruns, "playback_underruns": playback.underruns, **counts}
+
+
+def run_subprocess(seconds: float, buffer_seconds: float, stop: threading.Event) -> dict:
+    io = AudioIOProcess(AudioIOSettings(sample_rate=SAMPLE_RATE, chunk_seconds=CHUNK / SAMPLE_RATE))
+    io.start()
+    try:
+        io.set_output_rate(OUTPUT_RATE)
+        io.start_capture()
+        block = np.zeros(CHUNK, dtype=np.float32)
+        feeder = threading.Thread(target=feed_playback, args=(io.playback, buffer_seconds, stop), daemon=True)
+        feeder.start()
+        deadline = time.time() + seconds
+        while time.time() < deadline:
+            io.read(block, timeout=0.2)
+        stop.set()
+        feeder.join()
+        return io.stats()
+    finally:
+        io.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="音频 I/O 抗负载基准")
+    parser.add_argument("--seconds", type=float, default=20.0)
+    parser.add_argument("--threads", type=int, default=2, help="纯 Python 负载线程数")
+    parser.add_argument("--numpy-threads", type=int, default=1, help="释放 GIL 的计算负载线程数")
+    parser.add_argument("--buffer", type=float, default=0.2, help="播放环保持的缓冲秒数")
+    parser.add_argument("--mode", choices=["inprocess", "subprocess", "both"], default="both")
+    args = parser.parse_args()
+
+    modes = {"inprocess": run_in_process, "subprocess": run_subprocess}
+    for name in (modes if args.mode == "both" else [args.mode]):
+        stop = threading.Event()
+        loads = [threading.Thread(target=python_load, args=(stop,), daemon=True) for _ in range(args.threads)]
+        loads += [threading.Thread(target=numpy_load, args=(stop,), daemon=True) for _ in range(args.numpy_threads)]
+        for t in loads:
+            t.start()
+        try:
+            stats = modes[name](args.seconds, args.buffer, stop)
+        finally:
+            stop.set()
+            for t in loads:
+                t.join()
+        print(f"{name:>10}: " + ", ".join(f"{k}={v}" for k, v in stats.items()))
+
+
+if __name__ == "__main__":
+    main()
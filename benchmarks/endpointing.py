@@ -0,0 +1,155 @@
+"""
+自适应断句基准：在录好的语音片段（Recorder 保存的 *-speech.wav）上回放 VAD，
+比较固定静音超时与自适应静音超时下每轮从说完话到结束录音的延迟。
+自适应一侧计入部分转写本身的耗时：转写结果出来之前按最长超时等待，所以结束时刻不早于转写完成。
+
+用法:
+    python -m benchmarks.endpointing 录音目录/ [更多 wav ...] [--asr-model sensevoice]
+"""
+import argparse
+import glob
+import math
+import os
+import time
+from typing import Callable, List, Optional, Tuple
+
+import numpy as np
+import soundfile as sf
+
+from src.config.config import Config
+from src.core.endpointing import AdaptiveEndpointer
+from src.core.recorder import create_vad
+from src.core.stt import SpeechToText
+
+CHUNK_DURATION = 0.1  # 与 Recorder.record 的块长一致
+TRAILING_PAD = 2.0    # 文件末尾补的静音，保证两种策略都能触发结束
+
+
+def _collect(paths: List[str]) -> List[str]:
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            files.extend(sorted(glob.glob(os.path.join(path, "*.wav"))))
+        else:
+            files.append(path)
+    return files
+
+
+def speech_flags(vad, audio: np.ndarray, chunk_size: int) -> List[bool]:
+    flags = []
+    for i in range(0, len(audio) - chunk_size + 1, chunk_size):
+        vad.accept_waveform(audio[i:i + chunk_size])
+        flags.append(vad.is_speech_detected())
+        while not vad.empty():
+            vad.pop()
+    vad.reset()
+    return flags
+
+
+def simulate(flags: List[bool], timeout_at: Callable[[int], float]) -> Optional[int]:
+    """按 Recorder 的规则回放：返回结束录音的块下标，timeout_at(i) 给出第 i 块静音开始时的超时"""
+    speech_started = False
+    silence = 0
+    target = 0
+    for i, is_speech in enumerate(flags):
+        if not speech_started:
+            speech_started = is_speech
+            continue
+        if is_speech:
+            silence = 0
+            continue
+        silence += 1
+        if silence == 1:
+            target = math.ceil(timeout_at(i) / CHUNK_DURATION)
+        if silence >= target:
+            return i
+    return None
+
+
+def run_file(path: str, config: Config, stt: SpeechToText, vad) -> Optional[Tuple[float, float, bool, float]]:
+    audio, sr = sf.read(path, dtype="float32")
+    if audio.ndim > 1:
+        audio = audio[:, 0]
+    if sr != config.sample_rate:
+        raise ValueError(f"{path}: 采样率 {sr} 与配置 {config.sample_rate} 不一致")
+    audio = np.concatenate([audio, np.zeros(int(TRAILING_PAD * sr), dtype=np.float32)])
+
+    chunk_size = int(sr * CHUNK_DURATION)
+    flags = speech_flags(vad, audio, chunk_size)
+    if not any(flags):
+        return None
+    last_speech = max(i for i, f in enumerate(flags) if f)
+
+    endpointer = AdaptiveEndpointer(config.endpoint_config())
+    asr_seconds = 0.0
+
+    def adaptive_timeout(i: int) -> float:
+        nonlocal asr_seconds
+        start = time.perf_counter()
+        partial = stt.transcribe(sr, audio[:(i + 1) * chunk_size]).text
+        elapsed = time.perf_counter() - start
+        asr_seconds += elapsed
+        # 与 Recorder 一致：转写完成前按 max_silence 计时，转写慢时新超时要等结果出来才生效
+        cfg = endpointer.config
+        return min(max(endpointer.silence_timeout(partial), elapsed), cfg.max_silence)
+
+    fixed_end = simulate(flags, lambda i: config.silence_duration)
+    adaptive_end = simulate(flags, adaptive_timeout)
+    if fixed_end is None or adaptive_end is None:
+        return None
+
+    cut = adaptive_end < last_speech  # 自适应策略在孩子说完之前就结束了录音
+    return (
+        (fixed_end - last_speech) * CHUNK_DURATION,
+        (adaptive_end - last_speech) * CHUNK_DURATION,
+        cut,
+        asr_seconds,
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="自适应断句延迟基准")
+    parser.add_argument("paths", nargs="+", help="wav 文件或包含 wav 的目录")
+    parser.add_argument("--asr-model", default="sensevoice")
+    parser.add_argument("--vad-model", default="vad_ckpt/silero_vad.onnx")
+    args = parser.parse_args()
+
+    config = Config(asr_model=args.asr_model, vad_model=args.vad_model)
+    stt = SpeechToText(config.asr_model)
+    vad = create_vad(
+        config.vad_model,
+        sample_rate=config.sample_rate,
+        threshold=config.vad_threshold,
+        min_silence_duration=config.vad_min_silence_duration,
+        max_speech_duration=config.max_speech_duration,
+    )
+
+    fixed, adaptive, cuts, asr_cost = [], [], 0, []
+    for path in _collect(args.paths):
+        result = run_file(path, config, stt, vad)
+        if result is None:
+            print(f"{os.path.basename(path)}: 未检测到完整语音，跳过")
+            continue
+        f, a, cut, asr_seconds = result
+        print(f"{os.path.basename(path)}: 固定 {f:.2f}s, 自适应 {a:.2f}s{' (提前截断)' if cut else ''}")
+        cuts += cut
+        asr_cost.append(asr_seconds)
+        if not cut:
+            fixed.append(f)
+            adaptive.append(a)
+
+    turns = len(fixed) + cuts
+    if not turns:
+        print("没有可用的录音")
+        return
+    print("-" * 40)
+    print(f"轮次: {turns}, 提前截断: {cuts} ({cuts / turns:.1%})")
+    if fixed:
+        saved = np.array(fixed) - np.array(adaptive)
+        print(f"尾部延迟 固定: {np.mean(fixed):.3f}s, 自适应: {np.mean(adaptive):.3f}s")
+        print(f"每轮节省: 平均 {saved.mean() * 1000:.0f}ms, 中位数 {np.median(saved) * 1000:.0f}ms")
+    print(f"部分转写耗时: 平均每轮 {np.mean(asr_cost) * 1000:.0f}ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+"""
+低功耗待机基准：在录好的房间音频上对比“每块都跑 Silero VAD”和“能量门控 + VAD”，
+统计每秒音频消耗的 CPU 时间（单核待机 CPU 占用）、VAD 实际运行的块占比和唤醒漏检率。
+
+唤醒词识别（ASR + 关键词匹配）在 VAD 之后，两种方式完全相同，
+因此某个唤醒片段内 VAD 一次都没有报告语音即记为漏检。
+
+标注文件每行一个唤醒片段的起止秒数，例如 `12.3 13.1`。
+
+用法:
+    python -m benchmarks.energy_gate room.wav [more.wav ...] [--labels room.txt] [--margin-db 10]
+"""
+import argparse
+import time
+from typing import List, Tuple
+
+import numpy as np
+import soundfile as sf
+
+from src.core.audio_input import AudioConverter
+from src.core.energy_gate import EnergyGate, EnergyGateConfig
+from src.core.recorder import create_vad
+
+SAMPLE_RATE = 16000
+CHUNK = 1600  # 与 Recorder 相同的 100ms 块
+
+
+def load_labels(path: str) -> List[Tuple[float, float]]:
+    with open(path, encoding="utf-8") as f:
+        return [tuple(map(float, line.split()[:2])) for line in f if line.strip() and not line.startswith("#")]
+
+
+def run(audio: np.ndarray, vad_model: str, gate: EnergyGate = None):
+    """返回 (CPU 秒数, VAD 运行的块数, 检测到语音的块起始时间列表)"""
+    vad = create_vad(vad_model, sample_rate=SAMPLE_RATE)
+    speech_times = []
+    vad_chunks = 0
+    start = time.process_time()
+    for offset in range(0, len(audio) - CHUNK + 1, CHUNK):
+        chunk = audio[offset:offset + CHUNK]
+        if gate is not None:
+            chunk = gate.push(chunk)
+            if chunk is None:
+                continue
+        vad_chunks += 1
+        vad.accept_waveform(chunk)
+        if vad.is_speech_detected():
+            speech_times.append(offset / SAMPLE_RATE)
+        while not vad.empty():
+            vad.pop()
+    return time.process_time() - start, vad_chunks, speech_times
+
+
+def missed(labels: List[Tuple[float, float]], speech_times: List[float]) -> int:
+    times = np.asarray(speech_times)
+    # VAD 本身有约 0.3 秒的确认延迟，片段结束后再留 0.5 秒
+    return sum(1 for begin, end in labels if not np.any((times >= begin - 0.1) & (times <= end + 0.5)))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="能量门控待机基准")
+    parser.add_argument("wavs", nargs="+", help="房间录音")
+    parser.add_argument("--labels", nargs="*", default=[], help="与录音一一对应的唤醒片段标注文件")
+    parser.add_argument("--vad-model", default="vad_ckpt/silero_vad.onnx")
+    parser.add_argument("--margin-db", type=float, default=10.0)
+    parser.add_argument("--lookback", type=float, default=0.5)
+    args = parser.parse_args()
+
+    converter = AudioConverter(SAMPLE_RATE)
+    config = EnergyGateConfig(open_margin_db=args.margin_db, lookback_seconds=args.lookback)
+    totals = {name: [0.0, 0, 0] for name in ("vad", "gate+vad")}  # CPU 秒, 漏检, 运行块数
+    audio_seconds, chunks, wakeups = 0.0, 0, 0
+
+    for i, path in enumerate(args.wavs):
+        data, rate = sf.read(path, dtype="float32")
+        audio = converter.convert(data, rate).copy()
+        labels = load_labels(args.labels[i]) if i < len(args.labels) else []
+        audio_seconds += len(audio) / SAMPLE_RATE
+        chunks += len(audio) // CHUNK
+        wakeups += len(labels)
+
+        for name, gate in (("vad", None), ("gate+vad", EnergyGate(config, SAMPLE_RATE))):
+            cpu, vad_chunks, speech = run(audio, args.vad_model, gate)
+            totals[name][0] += cpu
+            totals[name][1] += missed(labels, speech)
+            totals[name][2] += vad_chunks
+
+    print(f"音频 {audio_seconds:.0f} 秒, {chunks} 块, 唤醒片段 {wakeups} 个")
+    print(f"{'方式':<10}{'CPU %':>8}{'VAD 占比':>10}{'漏检率':>10}")
+    for name, (cpu, miss, vad_chunks) in totals.items():
+        miss_rate = f"{miss / wakeups:.1%}" if wakeups else "-"
+        print(f"{name:<10}{cpu / audio_seconds * 100:>8.2f}{vad_chunks / max(chunks, 1):>10.1%}{miss_rate:>10}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,193 @@
+"""
+唤醒词基准：在标注好的正/负样本目录上并行运行 KeywordSpotter.process_audio，
+报告每个唤醒词的漏检率、从唤醒词结束到触发的延迟，以及负样本上的每小时误唤醒次数。
+每次误唤醒都要走一轮完整的 ASR + LLM，调 boost/threshold 时以这里的数字为准。
+
+目录结构:
+    data/positive/<唤醒短语>/*.wav   含唤醒词的片段，短语与唤醒词文件 @ 后的写法一致
+    data/negative/**/*.wav           不含唤醒词的房间录音、电视、聊天等
+    data/labels.jsonl                可选，{"file": "positive/小柱同学/001.wav", "keyword": "小柱同学", "end": 1.42}
+没有 labels.jsonl 时，唤醒词结束时间取片段里最后一个高于峰值 25 dB 以内的帧。
+
+触发任意一个唤醒词都算命中（柱子/朱子/主子等谐音本来就是同一个唤醒）。
+
+用法:
+    python -m benchmarks.kws data/ [--keywords keywords/keywords.txt] [--threshold 0.25] \\
+        [--kw-threshold 柱子=0.4 ...] [--boost 小柱同学=1.5 ...] [--workers 4] [--write-keywords tuned.txt]
+"""
+import argparse
+import glob
+import json
+import multiprocessing
+import os
+import time
+from collections import Counter, defaultdict
+from dataclasses import dataclass
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+from src.core.audio_input import AudioConverter
+from src.core.energy_gate import frame_features
+from src.core.kws_keywords import load_keywords, with_overrides, write_keywords
+
+SAMPLE_RATE = 16000
+CHUNK = 1600         # 与 Recorder 相同的 100ms 块
+TAIL_SECONDS = 1.0   # 片段末尾补的静音，给模型留出触发时间
+DEFAULT_MODEL = "sherpa/sherpa-onnx-kws-zipformer-wenetspeech-3.3M-2024-01-01"
+
+
+@dataclass
+class Clip:
+    path: str
+    keyword: Optional[str] = None   # None 为负样本
+    end: Optional[float] = None     # 唤醒词结束的秒数
+
+
+def keyword_end(audio: np.ndarray, floor_db: float = 25.0) -> float:
+    frame = SAMPLE_RATE // 50
+    db, _ = frame_features(audio, frame)
+    loud = np.nonzero(db > db.max() - floor_db)[0]
+    return (loud[-1] + 1) * frame / SAMPLE_RATE if len(loud) else len(audio) / SAMPLE_RATE
+
+
+def load_clips(data_dir: str) -> List[Clip]:
+    labels = {}
+    labels_path = os.path.join(data_dir, "labels.jsonl")
+    if os.path.exists(labels_path):
+        with open(labels_path, encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    record = json.loads(line)
+                    labels[os.path.normpath(os.path.join(data_dir, record["file"]))] = record
+    clips = []
+    for path in sorted(glob.glob(os.path.join(data_dir, "positive", "*", "*.wav"))):
+        record = labels.get(os.path.normpath(path), {})
+        keyword = record.get("keyword") or os.path.basename(os.path.dirname(path))
+        clips.append(Clip(path, keyword, record.get("end")))
+    for path in sorted(glob.glob(os.path.join(data_dir, "negative", "**", "*.wav"), recursive=True)):
+        clips.append(Clip(path))
+    return clips
+
+
+def model_file(model_dir: str, prefix: str) -> str:
+    candidates = sorted(glob.glob(os.path.join(model_dir, f"{prefix}*.onnx")))
+    full = [c for c in candidates if ".int8." not in c]
+    if not candidates:
+        raise FileNotFoundError(f"{model_dir} 中没有 {prefix}*.onnx")
+    return (full or candidates)[0]
+
+
+# ---- 工作进程：每个进程一个单线程 KeywordSpotter ----
+
+_worker = {}
+
+
+def _init_worker(model_dir, keywords_file, entries, threshold, score):
+    from src.core.kws import KeywordSpotter
+
+    _worker["kws"] = KeywordSpotter(
+        tokens_path=os.path.join(model_dir, "tokens.txt"),
+        encoder_path=model_file(model_dir, "encoder"),
+        decoder_path=model_file(model_dir, "decoder"),
+        joiner_path=model_file(model_dir, "joiner"),
+        keywords_file=keywords_file,
+        num_threads=1,
+        provider="cpu",
+        keywords_score=score,
+        keywords_threshold=threshold,
+        keywords=entries,
+    )
+    _worker["converter"] = AudioConverter(SAMPLE_RATE)
+
+
+def _run_clip(clip: Clip) -> Tuple[Clip, float, List[Tuple[str, float]], float]:
+    """返回 (clip, 音频秒数, [(触发的短语, 触发时刻秒)], 处理耗时)"""
+    import soundfile as sf
+
+    kws = _worker["kws"]
+    data, rate = sf.read(clip.path, dtype="float32")
+    audio = np.concatenate([_worker["converter"].convert(data, rate), np.zeros(int(TAIL_SECONDS * SAMPLE_RATE), np.float32)])
+    if clip.keyword is not None and clip.end is None:
+        clip.end = keyword_end(audio)
+
+    kws.reset()
+    detections = []
+    start = time.perf_counter()
+    for offset in range(0, len(audio), CHUNK):
+        chunk = audio[offset:offset + CHUNK]
+        result = kws.process_audio(chunk)
+        if result:
+            detections.append((result, (offset + len(chunk)) / SAMPLE_RATE))
+    return clip, len(audio) / SAMPLE_RATE - TAIL_SECONDS, detections, time.perf_counter() - start
+
+
+def parse_overrides(values: List[str]) -> dict:
+    overrides = {}
+    for value in values or []:
+        phrase, _, number = value.rpartition("=")
+        overrides[phrase] = float(number)
+    return overrides
+
+
+def main():
+    parser = argparse.ArgumentParser(description="唤醒词准确率/延迟基准")
+    parser.add_argument("data_dir")
+    parser.add_argument("--model-dir", default=DEFAULT_MODEL)
+    parser.add_argument("--keywords", default="keywords/keywords.txt")
+    parser.add_argument("--threshold", type=float, default=0.25, help="全局 keywords_threshold")
+    parser.add_argument("--score", type=float, default=1.0, help="全局 keywords_score")
+    parser.add_argument("--kw-threshold", action="append", help="单个唤醒词的阈值，如 柱子=0.4，可重复")
+    parser.add_argument("--boost", action="append", help="单个唤醒词的 boost，如 小柱同学=1.5，可重复")
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    parser.add_argument("--write-keywords", default=None, help="把调整后的唤醒词写成文件，可直接部署")
+    args = parser.parse_args()
+
+    entries = with_overrides(load_keywords(args.keywords), parse_overrides(args.boost), parse_overrides(args.kw_threshold))
+    if args.write_keywords:
+        write_keywords(entries, args.write_keywords)
+    clips = load_clips(args.data_dir)
+    if not clips:
+        print(f"{args.data_dir} 下没有 positive/ 或 negative/ 片段")
+        return
+
+    hits, misses, latencies = Counter(), Counter(), defaultdict(list)
+    false_accepts: Counter = Counter()
+    negative_seconds, audio_seconds, cpu_seconds = 0.0, 0.0, 0.0
+    start = time.perf_counter()
+    ctx = multiprocessing.get_context("spawn")
+    initargs = (args.model_dir, args.keywords, entries, args.threshold, args.score)
+    with ctx.Pool(args.workers, initializer=_init_worker, initargs=initargs) as pool:
+        for clip, seconds, detections, elapsed in pool.imap_unordered(_run_clip, clips):
+            audio_seconds += seconds
+            cpu_seconds += elapsed
+            if clip.keyword is None:
+                negative_seconds += seconds
+                false_accepts.update(phrase for phrase, _ in detections)
+            elif detections:
+                hits[clip.keyword] += 1
+                latencies[clip.keyword].append(detections[0][1] - clip.end)
+            else:
+                misses[clip.keyword] += 1
+    wall = time.perf_counter() - start
+
+    print(f"{len(clips)} 个片段, 音频 {audio_seconds / 60:.1f} 分钟, 耗时 {wall:.1f} 秒, "
+          f"单进程 RTF {cpu_seconds / audio_seconds:.3f}")
+    print(f"{'唤醒词':<12}{'片段':>6}{'漏检率':>8}{'延迟中位ms':>12}{'延迟P90ms':>11}")
+    for keyword in sorted(set(hits) | set(misses)):
+        total = hits[keyword] + misses[keyword]
+        lat = np.asarray(latencies[keyword]) * 1000
+        median = f"{np.median(lat):.0f}" if len(lat) else "-"
+        p90 = f"{np.percentile(lat, 90):.0f}" if len(lat) else "-"
+        print(f"{keyword:<12}{total:>6}{misses[keyword] / total:>8.1%}{median:>12}{p90:>11}")
+
+    if negative_seconds:
+        hours = negative_seconds / 3600
+        total = sum(false_accepts.values())
+        print(f"负样本 {hours:.2f} 小时, 误唤醒 {total} 次, {total / hours:.2f} 次/小时")
+        for phrase, count in false_accepts.most_common():
+            print(f"  {phrase:<12}{count:>6}{count / hours:>10.2f} 次/小时")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+"""
+多会话吞吐基准：N 个并发会话各自连续跑若干轮（文本或 wav 输入），
+统计不同会话数下的每秒完成轮数、平均批大小和单轮延迟。
+
+用法:
+    python -m benchmarks.sessions [--sessions 1 2 4 8] [--turns 3] [--audio 录音目录/]
+"""
+import argparse
+import glob
+import os
+import threading
+import time
+from typing import List, Optional
+
+import numpy as np
+import soundfile as sf
+
+from src.config.config import Config
+from src.core.llm import LocalLLMClient
+from src.core.stt import SpeechToText
+from src.core.tts import TextToSpeech
+from src.server.sessions import Engines, SessionScheduler
+
+PROMPTS = [
+    "给我讲一个关于小兔子的故事",
+    "天上为什么有彩虹",
+    "一加一等于几",
+    "你喜欢什么颜色",
+    "晚安要说什么",
+]
+
+
+def _load_audio(directory: Optional[str]) -> List:
+    if not directory:
+        return []
+    clips = []
+    for path in sorted(glob.glob(os.path.join(directory, "*.wav"))):
+        audio, rate = sf.read(path, dtype="float32", always_2d=True)
+        clips.append((np.ascontiguousarray(audio[:, 0]), rate))
+    return clips
+
+
+def run(scheduler: SessionScheduler, n_sessions: int, turns: int, clips: List) -> dict:
+    sessions = [scheduler.create_session() for _ in range(n_sessions)]
+    start_turns = scheduler.completed_turns
+    start_steps, start_batch = scheduler.batcher.steps, scheduler.batcher.batch_size_sum
+
+    def drive(idx: int) -> None:
+        session = sessions[idx]
+        for turn in range(turns):
+            k = idx * turns + turn
+            if clips:
+                audio, rate = clips[k % len(clips)]
+                scheduler.submit_audio(session, audio, rate)
+            else:
+                scheduler.submit_text(session, PROMPTS[k % len(PROMPTS)])
+            while session.outputs.get()["type"] not in ("done", "error"):
+                pass
+
+    t0 = time.time()
+    threads = [threading.Thread(target=drive, args=(i,)) for i in range(n_sessions)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.time() - t0
+
+    latencies = [x for s in sessions for x in s.latencies]
+    steps = scheduler.batcher.steps - start_steps
+    for s in sessions:
+        scheduler.close_session(s)
+    return {
+        "sessions": n_sessions,
+        "turns": scheduler.completed_turns - start_turns,
+        "seconds": elapsed,
+        "turns_per_second": (scheduler.completed_turns - start_turns) / elapsed,
+        "mean_batch": (scheduler.batcher.batch_size_sum - start_batch) / steps if steps else 0.0,
+        "mean_latency": float(np.mean(latencies)) if latencies else 0.0,
+        "p95_latency": float(np.percentile(latencies, 95)) if latencies else 0.0,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="多会话吞吐基准")
+    parser.add_argument("--sessions", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("--turns", type=int, default=3, help="每个会话的轮数")
+    parser.add_argument("--max-batch", type=int, default=8)
+    parser.add_argument("--audio", help="wav 目录；不给时直接用文本输入")
+    args = parser.parse_args()
+
+    config = Config()
+    engines = Engines(
+        stt=SpeechToText(config.asr_model),
+        llm=LocalLLMClient(config.llm_model),
+        tts=TextToSpeech(config.tts_model, config.output_device),
+    )
+    scheduler = SessionScheduler(engines, max_batch=args.max_batch, min_asr_confidence=config.min_asr_confidence)
+    clips = _load_audio(args.audio)
+
+    print(f"{'会话数':>6} {'轮数':>6} {'耗时(s)':>8} {'轮/秒':>7} {'平均批':>7} {'平均延迟':>9} {'P95延迟':>8}")
+    for n in args.sessions:
+        r = run(scheduler, n, args.turns, clips)
+        print(f"{r['sessions']:>6} {r['turns']:>6} {r['seconds']:>8.1f} {r['turns_per_second']:>7.2f} "
+              f"{r['mean_batch']:>7.2f} {r['mean_latency']:>9.2f} {r['p95_latency']:>8.2f}")
+
+
+if __name__ == "__main__":
+    main()
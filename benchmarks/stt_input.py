@@ -0,0 +1,80 @@
+"""
+STT 输入准备微基准：对比原来的 always_2d 读取 + 取首声道 + ascontiguousarray + np.interp 重采样，
+与复用缓冲区的 AudioConverter，统计每次调用的耗时和分配的内存。
+
+用法:
+    python -m benchmarks.stt_input [--seconds 5] [--repeat 200] [--asr sensevoice]
+"""
+import argparse
+import timeit
+import tracemalloc
+
+import numpy as np
+
+from src.core.audio_input import AudioConverter
+
+CASES = [
+    ("16k 单声道", 16000, 1),
+    ("8k 单声道", 8000, 1),
+    ("44.1k 双声道", 44100, 2),
+    ("48k 双声道", 48000, 2),
+]
+
+
+def legacy_prepare(audio: np.ndarray, sample_rate: int, target_rate: int = 16000) -> np.ndarray:
+    """原 main.process_audio_file / daemon.decode_audio 的做法，外加一次 np.interp 重采样"""
+    if audio.ndim == 1:
+        audio = audio[:, None]
+    audio = np.ascontiguousarray(audio[:, 0])
+    if sample_rate != target_rate:
+        n = len(audio) * target_rate // sample_rate
+        src = np.arange(len(audio)) / sample_rate
+        dst = np.arange(n) / target_rate
+        audio = np.interp(dst, src, audio).astype(np.float32)
+    return audio
+
+
+def _allocated(fn) -> int:
+    fn()  # 预热，让缓冲区和插值表就位
+    tracemalloc.start()
+    tracemalloc.reset_peak()
+    fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description="STT 输入准备微基准")
+    parser.add_argument("--seconds", type=float, default=5.0, help="每段测试音频的时长")
+    parser.add_argument("--repeat", type=int, default=200)
+    parser.add_argument("--asr", choices=["sensevoice", "paraformer"], help="同时测完整的 transcribe 调用")
+    args = parser.parse_args()
+
+    converter = AudioConverter()
+    stt = None
+    if args.asr:
+        from src.core.stt import SpeechToText
+        stt = SpeechToText(backend=args.asr)
+
+    rng = np.random.default_rng(0)
+    print(f"{'输入':<14}{'旧路径 µs':>12}{'旧路径 KB':>12}{'复用 µs':>12}{'复用 KB':>12}")
+    for name, rate, channels in CASES:
+        frames = int(args.seconds * rate)
+        audio = rng.standard_normal((frames, channels)).astype(np.float32) * 0.1
+        if channels == 1:
+            audio = audio[:, 0]
+
+        row = []
+        for fn in (lambda: legacy_prepare(audio, rate), lambda: converter.convert(audio, rate)):
+            seconds = timeit.timeit(fn, number=args.repeat)
+            row += [seconds / args.repeat * 1e6, _allocated(fn) / 1024]
+        print(f"{name:<14}{row[0]:>12.1f}{row[1]:>12.1f}{row[2]:>12.1f}{row[3]:>12.1f}")
+
+        if stt is not None:
+            seconds = timeit.timeit(lambda: stt.transcribe(rate, audio), number=5) / 5
+            print(f"{'':<14}transcribe: {seconds * 1000:.1f} ms/次, 流池未命中 {stt.streams.misses} 次")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+"""
+TTS 文本归一化微基准：对比原来 main.clean_repeats 的多次 re.sub 与单次扫描的 TextNormalizer。
+
+用法:
+    python -m benchmarks.text_normalizer [--repeat 2000] [--file 句子文件.txt]
+"""
+import argparse
+import re
+import timeit
+from typing import List
+
+from src.utils.text_normalizer import TextNormalizer
+
+SENTENCES = [
+    "从前有一只小兔子，它住在森林里。",
+    "今天是2024-05-01，气温25℃，适合出去玩哦！",
+    "哈哈哈哈哈，你真是太有趣了！",
+    "**小朋友**，1+1=2，你学会了吗？🐰",
+    "我们10:30出发，要走3.5km才能到公园。",
+    "好的好的好的好的，我们一起唱歌吧。",
+    "打折50%的玩具有3-5个，你想要哪一个呢？",
+    "小熊说：我有2个苹果，分给你一个。",
+]
+
+
+def clean_repeats(text):
+    """原 main.py 中的实现，作为对照"""
+    for n in range(4, 0, -1):
+        pattern = rf'((\S{{{n}}}))(\2){{2,}}'
+        text = re.sub(pattern, r'\1\2', text)
+    text = re.sub(r'(.)\1{2,}', r'\1\1', text)
+    return text
+
+
+def _load(path: str) -> List[str]:
+    with open(path, encoding="utf-8") as f:
+        return [line.strip() for line in f if line.strip()]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="TTS 文本归一化微基准")
+    parser.add_argument("--repeat", type=int, default=2000, help="整个语料重复处理的次数")
+    parser.add_argument("--file", help="每行一句的语料文件，默认使用内置句子")
+    args = parser.parse_args()
+
+    sentences = _load(args.file) if args.file else SENTENCES
+    normalize = TextNormalizer()
+    total = len(sentences) * args.repeat
+
+    for name, fn in (("clean_repeats", clean_repeats), ("TextNormalizer", normalize)):
+        seconds = timeit.timeit(lambda: [fn(s) for s in sentences], number=args.repeat)
+        print(f"{name:>15}: {seconds / total * 1e6:7.2f} µs/句  ({total} 句, {seconds:.2f}秒)")
+
+    print("\n示例:")
+    for s in sentences[:5]:
+        print(f"  {s}\n  -> {normalize(s)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+"""
+TTS 模型选型基准：用固定的中文语料依次测试每个已安装的 sherpa-onnx TTS 模型和线程数，
+报告加载耗时、RTF、首段音频延迟（time-to-first-audio）、峰值 RSS、模型大小和输出音频大小。
+
+每个 (模型, 线程数) 组合在单独的子进程中运行，峰值 RSS 互不影响。
+不指定模型目录时扫描 sherpa/ 和当前目录下的一级子目录。
+
+用法:
+    python -m benchmarks.tts_models [model_dir ...] [--threads 1 2 4] [--sid 0] [--save wavs/]
+"""
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import time
+
+import numpy as np
+
+from src.core.tts_models import create_offline_tts, detect_tts_model, find_tts_models
+from src.utils.text_normalizer import normalize_for_tts
+
+# 覆盖问候、短答、长句、数字日期和讲故事的语气，与实际回答的长度分布接近
+CORPUS = [
+    "你好呀，我是你的小伙伴。",
+    "好的。",
+    "今天是2025年6月1日，儿童节快乐！",
+    "小兔子蹦蹦跳跳地来到河边，看见一只小乌龟正在慢慢地晒太阳。",
+    "一加一等于二，三乘以四等于12。",
+    "天黑了，星星一颗一颗亮起来，月亮姐姐也出来和大家说晚安啦。",
+    "你想听故事吗？",
+    "我们一起数一数：1、2、3、4、5，数完啦！",
+]
+
+
+def run_worker(model_dir: str, num_threads: int, sid: int, save_dir: str = None) -> dict:
+    files = detect_tts_model(model_dir)
+    start = time.perf_counter()
+    tts = create_offline_tts(files, num_threads)
+    load_seconds = time.perf_counter() - start
+    tts.generate("预热。", sid=sid, speed=1.0)
+
+    elapsed, audio_seconds, samples_total, first_audio = 0.0, 0.0, 0, []
+    for i, text in enumerate(CORPUS):
+        text = normalize_for_tts(text)
+        first = []
+
+        def on_audio(samples, progress):
+            if not first:
+                first.append(time.perf_counter())
+            return 1
+
+        start = time.perf_counter()
+        audio = tts.generate(text, sid=sid, speed=1.0, callback=on_audio)
+        end = time.perf_counter()
+        elapsed += end - start
+        audio_seconds += len(audio.samples) / audio.sample_rate
+        samples_total += len(audio.samples)
+        first_audio.append((first[0] if first else end) - start)
+        if save_dir:
+            import soundfile as sf
+            os.makedirs(save_dir, exist_ok=True)
+            name = f"{files.name}-t{num_threads}-{i}.wav"
+            sf.write(os.path.join(save_dir, name), np.asarray(audio.samples, dtype=np.float32), audio.sample_rate)
+
+    return {
+        "model": files.name,
+        "kind": files.kind,
+        "threads": num_threads,
+        "sample_rate": tts.sample_rate,
+        "load_seconds": load_seconds,
+        "rtf": elapsed / audio_seconds if audio_seconds else float("inf"),
+        "ttfa_ms": float(np.median(first_audio)) * 1000,
+        "ttfa_max_ms": max(first_audio) * 1000,
+        "peak_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,  # Linux 上单位是 KB
+        "model_mb": files.size_bytes() / 1024 / 1024,
+        "output_kb": samples_total * 2 / 1024,  # 16 位 PCM
+        "audio_seconds": audio_seconds,
+    }
+
+
+def run_isolated(model_dir: str, num_threads: int, sid: int, save_dir: str = None) -> dict:
+    cmd = [sys.executable, "-m", "benchmarks.tts_models", model_dir,
+           "--worker", "--threads", str(num_threads), "--sid", str(sid)]
+    if save_dir:
+        cmd += ["--save", save_dir]
+    proc = subprocess.run(cmd, capture_output=True, text=True)
+    if proc.returncode != 0:
+        return {"model": os.path.basename(os.path.normpath(model_dir)), "threads": num_threads,
+                "error": proc.stderr.strip().splitlines()[-1] if proc.stderr.strip() else f"exit {proc.returncode}"}
+    return json.loads(proc.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="TTS 模型选型基准")
+    parser.add_argument("model_dirs", nargs="*", help="模型目录，默认扫描 sherpa/ 和当前目录")
+    parser.add_argument("--threads", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--sid", type=int, default=0)
+    parser.add_argument("--save", default=None, help="把合成结果写成 wav，便于试听对比音质")
+    parser.add_argument("--worker", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        print(json.dumps(run_worker(args.model_dirs[0], args.threads[0], args.sid, args.save)))
+        return
+
+    model_dirs = args.model_dirs or [os.path.dirname(f.model) for f in find_tts_models(["sherpa", "."])]
+    if not model_dirs:
+        print("未找到 TTS 模型")
+        return
+
+    print(f"语料 {len(CORPUS)} 句, {sum(len(t) for t in CORPUS)} 字")
+    print(f"{'模型':<32}{'类型':<8}{'线程':>4}{'加载s':>8}{'RTF':>8}{'首音频ms':>10}{'最大ms':>8}"
+          f"{'峰值RSS MB':>12}{'模型MB':>8}{'输出KB':>8}")
+    for model_dir in model_dirs:
+        for num_threads in args.threads:
+            r = run_isolated(model_dir, num_threads, args.sid, args.save)
+            if "error" in r:
+                print(f"{r['model']:<32}{'-':<8}{num_threads:>4}  失败: {r['error']}")
+                continue
+            print(f"{r['model']:<32}{r['kind']:<8}{r['threads']:>4}{r['load_seconds']:>8.2f}{r['rtf']:>8.3f}"
+                  f"{r['ttfa_ms']:>10.0f}{r['ttfa_max_ms']:>8.0f}{r['peak_rss_mb']:>12.0f}"
+                  f"{r['model_mb']:>8.1f}{r['output_kb']:>8.0f}")
+
+
+if __name__ == "__main__":
+    main()
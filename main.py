@@ -1,51 +1,53 @@
 import argparse
 import tempfile
 import os
+import signal
 import time
+import threading
 import numpy as np
 import logging
-from typing import Generator, Optional
+from typing import Optional
 from contextlib import contextmanager
 
-from src.core.kws import KeywordSpotter
 from src.core.stt import SpeechToText
-from src.core.tts import TextToSpeech, stop_playback
-from src.core.llm import LocalLLMClient
+from src.core.tts import TextToSpeech, stop_playback, playback_stats, default_player
+from src.core.audio_process import AudioIOProcess
+from src.core.memory_budget import MemoryBudget
+from src.core.llm import LocalLLMClient, LLMConfig
 from src.core.recorder import Recorder
-from src.core.speech_denoiser import SpeechEnhancer
-from src.core.share_state import State
+from src.core.share_state import State, AssistantState
+from src.core.response_cache import ResponseCache
+from src.core.keyword_matcher import KeywordMatcher, KeywordMatch, strip_keyword
+from src.core.language import detect_language
+from src.core.endpointing import AdaptiveEndpointer
+from src.core.energy_gate import EnergyGate
+from src.core.story import StoryTeller, STOP_STORY_RE, is_story_request
+from src.core.governor import QualityGovernor, QualityLevel
+from src.server.daemon import AssistantDaemon, DEFAULT_SOCKET
 
 from src.config.config import Config
 
-import langid
-
 import soundfile as sf
 
-import asyncio
 from queue import Queue
 
 from src.utils.utils import smart_split
+from src.utils.memory import memory_report
+from src.utils.profiler import SamplingProfiler, install_signal_handler
+from src.utils.log import setup_logging, shutdown_logging, logging_stats
 from src.config.wake_keywords import keywords
-import re
 
+WAKE_ACK_TEXT = "我在,我在。"
 
-def clean_repeats(text):
-    # 處理連續詞語（1~4字）重複超過兩次
-    for n in range(4, 0, -1):  # 先處理長詞，避免誤判
-        pattern = rf'((\S{{{n}}}))(\2){{2,}}'
-        text = re.sub(pattern, r'\1\2', text)
-    
-    # 處理單字元重複超過兩次（標點、單個字）
-    text = re.sub(r'(.)\1{2,}', r'\1\1', text)
-    
-    return text
 
 class VoiceAssistant:
     def __init__(self, config: Config):
-        self._setup_logging()
+        self._setup_logging(config)
         self._validate_config(config)
         self.config = config
         self.tts_queue = Queue()
+        self.profiler = SamplingProfiler(config.profile_dir, config.profile_interval)
+        State.start_dispatcher()
         
         try:
             # self.kws = KeywordSpotter(
@@ -57,24 +59,90 @@ class VoiceAssistant:
             # )
             #self.speech_enhancer = SpeechEnhancer(config.denoiser_model)
 
+            self.response_cache = None
+            if config.response_cache:
+                self.response_cache = ResponseCache(
+                    ttl=config.response_cache_ttl,
+                    reuse_probability=config.response_cache_reuse,
+                    max_serves=config.response_cache_max_serves,
+                    max_distance=config.response_cache_max_distance,
+                )
+
             self.stt = SpeechToText(config.asr_model)
-            self.tts = TextToSpeech(config.tts_model, config.output_device)
-            self.llm = LocalLLMClient(config.llm_model)
+            self.audio_io = None
+            if config.audio_process:
+                self.audio_io = AudioIOProcess(config.audio_io_settings())
+                self.audio_io.start()
+                default_player.io = self.audio_io
+            self.tts = TextToSpeech(
+                config.tts_model,
+                config.output_device,
+                audio_cache=self.response_cache,
+                blocksize=config.playback_blocksize,
+                latency=config.playback_latency,
+                sid=config.tts_sid,
+                num_threads=config.tts_num_threads
+            )
+            self.llm = LocalLLMClient(
+                LLMConfig(
+                    model_path=config.llm_model,
+                    mmap_weights=config.llm_mmap_weights,
+                    speculative=config.llm_speculative,
+                    num_draft_tokens=config.llm_num_draft_tokens,
+                    max_new_tokens=config.llm_max_new_tokens,
+                    limits=config.generation_limits()
+                ),
+                cache=self.response_cache,
+                lazy=config.low_memory
+            )
+            self.endpointer = AdaptiveEndpointer(config.endpoint_config()) if config.adaptive_endpointing else None
+            self.energy_gate = EnergyGate(config.energy_gate_config(), config.sample_rate) if config.energy_gate else None
             self.recorder = Recorder(
                 sample_rate=config.sample_rate,
                 input_device=config.input_device,
-                vad_model_path=config.vad_model
+                vad_model_path=config.vad_model,
+                vad_threshold=config.vad_threshold,
+                min_silence_duration=config.vad_min_silence_duration,
+                max_speech_duration=config.max_speech_duration,
+                endpointer=self.endpointer,
+                audio_io=self.audio_io,
+                energy_gate=self.energy_gate
             )
+            self.story_teller = StoryTeller(self.llm, self.tts, config.story_config()) if config.story_mode else None
             self.is_awake_mode = True  # 初始唤醒模式
             self.keywords = keywords
+            self.keyword_matcher = KeywordMatcher(keywords)
+            # 预先合成唤醒应答，命中关键词时直接播放
+            self.wake_ack = self.tts.render(WAKE_ACK_TEXT)
+            self._ack_until = 0.0
+
+            self.memory_budget = None
+            if config.low_memory:
+                self.memory_budget = MemoryBudget(config.max_rss_mb, min_idle=config.component_idle_seconds)
+                self.memory_budget.register("stt", self.stt, pinned=True)
+                self.memory_budget.register("vad", self.recorder, pinned=True)
+                self.memory_budget.register("kws", self.keyword_matcher, pinned=True)
+                self.memory_budget.register("llm", self.llm)
+                self.memory_budget.register("tts", self.tts)
+
+            self.denoise = True
+            self._pending_quality: Optional[QualityLevel] = None
+            self.governor = None
+            if config.governor:
+                self.governor = QualityGovernor(config.governor_levels(), self._request_quality, config.governor_config())
+                self.governor.start()
         except Exception as e:
             logging.error(f"初始化组件失败: {str(e)}")
             raise
 
-    def _setup_logging(self) -> None:
-        logging.basicConfig(
+    def _setup_logging(self, config: Config) -> None:
+        # 日志经队列交给后台线程写出，音频回调和推理线程不做任何 I/O
+        setup_logging(
             level=logging.INFO,
-            format='%(asctime)s - %(levelname)s - %(message)s'
+            fmt='%(asctime)s - %(levelname)s - %(message)s',
+            filename=config.log_file,
+            rate_limit=config.log_rate_limit,
+            realtime=config.realtime_logging,
         )
 
     @staticmethod
@@ -95,19 +163,46 @@ class VoiceAssistant:
             except OSError:
                 pass
 
-    def kws(self, text):
-        for kw in self.keywords:
-            if kw in text:
-                return kw
-        return None
+    def kws(self, text) -> Optional[KeywordMatch]:
+        return self.keyword_matcher.match(text)
+
+    def _request_quality(self, level: QualityLevel) -> None:
+        # 调节线程里调用：只记下目标档位，等本轮对话结束、下一轮开始前再切换
+        self._pending_quality = level
+
+    def _apply_pending_quality(self) -> None:
+        level, self._pending_quality = self._pending_quality, None
+        if level is None:
+            return
+        self.llm.config.max_new_tokens = level.max_new_tokens
+        if level.llm_model != self.llm.config.model_path:
+            # MiniMind2 各尺寸共用同一个分词器，只换权重；下次使用时加载
+            self.llm.config.model_path = level.llm_model
+            self.llm.unload()
+        if level.tts_threads != self.tts.num_threads:
+            self.tts.num_threads = level.tts_threads
+            self.tts.unload()
+        self.denoise = level.denoise
+        logging.info(f"已切换到质量档位: {level.name}")
 
     def process_conversation(self) -> Optional[str]:
         try:
-            audio = self.recorder.record(self.config.silence_duration)
+            self._apply_pending_quality()
+            State.transition(AssistantState.IDLE if self.is_awake_mode else AssistantState.LISTENING)
+            if self.memory_budget is not None:
+                # 待机等唤醒时不必保留 LLM/TTS；对话进行中只卸载空闲够久的组件
+                self.memory_budget.enforce(min_idle=0 if self.is_awake_mode else None)
+            audio = self.recorder.record(
+                self.config.silence_duration,
+                enable_noise_reduction=self.denoise,
+                mute_until=self._ack_until,
+                partial_transcriber=self._partial_transcribe if self.endpointer else None
+            )
             if not self._validate_audio(audio) or not State.listening():
                 logging.info("未检测到语音或静音")
                 return None
 
+            State.transition(AssistantState.THINKING)
             text = self._process_audio_to_text(audio)
             if not text:
                 text = "我听不懂你说什么"
@@ -115,15 +210,25 @@ class VoiceAssistant:
 
             if self.is_awake_mode:
                 result = self._check_kws(text)
-                if result:
-                    logging.info(f"检测到关键词: {result}")
-                    self.is_awake_mode = False  # 切换到语音识别模式
-                    self._synthesize_response("我在,我在。")
-                    return None
-                else:
+                if not result:
                     logging.info(f"未检测到关键词: raw text: {text}")
                     return None
 
+                logging.info(f"检测到关键词: {result.keyword}")
+                self.is_awake_mode = False  # 切换到语音识别模式
+                State.transition(AssistantState.WAKE)
+                self._acknowledge_wake()
+                # 同一句话里唤醒词后面的内容直接作为问题
+                text = strip_keyword(text, result)
+                if not text:
+                    return None
+                logging.info(f"唤醒词后的问题: {text}")
+                State.transition(AssistantState.THINKING)
+
+            if self.story_teller is not None and is_story_request(text):
+                self._tell_story(text)
+                return None
+
             stream = True
             if stream:
                 buffer = ""
@@ -137,7 +242,7 @@ class VoiceAssistant:
                     complete = sentences[:-1]
                     for sentence in complete:
                         logging.info(f"seg {seg_idx}: {sentence}\n")
-                        self._synthesize_response(clean_repeats(sentence))
+                        self._synthesize_response(sentence)
                         seg_idx += 1
 
                     # 保留最后一个不完整的片段
@@ -146,7 +251,7 @@ class VoiceAssistant:
                 # 处理剩下的残余内容
                 if buffer.strip():
                     logging.info(f"seg {seg_idx}: {buffer}\n")
-                    self._synthesize_response(clean_repeats(buffer))
+                    self._synthesize_response(buffer)
 
             else:
                 response = self._generate_response(text)
@@ -163,6 +268,31 @@ class VoiceAssistant:
             logging.error(f"处理对话时出错: {str(e)}")
             return None
 
+    def _tell_story(self, text: str) -> None:
+        """故事在后台线程生成和播放，主线程继续录音：孩子说唤醒词或“别讲了”时打断"""
+        done = threading.Event()
+
+        def tell():
+            try:
+                self.story_teller.tell(text)
+            except Exception as e:
+                logging.error(f"讲故事出错: {e}")
+            finally:
+                done.set()
+
+        State.transition(AssistantState.SPEAKING)
+        threading.Thread(target=tell, name="story", daemon=True).start()
+        while not done.is_set():
+            audio = self.recorder.record(self.config.silence_duration, stop_event=done)
+            if done.is_set() or len(audio) == 0:
+                continue
+            heard = self._process_audio_to_text(audio)
+            if heard and (self._check_kws(heard) or STOP_STORY_RE.search(heard)):
+                logging.info(f"讲故事被打断: {heard}")
+                self.story_teller.interrupt()
+                break
+        done.wait()
+
     def _validate_audio(self, audio: np.ndarray) -> bool:
         if audio is None or len(audio) == 0:
             logging.info("未检测到语音")
@@ -175,20 +305,41 @@ class VoiceAssistant:
         logging.info(f"录音长度: {duration:.2f}秒, 最大音量: {max_volume:.4f}")
         return True
 
+    def _partial_transcribe(self, audio: np.ndarray) -> str:
+        # 录音过程中的部分转写，只用于判断句子是否说完
+        return self.stt.transcribe(self.config.sample_rate, audio).text
+
     def _process_audio_to_text(self, audio: np.ndarray) -> Optional[str]:
         try:
-            text = self.stt.transcribe(self.config.sample_rate, audio)
-            language = langid.classify(text)[0].strip().lower()        
-            #if language not in ('zh', 'en'):
-            if language != 'zh':
+            result = self.stt.transcribe(self.config.sample_rate, audio)
+            text = result.text
+            # 噪声、语气词等转写在调用 LLM 之前就丢弃
+            reason = result.rejection_reason(self.config.min_asr_confidence)
+            if reason:
+                logging.info(f"丢弃转写: {reason}, text: {text}")
+                return None
+
+            # 识别器自带语言标签时直接使用，不再额外做一次语言分类
+            language = detect_language(text, hint=result.lang)
+            if language not in self.config.allowed_languages:
                 logging.warning(f"不支持的语言: {language}, text: {text}")
                 return None
 
+            logging.info(f"识别结果: {text} (lang={language}, emotion={result.emotion})")
             return text
         except Exception as e:
             logging.error(f"音频转文字失败: {str(e)}")
             return None
 
+    def _acknowledge_wake(self) -> None:
+        # 边播放预合成的应答边继续录音，同时在后台预热 LLM 前缀缓存
+        samples, rate = self.wake_ack
+        if len(samples) > 0:
+            self.tts.play(samples, rate, blocking=False)
+            # 应答在设备输出延迟之后才播完，回声也要到那时才结束
+            self._ack_until = time.time() + len(samples) / rate + self.tts.player.output_latency()
+        self.llm.warmup_async()
+
     def _check_kws(self, text: str):
         with self._time_it("关键字唤醒"):
             return self.kws(text)
@@ -214,16 +365,16 @@ class VoiceAssistant:
         try:
             all_start = time.time()
 
-            audio, sample_rate = sf.read(wave_filename, dtype="float32", always_2d=True)
-            audio = audio[:, 0]  # only use the first channel
-            audio = np.ascontiguousarray(audio)
+            # 多声道、非 16kHz 的文件直接交给 STT，在其复用缓冲区里转换
+            audio, sample_rate = sf.read(wave_filename, dtype="float32")
 
             with self._time_it("语音转录"):
-                text = self.stt.transcribe(sample_rate, audio)  
+                text = self.stt.transcribe(sample_rate, audio).text
                 result = self._check_kws(text)
                 if result:
-                    logging.info(f"检测到关键词: {result}")
+                    logging.info(f"检测到关键词: {result.keyword}")
                     self.is_awake_mode = False  # 切换到语音识别模式
+                    text = strip_keyword(text, result) or text
                 else:
                     logging.info(f"未检测到关键词: raw text: {text}")
 
@@ -240,7 +391,7 @@ class VoiceAssistant:
                     complete = sentences[:-1]
                     for sentence in complete:
                         logging.info(f"seg {seg_idx}: {sentence}\n")
-                        self._synthesize_response(clean_repeats(sentence))
+                        self._synthesize_response(sentence)
                         seg_idx += 1
 
                     # 保留最后一个不完整的片段
@@ -249,7 +400,7 @@ class VoiceAssistant:
                 # 处理剩下的残余内容
                 if buffer.strip():
                     logging.info(f"seg {seg_idx}: {buffer}\n")
-                    self._synthesize_response(clean_repeats(buffer))
+                    self._synthesize_response(buffer)
 
             else:
                 response = self._generate_response(text)
@@ -257,7 +408,7 @@ class VoiceAssistant:
                 seg_idx = 1
                 for sentence in sentences:
                     logging.info(f"seg {seg_idx}: {sentence}\n")
-                    self._synthesize_response(clean_repeats(sentence))
+                    self._synthesize_response(sentence)
                     seg_idx += 1
 
             logging.info(f"总耗时: {time.time() - all_start:.2f}秒")
@@ -268,6 +419,8 @@ def main():
     try:
         parser = argparse.ArgumentParser(description='Voice Assistant')
         parser.add_argument('--asr-model', default='sensevoice')
+        parser.add_argument('--tts-model', default='sherpa/vits-icefall-zh-aishell3', help='TTS 模型目录，类型自动识别')
+        parser.add_argument('--tts-sid', type=int, default=0, help='多说话人 TTS 模型的说话人编号')
         parser.add_argument('--interactive', '-i', action='store_true')
         parser.add_argument('--file', '-f')
         parser.add_argument('--list-devices', '-l', action='store_true')
@@ -275,6 +428,19 @@ def main():
         parser.add_argument('--output-device', default=None)
         parser.add_argument('--pid-file')
         parser.add_argument('--vad-model', default='vad_ckpt/silero_vad.onnx')
+        parser.add_argument('--response-cache', action='store_true', help='缓存常见问题的回答与合成音频')
+        parser.add_argument('--daemon', '-d', action='store_true', help='常驻服务模式，通过 Unix 套接字提供接口')
+        parser.add_argument('--socket', default=DEFAULT_SOCKET)
+        parser.add_argument('--sessions', type=int, default=1, help='守护进程模式下同时处理的会话数，LLM 生成合并批量解码（模型 forward 须接受 attention_mask，否则逐条解码）')
+        parser.add_argument('--low-memory', action='store_true', help='LLM/TTS 按需加载，超出内存上限时卸载空闲组件')
+        parser.add_argument('--max-rss-mb', type=float, default=None, help='低内存模式下的进程 RSS 上限（MB）')
+        parser.add_argument('--speculative', default=None, help='推测解码：ngram 或草稿模型目录')
+        parser.add_argument('--audio-process', action='store_true', help='采集/播放放到独立进程，经共享内存交换音频')
+        parser.add_argument('--energy-gate', action='store_true', help='待机时先做能量门控，有声音才运行 VAD')
+        parser.add_argument('--log-file', default=None, help='日志同时写入该文件')
+        parser.add_argument('--governor', action='store_true', help='按负载/温度/RTF 自动升降质量档位')
+        parser.add_argument('--quiet-callbacks', action='store_true', help='音频回调里不记录日志')
+        parser.add_argument('--story-mode', action='store_true', help='“讲个故事”之类的请求分段续写长故事')
         args = parser.parse_args()
         
         if args.list_devices:
@@ -283,18 +449,39 @@ def main():
 
         config = Config(
             asr_model=args.asr_model,
+            tts_model=args.tts_model,
+            tts_sid=args.tts_sid,
             input_device=args.input_device,
             output_device=args.output_device,
-            vad_model=args.vad_model
+            vad_model=args.vad_model,
+            response_cache=args.response_cache,
+            low_memory=args.low_memory,
+            max_rss_mb=args.max_rss_mb,
+            llm_speculative=args.speculative,
+            audio_process=args.audio_process,
+            energy_gate=args.energy_gate,
+            log_file=args.log_file,
+            realtime_logging=not args.quiet_callbacks,
+            governor=args.governor,
+            story_mode=args.story_mode
         )
         
         assistant = VoiceAssistant(config)
+        if install_signal_handler(assistant.profiler, config.profile_seconds):
+            logging.info(f"性能采样: kill -USR1 {os.getpid()}")
 
         if args.pid_file:
             with open(args.pid_file, 'w') as f:
                 f.write(str(os.getpid()))
 
-        if args.file:
+        if args.daemon:
+            daemon = AssistantDaemon(assistant, args.socket, sessions=args.sessions)
+            signal.signal(signal.SIGTERM, lambda signum, frame: daemon.shutdown())
+            try:
+                daemon.serve_forever()
+            except KeyboardInterrupt:
+                logging.info("Exiting daemon mode...")
+        elif args.file:
             assistant.process_audio_file(args.file)
         elif args.interactive:
             logging.info("Interactive mode started...")
@@ -304,12 +491,29 @@ def main():
                     ##asyncio.run(assistant.process())
             except KeyboardInterrupt:
                 logging.info("Exiting interactive mode...")
+                for state, seconds in State.time_in_states().items():
+                    logging.info(f"状态 {state.value}: {seconds:.1f}秒")
+                logging.info(f"播放统计: {playback_stats()}")
+                if assistant.energy_gate is not None:
+                    logging.info(f"能量门控占空比: {assistant.energy_gate.duty_cycle:.1%}")
+                if assistant.audio_io is not None:
+                    logging.info(f"音频子进程统计: {assistant.audio_io.stats()}")
+                    assistant.audio_io.stop()
+                logging.info(f"内存占用: {memory_report()}")
+                if assistant.memory_budget is not None:
+                    logging.info(f"组件加载统计: {assistant.memory_budget.metrics()}")
+                if assistant.governor is not None:
+                    assistant.governor.stop()
+                    logging.info(f"质量调节统计: {assistant.governor.stats()}")
+                logging.info(f"日志统计: {logging_stats()}")
         else:
-            logging.error("请指定 --file 或 --interactive 模式")
+            logging.error("请指定 --file、--interactive 或 --daemon 模式")
 
     except Exception as e:
         logging.error(f"程序执行出错: {str(e)}")
         raise
+    finally:
+        shutdown_logging()  # 写完队列里剩余的日志
 
 if __name__ == "__main__":
     main()
@@ -1,3 +1,12 @@
+from typing import List, Optional
+
+from src.core.endpointing import EndpointConfig
+from src.core.energy_gate import EnergyGateConfig
+from src.core.generation import GenerationLimits
+from src.core.audio_process import AudioIOSettings
+from src.core.governor import GovernorConfig, QualityLevel
+
+
 class Config:
     def __init__(
         self,
@@ -7,8 +16,58 @@ class Config:
         vad_model: str = "vad_ckpt/silero_vad.onnx",
         sample_rate: int = 16000,
         tts_model: str = "sherpa/vits-icefall-zh-aishell3",
+        tts_sid: int = 0,
+        tts_num_threads: int = None,
         llm_model: str = "MiniMind2-Small",
-        denoiser_model: str = "speech-enhancement/gtcrn_simple.onnx"
+        llm_mmap_weights: bool = True,
+        llm_speculative: str = None,
+        llm_num_draft_tokens: int = 4,
+        llm_max_new_tokens: int = 128,
+        max_reply_sentences: int = 3,
+        max_reply_seconds: float = 20.0,
+        reply_latency_budget: float = 10.0,
+        low_memory: bool = False,
+        max_rss_mb: float = None,
+        component_idle_seconds: float = 30.0,
+        denoiser_model: str = "speech-enhancement/gtcrn_simple.onnx",
+        response_cache: bool = False,
+        response_cache_ttl: float = 24 * 3600,
+        response_cache_reuse: float = 0.8,
+        response_cache_max_serves: int = 5,
+        response_cache_max_distance: int = 3,
+        allowed_languages: tuple = ("zh", "yue"),
+        min_asr_confidence: float = 0.3,
+        adaptive_endpointing: bool = True,
+        min_silence_duration: float = 0.4,
+        max_silence_duration: float = 1.6,
+        vad_threshold: float = 0.5,
+        min_vad_threshold: float = 0.35,
+        max_vad_threshold: float = 0.7,
+        vad_min_silence_duration: float = 0.25,
+        max_speech_duration: float = 20.0,
+        playback_blocksize: int = 1024,
+        playback_latency = "low",
+        audio_process: bool = False,
+        audio_gate: bool = True,
+        audio_gate_hangover: float = 2.0,
+        energy_gate: bool = False,
+        energy_gate_margin_db: float = 10.0,
+        energy_gate_lookback: float = 0.5,
+        profile_seconds: float = 10.0,
+        profile_interval: float = 0.005,
+        profile_dir: str = "profiles",
+        story_mode: bool = False,
+        story_ahead_seconds: float = 8.0,
+        story_resume_seconds: float = 4.0,
+        story_max_seconds: float = 300.0,
+        log_file: str = None,
+        log_rate_limit: float = 1.0,
+        realtime_logging: bool = True,
+        governor: bool = False,
+        governor_interval: float = 2.0,
+        governor_cpu_high: float = 70.0,
+        governor_temp_high: float = 75.0,
+        governor_small_llm: Optional[str] = None
     ):
         self.asr_model = asr_model
         self.input_device = input_device
@@ -16,6 +75,142 @@ class Config:
         self.vad_model = vad_model
         self.silence_duration = 1.0
         self.sample_rate = sample_rate
+        # 模型类型（vits/matcha/kokoro/kitten）由目录内容识别；各板子上选哪个见 benchmarks/tts_models.py
         self.tts_model = tts_model
+        self.tts_sid = tts_sid
+        self.tts_num_threads = tts_num_threads
         self.llm_model = llm_model 
-        self.denoiser_model = denoiser_model
\ No newline at end of file
+        # CPU 推理时 mmap safetensors 权重，守护进程/评测/测试等多个进程共享同一份
+        self.llm_mmap_weights = llm_mmap_weights
+        # 推测解码："ngram"（提示词查找）或草稿模型目录（需与 llm_model 同词表），None 关闭
+        self.llm_speculative = llm_speculative
+        self.llm_num_draft_tokens = llm_num_draft_tokens
+        self.llm_max_new_tokens = llm_max_new_tokens
+        # 口语回答的停止条件：最多几句、估计朗读时长（秒）、从开始生成起的延迟预算（秒），都优先停在句末
+        self.max_reply_sentences = max_reply_sentences
+        self.max_reply_seconds = max_reply_seconds
+        self.reply_latency_budget = reply_latency_budget
+        # 低内存模式：ASR/VAD/唤醒词常驻，LLM/TTS 首次使用时加载，
+        # 进程 RSS 超过 max_rss_mb 时卸载空闲超过 component_idle_seconds 的组件（待机时不等空闲）
+        self.low_memory = low_memory
+        self.max_rss_mb = max_rss_mb
+        self.component_idle_seconds = component_idle_seconds
+        self.denoiser_model = denoiser_model
+        # 常见问题回答缓存：命中率与新鲜度由 reuse/max_serves/ttl 共同决定
+        self.response_cache = response_cache
+        self.response_cache_ttl = response_cache_ttl
+        self.response_cache_reuse = response_cache_reuse
+        self.response_cache_max_serves = response_cache_max_serves
+        self.response_cache_max_distance = response_cache_max_distance
+        # 只把这些语言的转写送入 LLM（SenseVoice 的 "nospeech" 等标签会被丢弃）
+        self.allowed_languages = allowed_languages
+        # 识别器给出 token 概率时，低于该置信度的转写不送入 LLM
+        self.min_asr_confidence = min_asr_confidence
+        # 自适应断句：部分转写是完整句子时用 min_silence_duration，停在句中时用 max_silence_duration，
+        # 无法判断时用 silence_duration；VAD 阈值随噪声底在 [min_vad_threshold, max_vad_threshold] 内调整
+        self.adaptive_endpointing = adaptive_endpointing
+        self.min_silence_duration = min_silence_duration
+        self.max_silence_duration = max_silence_duration
+        self.vad_threshold = vad_threshold
+        self.min_vad_threshold = min_vad_threshold
+        self.max_vad_threshold = max_vad_threshold
+        self.vad_min_silence_duration = vad_min_silence_duration
+        self.max_speech_duration = max_speech_duration
+        # 播放输出流：blocksize 越小延迟越低，板子上出现欠载时调大；latency 可为 "low"/"high" 或秒数
+        self.playback_blocksize = playback_blocksize
+        self.playback_latency = playback_latency
+        # 采集/播放放到独立的音频子进程，PCM 走共享内存，避免与 LLM 线程争 GIL 导致溢出/欠载；
+        # audio_gate 时子进程先用 VAD 预门控，静音不转发，语音结束后再放行 audio_gate_hangover 秒
+        self.audio_process = audio_process
+        self.audio_gate = audio_gate
+        self.audio_gate_hangover = audio_gate_hangover
+        # 低功耗待机：等待语音时先做能量/过零率门控，高出噪声底 energy_gate_margin_db 才运行 VAD，
+        # 打开时补上 energy_gate_lookback 秒历史音频
+        self.energy_gate = energy_gate
+        self.energy_gate_margin_db = energy_gate_margin_db
+        self.energy_gate_lookback = energy_gate_lookback
+        # 现场排查卡顿：kill -USR1 <pid> 或守护进程的 profile 命令触发采样 profile_seconds 秒，
+        # collapsed stack 与各线程 CPU 写到 profile_dir
+        self.profile_seconds = profile_seconds
+        self.profile_interval = profile_interval
+        self.profile_dir = profile_dir
+        # 讲故事模式：“讲个故事”之类的请求分段续写，保持 story_ahead_seconds 秒已合成未播放的音频，
+        # 降到 story_resume_seconds 以下再继续生成；朗读时长不超过 story_max_seconds
+        self.story_mode = story_mode
+        self.story_ahead_seconds = story_ahead_seconds
+        self.story_resume_seconds = story_resume_seconds
+        self.story_max_seconds = story_max_seconds
+        # 日志：队列 + 后台线程写出；同一调用点 log_rate_limit 秒内只输出一条，
+        # realtime_logging=False 时音频回调里完全不产生日志
+        self.log_file = log_file
+        self.log_rate_limit = log_rate_limit
+        self.realtime_logging = realtime_logging
+        # 质量调节：外部 CPU 负载、SoC 温度或 LLM/TTS 的 RTF 过高时逐档降低 max_new_tokens、
+        # 换小模型、减少 TTS 线程、关闭降噪，恢复后再逐档升回；
+        # governor_small_llm 为最低档换用的模型，None 表示沿用 llm_model（默认的 MiniMind2-Small 已是最小尺寸）
+        self.governor = governor
+        self.governor_interval = governor_interval
+        self.governor_cpu_high = governor_cpu_high
+        self.governor_temp_high = governor_temp_high
+        self.governor_small_llm = governor_small_llm
+
+    def generation_limits(self) -> GenerationLimits:
+        return GenerationLimits(
+            max_sentences=self.max_reply_sentences,
+            max_speech_seconds=self.max_reply_seconds,
+            latency_budget=self.reply_latency_budget,
+        )
+
+    def audio_io_settings(self) -> AudioIOSettings:
+        return AudioIOSettings(
+            sample_rate=self.sample_rate,
+            input_device=None if self.input_device == "default" else self.input_device,
+            output_device=self.output_device,
+            blocksize=self.playback_blocksize,
+            latency=self.playback_latency,
+            vad_model_path=self.vad_model if self.audio_gate else None,
+            vad_threshold=self.vad_threshold,
+            # 放行时长至少覆盖主进程最长的断句静音
+            hangover_seconds=max(self.audio_gate_hangover, self.max_silence_duration + 0.5),
+        )
+
+    def energy_gate_config(self) -> EnergyGateConfig:
+        return EnergyGateConfig(
+            open_margin_db=self.energy_gate_margin_db,
+            lookback_seconds=self.energy_gate_lookback,
+        )
+
+    def story_config(self):
+        # StoryConfig 所在模块依赖 torch，这里延迟导入，保持 Config 轻量
+        from src.core.story import StoryConfig
+        return StoryConfig(
+            ahead_seconds=self.story_ahead_seconds,
+            resume_seconds=self.story_resume_seconds,
+            max_story_seconds=self.story_max_seconds,
+        )
+
+    def governor_config(self) -> GovernorConfig:
+        return GovernorConfig(
+            interval=self.governor_interval,
+            cpu_high=self.governor_cpu_high,
+            temp_high=self.governor_temp_high,
+        )
+
+    def governor_levels(self) -> List[QualityLevel]:
+        """从高到低的质量档位，第一档即正常配置"""
+        return [
+            QualityLevel("full", self.llm_max_new_tokens, self.llm_model, self.tts_num_threads, denoise=True),
+            QualityLevel("reduced", self.llm_max_new_tokens * 3 // 4, self.llm_model, 2, denoise=True),
+            QualityLevel("low", self.llm_max_new_tokens // 2, self.governor_small_llm or self.llm_model, 1,
+                         denoise=False),
+        ]
+
+    def endpoint_config(self) -> EndpointConfig:
+        return EndpointConfig(
+            base_silence=self.silence_duration,
+            min_silence=self.min_silence_duration,
+            max_silence=self.max_silence_duration,
+            vad_threshold=self.vad_threshold,
+            min_vad_threshold=self.min_vad_threshold,
+            max_vad_threshold=self.max_vad_threshold,
+        )
@@ -0,0 +1,144 @@
+import logging
+import threading
+from collections import deque
+from typing import Callable, Dict, Tuple
+
+import numpy as np
+
+_INT_SCALE = {np.dtype(np.int16): 1 / 32768.0, np.dtype(np.int32): 1 / 2147483648.0}
+
+
+class AudioConverter:
+    """
+    把任意采样率、声道布局、dtype 的音频转换成识别器要的 16kHz 单声道 float32。
+    所有中间结果写进预分配的缓冲区并以视图返回，常见长度下每次调用不分配新数组；
+    返回的视图在下一次 convert 前有效，调用方需要保留时自行拷贝。
+    """
+
+    def __init__(self, target_rate: int = 16000, max_seconds: float = 30.0):
+        self.target_rate = target_rate
+        self._mono = np.zeros(0, dtype=np.float32)
+        self._out = np.zeros(0, dtype=np.float32)
+        self._tmp = np.zeros(0, dtype=np.float32)
+        # 非整数倍重采样的插值下标与权重，按源采样率缓存
+        self._interp: Dict[int, Tuple[np.ndarray, np.ndarray, np.ndarray]] = {}
+        self._reserve(int(max_seconds * 48000), int(max_seconds * target_rate))
+
+    def _reserve(self, in_frames: int, out_frames: int) -> None:
+        if len(self._mono) < in_frames:
+            if len(self._mono):
+                logging.info(f"音频输入缓冲扩容: {len(self._mono)} -> {in_frames} 帧")
+            self._mono = np.zeros(in_frames, dtype=np.float32)
+        if len(self._out) < out_frames:
+            self._out = np.zeros(out_frames, dtype=np.float32)
+            self._tmp = np.zeros(out_frames, dtype=np.float32)
+            self._interp.clear()
+
+    @staticmethod
+    def _as_frames(audio: np.ndarray) -> np.ndarray:
+        """统一成 (frames, channels) 视图；(channels, frames) 布局按声道数不超过 8 判断"""
+        audio = np.asarray(audio)
+        if audio.ndim == 1:
+            return audio[:, None]
+        if audio.ndim != 2:
+            raise ValueError(f"不支持的音频形状: {audio.shape}")
+        if audio.shape[0] < audio.shape[1] and audio.shape[0] <= 8:
+            return audio.T
+        return audio
+
+    def _to_mono(self, audio: np.ndarray) -> np.ndarray:
+        """(frames, channels) -> 缓冲区中的 float32 单声道视图"""
+        frames, channels = audio.shape
+        mono = self._mono[:frames]
+        np.copyto(mono, audio[:, 0], casting="unsafe")
+        for ch in range(1, channels):
+            mono += audio[:, ch]
+        scale = _INT_SCALE.get(audio.dtype, 1.0) / channels
+        if scale != 1.0:
+            mono *= scale
+        return mono
+
+    def _interp_table(self, sample_rate: int, out_frames: int) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        table = self._interp.get(sample_rate)
+        if table is None or len(table[0]) < out_frames:
+            size = max(out_frames, len(self._out))
+            pos = np.arange(size, dtype=np.float64) * (sample_rate / self.target_rate)
+            idx = pos.astype(np.int64)
+            table = (idx, idx + 1, (pos - idx).astype(np.float32))
+            self._interp[sample_rate] = table
+        return table
+
+    def convert(self, audio: np.ndarray, sample_rate: int) -> np.ndarray:
+        audio = self._as_frames(audio)
+        frames = audio.shape[0]
+        out_frames = frames * self.target_rate // sample_rate
+        self._reserve(frames + 1, out_frames)
+        mono = self._to_mono(audio)
+        if sample_rate == self.target_rate:
+            return mono
+
+        out = self._out[:out_frames]
+        if sample_rate % self.target_rate == 0:
+            # 整数倍降采样（48k/32k -> 16k）：相邻 k 个样本取平均，顺带做一次简单低通
+            k = sample_rate // self.target_rate
+            np.mean(mono[:out_frames * k].reshape(out_frames, k), axis=1, out=out)
+            return out
+
+        # 其他采样率（44.1k、8k 等）：线性插值
+        idx, idx1, frac = (t[:out_frames] for t in self._interp_table(sample_rate, out_frames))
+        self._mono[frames] = mono[-1] if frames else 0.0  # 末尾多留一个样本，idx + 1 不越界
+        left, right = out, self._tmp[:out_frames]
+        # mode="raise" 会先把结果写进临时数组再拷贝，下标已保证不越界，用 clip 直接写入
+        np.take(self._mono, idx, out=left, mode="clip")
+        np.take(self._mono, idx1, out=right, mode="clip")
+        right -= left
+        right *= frac
+        left += right
+        return out
+
+
+class StreamPool:
+    """
+    预先创建好的识别流。sherpa-onnx 的流解码结束后不能复用，
+    这里在后台补充新流，把 create_stream 从每次识别的路径上挪开。
+    """
+
+    def __init__(self, factory: Callable[[], object], size: int = 2):
+        self.factory = factory
+        self.size = size
+        self.created = 0
+        self.misses = 0
+        self._free: deque = deque()
+        self._lock = threading.Lock()
+        self._refilling = False
+        self._refill()
+
+    def acquire(self):
+        with self._lock:
+            stream = self._free.popleft() if self._free else None
+        if stream is None:
+            self.misses += 1
+            stream = self._create()
+        self._schedule_refill()
+        return stream
+
+    def _create(self):
+        self.created += 1
+        return self.factory()
+
+    def _refill(self) -> None:
+        while True:
+            with self._lock:
+                if len(self._free) >= self.size:
+                    self._refilling = False
+                    return
+            stream = self._create()
+            with self._lock:
+                self._free.append(stream)
+
+    def _schedule_refill(self) -> None:
+        with self._lock:
+            if self._refilling or len(self._free) >= self.size:
+                return
+            self._refilling = True
+        threading.Thread(target=self._refill, name="stt-stream-pool", daemon=True).start()
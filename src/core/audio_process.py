@@ -0,0 +1,384 @@
+import argparse
+import json
+import logging
+import os
+import select
+import subprocess
+import sys
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass
+from multiprocessing import resource_tracker, shared_memory
+from typing import Callable, List, Optional, Union
+
+import numpy as np
+
+from ..utils.log import setup_logging
+from .ring_buffer import AudioRingBuffer, SharedAudioRing
+
+# 共享状态数组的下标：计数由子进程累加，_CAPTURING 由主进程设置
+_INPUT_OVERFLOWS = 0    # PortAudio 报告的采集溢出次数
+_OUTPUT_UNDERFLOWS = 1  # PortAudio 报告的播放欠载次数
+_GATE_OPEN = 2          # 预门控当前是否放行
+_GATED_CHUNKS = 3       # 被门控拦下、没有转发给主进程的块数
+_CAPTURING = 4          # 主进程是否需要采集数据
+STATUS_SIZE = 8
+
+# 播放环按最高采样率分配，切换 TTS 模型时不用重建共享内存
+MAX_OUTPUT_RATE = 48000
+
+
+@dataclass
+class AudioIOSettings:
+    sample_rate: int = 16000
+    input_device: Union[int, str, None] = None   # None 时按 Recorder 的规则自动选择
+    output_device: Union[int, str, None] = None
+    blocksize: int = 1024                        # 输出流每次回调的帧数
+    latency: Union[str, float] = "low"
+    capture_seconds: float = 10.0                # 采集环容量，主进程卡住这么久才开始丢数据
+    playback_seconds: float = 30.0
+    vad_model_path: Optional[str] = None         # None 时不做预门控，采集到的音频全部转发
+    vad_threshold: float = 0.5
+    chunk_seconds: float = 0.1
+    pre_roll_seconds: float = 0.5                # 门控打开时补发的语音前音频
+    hangover_seconds: float = 2.0                # 语音结束后继续放行的时长，需长于主进程的断句静音
+
+
+class VadGate:
+    """
+    子进程里的 VAD 预门控：静音时不把音频交给主进程，检测到语音时连同之前 pre_roll 块一起转发，
+    语音结束后再放行 hangover 块，让主进程的断句逻辑看到足够长的静音。
+    """
+
+    def __init__(self, vad, pre_roll: int, hangover: int):
+        self.vad = vad
+        self.hangover = hangover
+        self.is_open = False
+        self._pre = deque(maxlen=max(pre_roll, 1))
+        self._remaining = 0
+
+    def feed(self, chunk: np.ndarray) -> List[np.ndarray]:
+        """送入一块音频，返回需要转发的块（可能为空）"""
+        self.vad.accept_waveform(chunk)
+        while not self.vad.empty():
+            self.vad.pop()  # 只用实时状态，切好的语音段由主进程自己的 VAD 负责
+        if self.vad.is_speech_detected():
+            forward = [chunk] if self.is_open else [*self._pre, chunk]
+            self._pre.clear()
+            self.is_open = True
+            self._remaining = self.hangover
+            return forward
+        if self.is_open and self._remaining > 0:
+            self._remaining -= 1
+            return [chunk]
+        self.is_open = False
+        self._pre.append(chunk.copy())
+        return []
+
+
+def _attach_status(name: Optional[str] = None):
+    shm = shared_memory.SharedMemory(name=name, create=name is None, size=STATUS_SIZE * 8)
+    status = np.ndarray((STATUS_SIZE,), dtype=np.int64, buffer=shm.buf)
+    if name is None:
+        status[:] = 0
+    return shm, status
+
+
+def _untrack(name: str) -> None:
+    # 子进程有自己的 resource_tracker，挂载时登记的共享内存会在子进程退出时被它删掉；
+    # 共享内存归主进程所有，这里取消登记
+    resource_tracker.unregister("/" + name.lstrip("/"), "shared_memory")
+
+
+class _AudioServer:
+    """子进程一侧：持有输入/输出流，按 stdin 上的命令工作"""
+
+    def __init__(self, settings: AudioIOSettings, capture: str, playback: str, status: str, control):
+        import sounddevice as sd
+        from .recorder import create_vad, resolve_input_device
+
+        self.sd = sd
+        self.settings = settings
+        self.control = control
+        self.capture = SharedAudioRing(int(settings.sample_rate * settings.capture_seconds), name=capture)
+        self.playback = SharedAudioRing(int(MAX_OUTPUT_RATE * settings.playback_seconds), name=playback)
+        self.status_shm, self.status = _attach_status(status)
+        for name in (capture, playback, status):
+            _untrack(name)
+
+        self.chunk = int(settings.sample_rate * settings.chunk_seconds)
+        self.stop = threading.Event()
+        self.gate = None
+        if settings.vad_model_path:
+            chunks = lambda seconds: int(round(seconds / settings.chunk_seconds))
+            vad = create_vad(settings.vad_model_path, sample_rate=settings.sample_rate, threshold=settings.vad_threshold)
+            self.gate = VadGate(vad, chunks(settings.pre_roll_seconds), chunks(settings.hangover_seconds))
+            self.raw = AudioRingBuffer(int(settings.sample_rate * 2))  # 输入回调 -> 门控线程
+        else:
+            self.status[_GATE_OPEN] = 1
+
+        device, name = resolve_input_device(settings.input_device or "default")
+        logging.info(f"🎙️ 音频子进程输入设备: {name} (#{device})")
+        self.input = sd.InputStream(
+            samplerate=settings.sample_rate,
+            channels=1,
+            dtype=np.float32,
+            device=device,
+            blocksize=self.chunk,
+            callback=self._on_input,
+        )
+        self.output = None
+        self.output_rate = None
+
+    # ---------- 实时回调：只做计数和拷贝 ----------
+
+    def _on_input(self, indata, frames, time_info, status):
+        if status.input_overflow:
+            self.status[_INPUT_OVERFLOWS] += 1
+        if self.status[_CAPTURING]:
+            (self.raw if self.gate is not None else self.capture).write(indata[:, 0])
+
+    def _on_output(self, outdata, frames, time_info, status):
+        if status.output_underflow:
+            self.status[_OUTPUT_UNDERFLOWS] += 1
+        self.playback.read_into(outdata[:, 0])
+
+    def _gate_loop(self):
+        block = np.zeros(self.chunk, dtype=np.float32)
+        while not self.stop.is_set():
+            if self.raw.available() < self.chunk:
+                time.sleep(self.settings.chunk_seconds / 4)
+                continue
+            self.raw.read_into(block)
+            forward = self.gate.feed(block)
+            for chunk in forward:
+                self.capture.write(chunk)
+            if not forward:
+                self.status[_GATED_CHUNKS] += 1
+            self.status[_GATE_OPEN] = int(self.gate.is_open)
+
+    def _open_output(self, rate: int) -> None:
+        if self.output is not None:
+            if self.output_rate == rate:
+                return
+            self.output.close()
+        device = self.settings.output_device
+        if isinstance(device, str) and device.isdigit():
+            device = int(device)
+        self.output = self.sd.OutputStream(
+            channels=1,
+            callback=self._on_output,
+            dtype="float32",
+            samplerate=rate,
+            device=device,
+            blocksize=self.settings.blocksize,
+            latency=self.settings.latency,
+        )
+        self.output.start()
+        self.output_rate = rate
+        logging.info(f"音频子进程输出流: {rate}Hz, latency={self.output.latency:.3f}s")
+
+    # ---------- 控制通道 ----------
+
+    def _reply(self, **fields) -> None:
+        self.control.write(json.dumps(fields) + "\n")
+        self.control.flush()
+
+    def serve(self) -> None:
+        self.input.start()
+        if self.gate is not None:
+            threading.Thread(target=self._gate_loop, name="audio-gate", daemon=True).start()
+        self._reply(ok=True, input_latency=self.input.latency)
+
+        # stdin 关闭（主进程退出）时同样结束
+        for line in sys.stdin:
+            request = json.loads(line)
+            op = request.get("op")
+            if op == "stop":
+                break
+            try:
+                if op == "output":
+                    self._open_output(int(request["rate"]))
+                    self._reply(ok=True, latency=self.output.latency)
+                else:
+                    self._reply(ok=False, error=f"未知命令: {op}")
+            except Exception as e:
+                logging.exception(f"音频子进程处理 {op} 失败")
+                self._reply(ok=False, error=str(e))
+
+        self.stop.set()
+        self.input.close()
+        if self.output is not None:
+            self.output.close()
+
+
+class AudioIOProcess:
+    """
+    主进程一侧：启动音频子进程，采集与播放的 PCM 走共享内存环形缓冲区，
+    stdin/stdout 上的 JSON 行作为控制通道。设备回调和 VAD 预门控都在子进程里运行，
+    不再和 LLM 生成线程、ONNX 会话争抢 GIL。
+    """
+
+    def __init__(self, settings: Optional[AudioIOSettings] = None):
+        self.settings = settings or AudioIOSettings()
+        s = self.settings
+        self.capture = SharedAudioRing(int(s.sample_rate * s.capture_seconds))
+        self.playback = SharedAudioRing(int(MAX_OUTPUT_RATE * s.playback_seconds))
+        self._status_shm, self.status = _attach_status()
+        self.proc = None
+        self.output_rate = None
+        self.output_latency = 0.0
+        self._lock = threading.Lock()
+
+    def start(self, timeout: float = 10.0) -> None:
+        if getattr(sys, "frozen", False):
+            raise RuntimeError("打包运行时不支持音频子进程")
+        root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+        env = dict(os.environ, PYTHONPATH=os.pathsep.join(filter(None, [root, os.environ.get("PYTHONPATH")])))
+        self.proc = subprocess.Popen(
+            [
+                sys.executable, "-m", "src.core.audio_process",
+                "--settings", json.dumps(asdict(self.settings)),
+                "--capture", self.capture.name,
+                "--playback", self.playback.name,
+                "--status", self._status_shm.name,
+            ],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            text=True,
+            env=env,
+        )
+        reply = self._recv(timeout)
+        logging.info(f"音频子进程已启动: pid={self.proc.pid}, 输入延迟 {reply['input_latency']:.3f}s")
+
+    def _recv(self, timeout: float) -> dict:
+        ready, _, _ = select.select([self.proc.stdout], [], [], timeout)
+        line = self.proc.stdout.readline() if ready else ""
+        if not line:
+            raise RuntimeError(f"音频子进程无响应 (exit={self.proc.poll()})")
+        reply = json.loads(line)
+        if not reply.get("ok"):
+            raise RuntimeError(f"音频子进程出错: {reply.get('error')}")
+        return reply
+
+    def _call(self, op: str, timeout: float = 5.0, **fields) -> dict:
+        with self._lock:
+            self.proc.stdin.write(json.dumps({"op": op, **fields}) + "\n")
+            self.proc.stdin.flush()
+            return self._recv(timeout)
+
+    # ---------- 播放 ----------
+
+    def set_output_rate(self, rate: int) -> None:
+        """按 TTS 采样率打开（或重建）子进程的输出流"""
+        if rate == self.output_rate:
+            return
+        if rate > MAX_OUTPUT_RATE:
+            raise ValueError(f"输出采样率超过 {MAX_OUTPUT_RATE}Hz: {rate}")
+        self.playback.clear()
+        reply = self._call("output", rate=rate)
+        self.output_rate = rate
+        self.output_latency = reply["latency"]
+
+    # ---------- 采集 ----------
+
+    @property
+    def gate_open(self) -> bool:
+        return bool(self.status[_GATE_OPEN])
+
+    def start_capture(self) -> None:
+        self.capture.clear()  # 丢掉上次停止后残留的数据，在下一次 read 时生效
+        self.status[_CAPTURING] = 1
+
+    def stop_capture(self) -> None:
+        self.status[_CAPTURING] = 0
+
+    def read(self, out: np.ndarray, timeout: float) -> int:
+        """等到能读满 out 或超时；返回读到的样本数，超时（门控关闭、设备无数据）返回 0"""
+        deadline = time.monotonic() + timeout
+        while self.capture.available() < len(out):
+            if time.monotonic() >= deadline:
+                return 0
+            time.sleep(0.005)
+        return self.capture.read_into(out)
+
+    @contextmanager
+    def capture_stream(self, callback: Callable, blocksize: int):
+        """
+        用法同 sd.InputStream(callback=...)：后台线程按 blocksize 读采集环并调用 callback，
+        callback 抛出 CallbackStop 时结束。门控关闭期间按实时节奏补静音块，断句计时照常推进。
+        """
+        stop = threading.Event()
+        block = np.zeros((blocksize, 1), dtype=np.float32)
+        period = blocksize / self.settings.sample_rate
+
+        def pump():
+            while not stop.is_set():
+                # 门控放行时数据会按周期到达，多等一会儿，避免抖动被当成静音
+                if self.read(block[:, 0], timeout=period * (3 if self.gate_open else 1)) == 0:
+                    block[:] = 0
+                try:
+                    callback(block, blocksize, None, None)
+                except Exception as e:
+                    if type(e).__name__ != "CallbackStop":
+                        logging.exception("采集回调出错")
+                    return
+
+        self.start_capture()
+        thread = threading.Thread(target=pump, name="audio-capture", daemon=True)
+        thread.start()
+        try:
+            yield thread
+        finally:
+            stop.set()
+            thread.join()
+            self.stop_capture()
+
+    # ---------- 状态 ----------
+
+    def stats(self) -> dict:
+        return {
+            "capture_overruns": self.capture.overruns,    # 主进程没来得及读而丢弃的样本数
+            "playback_underruns": self.playback.underruns,
+            "input_overflows": int(self.status[_INPUT_OVERFLOWS]),
+            "output_underflows": int(self.status[_OUTPUT_UNDERFLOWS]),
+            "gated_chunks": int(self.status[_GATED_CHUNKS]),
+        }
+
+    def stop(self) -> None:
+        if self.proc is not None and self.proc.poll() is None:
+            try:
+                self.proc.stdin.write(json.dumps({"op": "stop"}) + "\n")
+                self.proc.stdin.close()
+                self.proc.wait(timeout=3)
+            except (OSError, subprocess.TimeoutExpired):
+                self.proc.kill()
+        self.capture.close()
+        self.playback.close()
+        self.status = None
+        self._status_shm.close()
+        self._status_shm.unlink()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="音频 I/O 子进程，由 AudioIOProcess 启动")
+    parser.add_argument("--settings", required=True, help="AudioIOSettings 的 JSON")
+    parser.add_argument("--capture", required=True)
+    parser.add_argument("--playback", required=True)
+    parser.add_argument("--status", required=True)
+    args = parser.parse_args()
+
+    # 控制通道独占原来的 stdout，其余输出（包括 C++ 库直接写 fd 1 的日志）都转到 stderr
+    control = os.fdopen(os.dup(1), "w")
+    os.dup2(2, 1)
+    sys.stdout = sys.stderr
+
+    setup_logging(fmt="%(asctime)s - audio - %(levelname)s - %(message)s")
+    settings = AudioIOSettings(**json.loads(args.settings))
+    _AudioServer(settings, args.capture, args.playback, args.status, control).serve()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,326 @@
+import time
+import queue
+import inspect
+import logging
+import threading
+from dataclasses import dataclass, field
+from typing import Callable, List, Optional
+
+import torch
+
+from .generation import GenerationController
+
+try:
+    from transformers import DynamicCache
+except ImportError:
+    DynamicCache = None
+
+
+# ---------- KV cache 工具 ----------
+# 统一转换成 legacy 格式 ((k, v), ...) 处理；MiniMind 与 HF 模型的序列维度不同，构造时探测一次
+
+def to_legacy(cache):
+    if hasattr(cache, "to_legacy_cache"):
+        return cache.to_legacy_cache()
+    return tuple((k, v) for k, v in cache)
+
+
+def from_legacy(legacy, like):
+    """转换回模型返回的缓存类型"""
+    if DynamicCache is not None and isinstance(like, DynamicCache):
+        return DynamicCache.from_legacy_cache(legacy)
+    return legacy
+
+
+def detect_seq_dim(legacy, length: int) -> int:
+    k = legacy[0][0]
+    # HF 标准为 (batch, heads, seq, dim)，MiniMind 为 (batch, seq, heads, dim)
+    if k.shape[2] == length:
+        return 2
+    if k.shape[1] == length:
+        return 1
+    raise ValueError(f"无法确定 KV cache 的序列维度: {tuple(k.shape)}, length={length}")
+
+
+def crop_cache(legacy, length: int, seq_dim: int):
+    return tuple((k.narrow(seq_dim, 0, length), v.narrow(seq_dim, 0, length)) for k, v in legacy)
+
+
+def _left_pad(t: torch.Tensor, pad: int, dim: int) -> torch.Tensor:
+    if pad <= 0:
+        return t
+    shape = list(t.shape)
+    shape[dim] = pad
+    return torch.cat([t.new_zeros(shape), t], dim=dim)
+
+
+def merge_caches(a, mask_a: torch.Tensor, b, mask_b: torch.Tensor, seq_dim: int):
+    """把两批 KV cache 左侧补齐到同一长度后按 batch 维拼接"""
+    len_a, len_b = mask_a.shape[1], mask_b.shape[1]
+    target = max(len_a, len_b)
+    merged = tuple(
+        (
+            torch.cat([_left_pad(ka, target - len_a, seq_dim), _left_pad(kb, target - len_b, seq_dim)], dim=0),
+            torch.cat([_left_pad(va, target - len_a, seq_dim), _left_pad(vb, target - len_b, seq_dim)], dim=0),
+        )
+        for (ka, va), (kb, vb) in zip(a, b)
+    )
+    mask = torch.cat([_left_pad(mask_a, target - len_a, 1), _left_pad(mask_b, target - len_b, 1)], dim=0)
+    return merged, mask
+
+
+def select_rows(legacy, rows: torch.Tensor):
+    return tuple((k.index_select(0, rows), v.index_select(0, rows)) for k, v in legacy)
+
+
+# ---------- 采样 ----------
+
+def sample_tokens(
+    logits: torch.Tensor,
+    history: List[List[int]],
+    temperature: float,
+    top_p: float,
+    repetition_penalty: float = 1.0,
+) -> torch.Tensor:
+    """对 (batch, vocab) 的 logits 按行做重复惩罚 + 温度 + top-p 采样，返回 (batch,) 的 token"""
+    logits = logits.float()
+    if repetition_penalty != 1.0:
+        for row, tokens in enumerate(history):
+            if tokens:
+                idx = torch.tensor(sorted(set(tokens)), device=logits.device)
+                score = logits[row, idx]
+                logits[row, idx] = torch.where(score < 0, score * repetition_penalty, score / repetition_penalty)
+    if temperature <= 0:
+        return logits.argmax(dim=-1)
+    probs = torch.softmax(logits / temperature, dim=-1)
+    if top_p < 1.0:
+        sorted_probs, sorted_idx = probs.sort(dim=-1, descending=True)
+        drop = sorted_probs.cumsum(dim=-1) - sorted_probs > top_p
+        sorted_probs[drop] = 0.0
+        probs = torch.zeros_like(probs).scatter_(-1, sorted_idx, sorted_probs)
+    return torch.multinomial(probs, 1).squeeze(-1)
+
+
+class IncrementalDecoder:
+    """逐 token 解码成文本增量；多字节字符未完整时先不输出"""
+
+    def __init__(self, tokenizer):
+        self.tokenizer = tokenizer
+        self.tokens: List[int] = []
+        self.text = ""
+
+    def push(self, token: int) -> str:
+        self.tokens.append(token)
+        text = self.tokenizer.decode(self.tokens, skip_special_tokens=True)
+        if text.endswith("�"):
+            return ""
+        delta = text[len(self.text):]
+        self.text = text
+        return delta
+
+
+# ---------- 连续批处理 ----------
+
+@dataclass
+class BatchRequest:
+    prompt_ids: torch.Tensor  # (seq,)
+    on_delta: Callable[[str], None]
+    on_done: Optional[Callable[[str], None]] = None
+    max_new_tokens: int = 128
+    decoder: Optional[IncrementalDecoder] = None
+    controller: Optional[GenerationController] = None
+    submitted: float = field(default_factory=time.time)
+    # 重复惩罚作用的 token：与 model.generate 一样包含 prompt 和已生成的部分
+    recent: List[int] = field(default_factory=list)
+    text: str = ""  # 已经输出的文字
+    cancelled: threading.Event = field(default_factory=threading.Event)
+
+    def cancel(self) -> None:
+        """请求方不再需要输出时调用，下一步解码时移出批次"""
+        self.cancelled.set()
+
+
+class ContinuousBatcher:
+    """
+    多会话共享一个模型的解码循环：每一步对所有活跃请求做一次批量前向，
+    新请求在步与步之间单独预填充后并入批次，完成的请求立即移出，不必等整批结束。
+    """
+
+    def __init__(self, llm, max_batch: int = 4):
+        self.llm = llm
+        self.tokenizer = llm.tokenizer
+        self.config = llm.config
+        self.max_batch = max_batch
+
+        llm.ensure_loaded()
+        params = inspect.signature(llm.model.forward).parameters
+        self._pass_position_ids = "position_ids" in params
+        self._pass_attention_mask = "attention_mask" in params
+        if max_batch > 1 and not self._pass_attention_mask:
+            # 左侧补齐的位置无法被屏蔽，只能逐条解码
+            logging.warning("模型 forward 不接受 attention_mask，连续批处理不生效，批大小退化为 1")
+            self.max_batch = 1
+        elif max_batch > 1:
+            # 不能传 position_ids 的模型（如 MiniMind）按 KV 长度推算位置，补齐的行整体后移若干位；
+            # RoPE 的注意力只取决于相对位置，整行平移不改变输出，左侧补齐 + attention_mask 就够了
+            logging.info(f"连续批处理: 最大批大小 {max_batch}, "
+                         f"位置 {'按 attention_mask 计算' if self._pass_position_ids else '由模型按 KV 长度推算（RoPE）'}")
+
+        self._pending: "queue.Queue[BatchRequest]" = queue.Queue()
+        self._active: List[BatchRequest] = []
+        self._cache = None
+        self._cache_like = None
+        self._seq_dim = None
+        self._mask: Optional[torch.Tensor] = None
+        self._next: Optional[torch.Tensor] = None
+
+        self.steps = 0
+        self.generated_tokens = 0
+        self.batch_size_sum = 0
+
+        self._thread = threading.Thread(target=self._loop, name="llm-batcher", daemon=True)
+        self._thread.start()
+
+    def submit(self, prompt: str, on_delta: Callable[[str], None], on_done: Optional[Callable[[str], None]] = None,
+               messages=None) -> BatchRequest:
+        text = self.llm._prepare_input(prompt, messages)
+        ids = self.tokenizer(text, return_tensors="pt", truncation=True).input_ids[0].to(self.config.device)
+        req = BatchRequest(
+            prompt_ids=ids,
+            on_delta=on_delta,
+            on_done=on_done,
+            max_new_tokens=self.config.max_new_tokens,
+            decoder=IncrementalDecoder(self.tokenizer),
+            controller=GenerationController(self.config.limits),
+            recent=ids.tolist(),
+        )
+        self._pending.put(req)
+        return req
+
+    @property
+    def model(self):
+        # 低内存模式下 LLM 可能在空闲时被卸载，每次从客户端取当前的模型
+        return self.llm.model
+
+    @property
+    def mean_batch_size(self) -> float:
+        return self.batch_size_sum / self.steps if self.steps else 0.0
+
+    def _loop(self) -> None:
+        while True:
+            if not self._active:
+                self._try_admit(self._pending.get())
+            while len(self._active) < self.max_batch:
+                try:
+                    self._try_admit(self._pending.get_nowait())
+                except queue.Empty:
+                    break
+            if not self._active:
+                continue
+            try:
+                self._step()
+            except Exception as e:
+                logging.error(f"批量解码出错: {e}")
+                active = self._active
+                self._active, self._cache, self._mask, self._next = [], None, None, None
+                for req in active:
+                    self._fail(req, e)
+
+    def _try_admit(self, req: BatchRequest) -> None:
+        # 单个请求加载/预填充失败（内存不足、分词出错等）只结束它自己，已在批次中的请求不受影响
+        try:
+            self.llm.ensure_loaded()
+            self._admit(req)
+        except Exception as e:
+            logging.error(f"请求预填充出错: {e}")
+            self._fail(req, e)
+
+    def _fail(self, req: BatchRequest, error: Exception) -> None:
+        try:
+            req.on_delta(f"[ERROR] {error}")
+        finally:
+            self._finish(req)
+
+    @torch.no_grad()
+    def _forward(self, input_ids, attention_mask, past_key_values=None):
+        kwargs = {"use_cache": True}
+        if past_key_values is not None:
+            kwargs["past_key_values"] = from_legacy(past_key_values, self._cache_like)
+        if self._pass_attention_mask:
+            kwargs["attention_mask"] = attention_mask
+        if self._pass_position_ids:
+            position_ids = attention_mask.long().cumsum(-1) - 1
+            kwargs["position_ids"] = position_ids.clamp(min=0)[:, -input_ids.shape[1]:]
+        out = self.model(input_ids, **kwargs)
+        return out.logits[:, -1, :], out.past_key_values
+
+    def _admit(self, req: BatchRequest) -> None:
+        ids = req.prompt_ids.unsqueeze(0)
+        mask = torch.ones_like(ids)
+        logits, cache = self._forward(ids, mask)
+        self._cache_like = cache
+        legacy = to_legacy(cache)
+        if self._seq_dim is None:
+            self._seq_dim = detect_seq_dim(legacy, ids.shape[1])
+
+        token = sample_tokens(logits, [req.recent], self.config.temperature, self.config.top_p,
+                              self.config.repetition_penalty)
+        if not self._emit(req, int(token[0])):
+            return
+        if not self._active:
+            self._cache, self._mask, self._next = legacy, mask, token.view(1, 1)
+        else:
+            self._cache, self._mask = merge_caches(self._cache, self._mask, legacy, mask, self._seq_dim)
+            self._next = torch.cat([self._next, token.view(1, 1)], dim=0)
+        self._active.append(req)
+
+    def _step(self) -> None:
+        mask = torch.cat([self._mask, self._mask.new_ones((self._mask.shape[0], 1))], dim=1)
+        logits, cache = self._forward(self._next, mask, self._cache)
+        self._cache_like = cache
+        self._cache, self._mask = to_legacy(cache), mask
+
+        history = [req.recent for req in self._active]
+        tokens = sample_tokens(logits, history, self.config.temperature, self.config.top_p,
+                               self.config.repetition_penalty)
+        self.steps += 1
+        self.batch_size_sum += len(self._active)
+
+        keep = []
+        for row, req in enumerate(self._active):
+            if self._emit(req, int(tokens[row])):
+                keep.append(row)
+        if len(keep) < len(self._active):
+            rows = torch.tensor(keep, dtype=torch.long, device=self._mask.device)
+            self._active = [self._active[i] for i in keep]
+            if self._active:
+                self._cache = select_rows(self._cache, rows)
+                self._mask = self._mask.index_select(0, rows)
+                tokens = tokens.index_select(0, rows)
+            else:
+                self._cache, self._mask = None, None
+        self._next = tokens.view(-1, 1) if self._active else None
+
+    def _emit(self, req: BatchRequest, token: int) -> bool:
+        """输出一个 token，返回该请求是否继续生成"""
+        done = token == self.tokenizer.eos_token_id or req.cancelled.is_set()
+        delta = ""
+        if not done:
+            self.generated_tokens += 1
+            req.recent.append(token)
+            delta = req.decoder.push(token)
+            done = len(req.decoder.tokens) >= req.max_new_tokens or (
+                req.controller is not None and req.controller.check(req.decoder.tokens, req.decoder.text))
+        if req.controller is not None:
+            # 压住最后一个 n-gram 窗口，复读的部分不会流到 TTS
+            delta = req.controller.release(req.decoder.text, final=done)
+        if delta:
+            req.text += delta
+            req.on_delta(delta)
+        if done:
+            self._finish(req)
+        return not done
+
+    def _finish(self, req: BatchRequest) -> None:
+        if req.on_done is not None:
+            req.on_done(req.text)
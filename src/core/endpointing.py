@@ -0,0 +1,75 @@
+import re
+import math
+from dataclasses import dataclass
+from typing import Optional
+
+import numpy as np
+
+# SenseVoice 开了 ITN 后几乎每段部分转写末尾都带句号，不能据此判断说完了，先去掉再看内容
+_ITN_TAIL_RE = re.compile(r"[。.]+$")
+# 问号、感叹号或句末语气词：孩子一句话已经说完
+_COMPLETE_RE = re.compile(r"([？?！!…~～]|[吗呢吧嘛啦呀哦喔了啊])$")
+# 问句：疑问词后面还跟着内容（“小兔子为什么爱吃胡萝卜”），只说到疑问词为止的不算
+_QUESTION_RE = re.compile(r"(什么|为什么|怎么|哪|谁|几|多少).+$")
+# 句中停顿：逗号、连接词、结构助词、量词，后面大概率还有话
+_MID_CLAUSE_RE = re.compile(r"([，,、：:]|和|跟|还有|但是|可是|然后|因为|所以|如果|的|是|在|要|想|把|给|[一这那哪几]个|就是)$")
+
+
+@dataclass
+class EndpointConfig:
+    base_silence: float = 1.0     # 无法判断时的静音超时（秒），等同原来固定的 silence_duration
+    min_silence: float = 0.4      # 部分转写已是完整句子时的静音超时
+    max_silence: float = 1.6      # 部分转写停在句中时的静音超时
+    vad_threshold: float = 0.5
+    min_vad_threshold: float = 0.35
+    max_vad_threshold: float = 0.7
+    quiet_db: float = -60.0       # 噪声底低于该值时使用 min_vad_threshold
+    noisy_db: float = -30.0       # 噪声底高于该值时使用 max_vad_threshold
+    noise_alpha: float = 0.05     # 噪声底滑动平均系数
+
+
+class NoiseFloorTracker:
+    """对非语音块的 RMS 做对数域指数滑动平均，得到当前环境的噪声底"""
+
+    def __init__(self, alpha: float = 0.05, initial_db: float = -50.0):
+        self.alpha = alpha
+        self.level_db = initial_db
+
+    def update(self, chunk: np.ndarray) -> float:
+        rms = float(np.sqrt(np.mean(np.square(chunk, dtype=np.float32)))) if len(chunk) else 0.0
+        return self.update_db(20.0 * math.log10(max(rms, 1e-6)))
+
+    def update_db(self, db: float, alpha: Optional[float] = None) -> float:
+        self.level_db += (self.alpha if alpha is None else alpha) * (db - self.level_db)
+        return self.level_db
+
+
+class AdaptiveEndpointer:
+    """
+    自适应断句：根据部分转写是否已构成完整句子调整尾部静音超时，
+    并根据噪声底调整 VAD 阈值（安静时更灵敏，嘈杂时更保守）
+    """
+
+    def __init__(self, config: Optional[EndpointConfig] = None):
+        self.config = config or EndpointConfig()
+        self.noise = NoiseFloorTracker(self.config.noise_alpha)
+
+    def silence_timeout(self, partial_text: Optional[str]) -> float:
+        cfg = self.config
+        text = _ITN_TAIL_RE.sub("", (partial_text or "").strip())
+        if not text:
+            return cfg.base_silence
+        if _MID_CLAUSE_RE.search(text):
+            return cfg.max_silence
+        if _COMPLETE_RE.search(text) or _QUESTION_RE.search(text):
+            return cfg.min_silence
+        return cfg.base_silence
+
+    def observe_noise(self, chunk: np.ndarray) -> None:
+        self.noise.update(chunk)
+
+    def vad_threshold(self) -> float:
+        cfg = self.config
+        span = cfg.noisy_db - cfg.quiet_db
+        ratio = min(max((self.noise.level_db - cfg.quiet_db) / span, 0.0), 1.0)
+        return cfg.min_vad_threshold + ratio * (cfg.max_vad_threshold - cfg.min_vad_threshold)
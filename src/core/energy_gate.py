@@ -0,0 +1,109 @@
+from collections import deque
+from dataclasses import dataclass
+from typing import Optional, Tuple
+
+import numpy as np
+
+from .endpointing import NoiseFloorTracker
+
+
+@dataclass
+class EnergyGateConfig:
+    frame_seconds: float = 0.02    # 特征帧长，一个 100ms 块切成 5 帧一起算
+    open_margin_db: float = 10.0   # 帧能量高于噪声底多少 dB 算有声
+    hold_margin_db: float = 4.0    # 打开后，高于噪声底这么多仍算有声（迟滞）
+    min_level_db: float = -55.0    # 低于该绝对电平一律当静音
+    fricative_zcr: float = 0.3     # 能量只高出一半余量、但过零率这么高的帧（擦音起始）也算有声
+    hold_seconds: float = 1.0      # 最后一个有声帧之后保持打开的时长
+    lookback_seconds: float = 0.5  # 打开时补给下游的历史音频，避免切掉语音开头
+    noise_alpha: float = 0.05
+    open_noise_alpha: float = 0.01   # 打开期间用最安静的帧缓慢更新噪声底，持续噪声不会让门一直开着
+
+
+def frame_features(chunk: np.ndarray, frame: int) -> Tuple[np.ndarray, np.ndarray]:
+    """按帧计算 RMS（dB）与过零率，整块一次向量化完成"""
+    n = max(len(chunk) // frame, 1)
+    frames = chunk[:n * frame].reshape(n, -1)
+    rms = np.sqrt(np.mean(np.square(frames, dtype=np.float32), axis=1))
+    db = 20.0 * np.log10(np.maximum(rms, 1e-6))
+    signs = np.signbit(frames)
+    zcr = np.count_nonzero(signs[:, 1:] != signs[:, :-1], axis=1) / max(frames.shape[1] - 1, 1)
+    return db, zcr
+
+
+class EnergyGate:
+    """
+    VAD/KWS 前的能量 + 过零率预门控。安静时只做几次向量运算就丢弃音频，
+    有声时打开，并把 lookback 内的历史音频一并交给 Silero VAD 或唤醒词模型。
+    """
+
+    def __init__(self, config: Optional[EnergyGateConfig] = None, sample_rate: int = 16000):
+        self.config = config or EnergyGateConfig()
+        self.sample_rate = sample_rate
+        self.frame = max(int(sample_rate * self.config.frame_seconds), 2)
+        self.noise = NoiseFloorTracker(self.config.noise_alpha)
+        self.is_open = False
+        self._hold = 0.0
+        self._lookback = deque()
+        self._lookback_len = 0
+        self.chunks = 0
+        self.passed = 0
+
+    @property
+    def duty_cycle(self) -> float:
+        """交给下游处理的块占比"""
+        return self.passed / self.chunks if self.chunks else 0.0
+
+    def reset(self) -> None:
+        self.is_open = False
+        self._hold = 0.0
+        self._lookback.clear()
+        self._lookback_len = 0
+
+    def _remember(self, chunk: np.ndarray) -> None:
+        self._lookback.append(chunk.copy())
+        self._lookback_len += len(chunk)
+        limit = int(self.config.lookback_seconds * self.sample_rate)
+        while self._lookback and self._lookback_len - len(self._lookback[0]) >= limit:
+            self._lookback_len -= len(self._lookback.popleft())
+
+    def push(self, chunk: np.ndarray) -> Optional[np.ndarray]:
+        """
+        送入一块音频。门关闭时返回 None；刚打开时返回 lookback + 本块，
+        保持打开时返回本块。
+        """
+        cfg = self.config
+        self.chunks += 1
+        db, zcr = frame_features(chunk, self.frame)
+        floor = self.noise.level_db
+        margin = cfg.hold_margin_db if self.is_open else cfg.open_margin_db
+        audible = db > max(floor + margin, cfg.min_level_db)
+        fricative = (db > max(floor + margin / 2, cfg.min_level_db)) & (zcr >= cfg.fricative_zcr)
+        active = bool(np.any(audible | fricative))
+
+        if chunk.any():  # 全零的补齐块（例如门控子进程补的静音）不更新噪声底
+            if not active:
+                self.noise.update(chunk)
+            else:
+                self.noise.update_db(float(db.min()), cfg.open_noise_alpha)
+
+        duration = len(chunk) / self.sample_rate
+        if active:
+            self._hold = cfg.hold_seconds
+        else:
+            self._hold -= duration
+
+        if self._hold > 0:
+            if not self.is_open:
+                self.is_open = True
+                out = np.concatenate([*self._lookback, chunk]) if self._lookback else chunk
+                self._lookback.clear()
+                self._lookback_len = 0
+                self.passed += 1
+                return out
+            self.passed += 1
+            return chunk
+
+        self.is_open = False
+        self._remember(chunk)
+        return None
@@ -0,0 +1,117 @@
+import re
+import time
+import logging
+from dataclasses import dataclass
+from typing import List, Optional
+
+# 句末标点；英文句点两侧是数字时（小数）不算
+_SENTENCE_END_RE = re.compile(r"[。！？!?…]+|(?<!\d)\.(?!\d)")
+_BOUNDARY_RE = re.compile(r"(?:[。！？!?…]|(?<!\d)\.)$")
+_CLOSING = "\"'”’」』）)"
+_LATIN_WORD_RE = re.compile(r"[A-Za-z]+|\d+")
+
+
+def _is_cjk(ch: str) -> bool:
+    return "一" <= ch <= "鿿" or "㐀" <= ch <= "䶿"
+
+
+def count_sentences(text: str) -> int:
+    return len(_SENTENCE_END_RE.findall(text))
+
+
+def at_sentence_boundary(text: str) -> bool:
+    return _BOUNDARY_RE.search(text.rstrip().rstrip(_CLOSING)) is not None
+
+
+def estimate_speech_seconds(text: str, chars_per_second: float) -> float:
+    """按朗读速度粗估时长：汉字一字一音节，英文单词/数字按 1.5 个音节"""
+    cjk = sum(1 for ch in text if _is_cjk(ch))
+    latin = len(_LATIN_WORD_RE.findall(text))
+    return (cjk + 1.5 * latin) / chars_per_second
+
+
+@dataclass
+class GenerationLimits:
+    max_sentences: int = 3            # 说完这么多句就停
+    max_speech_seconds: float = 20.0  # 估计朗读时长超过后在下一个句末停
+    chars_per_second: float = 5.0     # TTS 朗读速度（speed=1.3 时约 5 字/秒）
+    latency_budget: float = 10.0      # 从开始生成起的秒数，超过后在下一个句末停
+    hard_factor: float = 1.5          # 超过上面两个上限的这个倍数时不等句末直接停
+    repeat_ngram: int = 4             # 检测重复的 n-gram 长度（token）
+    max_ngram_repeats: int = 2        # 同一个 n-gram 出现超过这么多次视为复读
+
+
+class GenerationController:
+    """
+    决定一轮回答何时结束：优先停在句末，复读立即停。
+    解码时每出一个 token 调用一次 check，返回 True 表示不再继续生成。
+    流式输出经 release() 取出：最后 repeat_ngram - 1 个 token 的文字先压住，
+    复读被检测到时，构成重复的那个 n-gram 不会送到 TTS。
+    """
+
+    def __init__(self, limits: Optional[GenerationLimits] = None):
+        self.limits = limits or GenerationLimits()
+        self.started = time.monotonic()
+        self.stop_reason: Optional[str] = None
+        self._lengths: List[int] = []  # 每次 check 时的文本长度
+        self._released = 0
+
+    def reset(self) -> None:
+        self.started = time.monotonic()
+        self.stop_reason = None
+        self._lengths = []
+        self._released = 0
+
+    def _repeating(self, tokens: List[int]) -> bool:
+        n = self.limits.repeat_ngram
+        if len(tokens) < n * (self.limits.max_ngram_repeats + 1):
+            return False
+        tail = tokens[-n:]
+        count = sum(1 for i in range(len(tokens) - n + 1) if tokens[i:i + n] == tail)
+        return count > self.limits.max_ngram_repeats
+
+    def check(self, tokens: List[int], text: str) -> bool:
+        """tokens/text 为本轮已生成的全部内容"""
+        limits = self.limits
+        self._lengths.append(len(text))
+        elapsed = time.monotonic() - self.started
+        speech = estimate_speech_seconds(text, limits.chars_per_second)
+
+        reason = None
+        if self._repeating(tokens):
+            reason = "repetition"
+        elif at_sentence_boundary(text):
+            if count_sentences(text) >= limits.max_sentences:
+                reason = "sentences"
+            elif speech >= limits.max_speech_seconds:
+                reason = "speech"
+            elif elapsed >= limits.latency_budget:
+                reason = "latency"
+        elif speech >= limits.max_speech_seconds * limits.hard_factor:
+            reason = "speech_hard"
+        elif elapsed >= limits.latency_budget * limits.hard_factor:
+            reason = "latency_hard"
+
+        if reason is not None:
+            self.stop_reason = reason
+            logging.info(f"生成提前结束: {reason}（{len(tokens)} tokens, {elapsed:.1f}秒, 估计朗读 {speech:.1f}秒）")
+            return True
+        return False
+
+    def release(self, text: str, final: bool = False) -> str:
+        """
+        返回 text 中可以输出、且上次还没输出的部分；生成结束时以 final=True 取出剩下的。
+        因复读停止时，最后一个 n-gram 的文字永远不会输出。
+        """
+        n = self.limits.repeat_ngram
+        if self.stop_reason == "repetition":
+            end = self._lengths[-n - 1] if len(self._lengths) > n else 0
+        elif final or self.stop_reason is not None:
+            end = len(text)
+        else:
+            end = self._lengths[-n] if len(self._lengths) >= n else 0
+        if end <= self._released:
+            return ""
+        delta = text[self._released:end]
+        self._released = end
+        return delta
@@ -0,0 +1,220 @@
+import os
+import glob
+import time
+import logging
+import threading
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional, Tuple
+
+import psutil
+
+# 负载/温度自适应的质量调节：板子发热降频、或其他进程抢 CPU 时，LLM 出字和 TTS 合成都会变慢，
+# 回答会卡住。这里定时采样外部 CPU 负载、SoC 温度和各环节的 RTF，有压力时逐档降到更便宜的设置，
+# 有余量时再逐档升回去；降档快、升档慢，两个方向的阈值之间留出回差，避免来回切换。
+
+THERMAL_GLOB = "/sys/class/thermal/thermal_zone*/temp"
+
+
+@dataclass
+class QualityLevel:
+    name: str
+    max_new_tokens: int
+    llm_model: str
+    tts_threads: Optional[int] = None  # None 为全部核心
+    denoise: bool = True               # 录音结束后是否做降噪
+
+    def settings(self) -> Tuple:
+        return (self.max_new_tokens, self.llm_model, self.tts_threads, self.denoise)
+
+
+@dataclass
+class GovernorConfig:
+    interval: float = 2.0       # 采样间隔（秒）
+    cpu_high: float = 70.0      # 其他进程占用的 CPU 百分比（占全部核心）
+    cpu_low: float = 30.0
+    temp_high: float = 75.0     # ℃
+    temp_low: float = 65.0
+    rtf_high: float = 0.9       # 任一环节 RTF 超过该值，生成/合成就快赶不上播放了
+    rtf_low: float = 0.5
+    rtf_max_age: float = 60.0   # 超过该时长没有更新的 RTF 不再参与判断
+    down_after: int = 2         # 连续几次采样有压力才降档
+    up_after: int = 15          # 连续几次采样都有余量才升档
+
+
+# ---- 各环节的 RTF：LLM/TTS 每完成一次就记录，指数平均 ----
+
+_rtf: Dict[str, Tuple[float, float]] = {}  # 环节 -> (平均 RTF, 更新时间)
+_rtf_lock = threading.Lock()
+
+
+def record_rtf(stage: str, rtf: float, alpha: float = 0.3) -> None:
+    now = time.monotonic()
+    with _rtf_lock:
+        prev = _rtf.get(stage)
+        value = rtf if prev is None else prev[0] + alpha * (rtf - prev[0])
+        _rtf[stage] = (value, now)
+
+
+def stage_rtfs(max_age: Optional[float] = None) -> Dict[str, float]:
+    now = time.monotonic()
+    with _rtf_lock:
+        return {k: v for k, (v, t) in _rtf.items() if max_age is None or now - t <= max_age}
+
+
+def reset_rtf() -> None:
+    """换档后清空，旧设置下测得的 RTF 不再作数"""
+    with _rtf_lock:
+        _rtf.clear()
+
+
+def read_temperature(pattern: str = THERMAL_GLOB) -> Optional[float]:
+    """所有 thermal zone 中的最高温度（℃），读不到时返回 None"""
+    temps = []
+    for path in glob.glob(pattern):
+        try:
+            with open(path) as f:
+                value = int(f.read().strip()) / 1000.0
+        except (OSError, ValueError):
+            continue
+        if 0 < value < 150:  # 有些 zone 没接传感器，读出 0 或异常值
+            temps.append(value)
+    return max(temps) if temps else None
+
+
+@dataclass
+class GovernorSample:
+    cpu: float                        # 其他进程的 CPU 占用（%）
+    temperature: Optional[float]
+    rtf: Dict[str, float] = field(default_factory=dict)
+
+    def pressure(self, config: GovernorConfig) -> Optional[str]:
+        """有压力时返回原因"""
+        if self.temperature is not None and self.temperature >= config.temp_high:
+            return f"温度 {self.temperature:.1f}℃"
+        if self.cpu >= config.cpu_high:
+            return f"外部 CPU {self.cpu:.0f}%"
+        for stage, rtf in self.rtf.items():
+            if rtf >= config.rtf_high:
+                return f"{stage} RTF {rtf:.2f}"
+        return None
+
+    def headroom(self, config: GovernorConfig) -> bool:
+        return (
+            (self.temperature is None or self.temperature <= config.temp_low)
+            and self.cpu <= config.cpu_low
+            and all(rtf <= config.rtf_low for rtf in self.rtf.values())
+        )
+
+    def describe(self) -> str:
+        temp = f"{self.temperature:.1f}℃" if self.temperature is not None else "-"
+        rtf = " ".join(f"{k}={v:.2f}" for k, v in sorted(self.rtf.items())) or "-"
+        return f"外部 CPU {self.cpu:.0f}%, 温度 {temp}, RTF {rtf}"
+
+
+class QualityGovernor:
+    """
+    levels 从高质量到低质量排列，apply 在换档时被调用（在调节线程里）。
+    update() 是纯逻辑，可以直接喂采样结果；start() 启动后台线程定时 sample() + update()。
+    """
+
+    def __init__(
+        self,
+        levels: List[QualityLevel],
+        apply: Callable[[QualityLevel], None],
+        config: Optional[GovernorConfig] = None,
+        thermal_glob: str = THERMAL_GLOB,
+    ):
+        if not levels:
+            raise ValueError("levels must not be empty")
+        # 与上一档设置完全相同的档位换过去什么也不变，却会清空 RTF、多等一轮采样，直接去掉
+        self.levels = [levels[0]]
+        for level in levels[1:]:
+            if level.settings() == self.levels[-1].settings():
+                logging.info(f"质量档位 {level.name} 与 {self.levels[-1].name} 设置相同，已跳过")
+            else:
+                self.levels.append(level)
+        self.apply = apply
+        self.config = config or GovernorConfig()
+        self.thermal_glob = thermal_glob
+        self.index = 0
+        self.changes = 0
+        self._pressure = 0
+        self._calm = 0
+        self._process = psutil.Process(os.getpid())
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def level(self) -> QualityLevel:
+        return self.levels[self.index]
+
+    def sample(self) -> GovernorSample:
+        # 本进程推理时本来就会占满 CPU，只看其他进程的占用，自己的快慢由 RTF 反映
+        total = psutil.cpu_percent(interval=None)
+        own = self._process.cpu_percent(interval=None) / (psutil.cpu_count() or 1)
+        return GovernorSample(
+            cpu=max(total - own, 0.0),
+            temperature=read_temperature(self.thermal_glob),
+            rtf=stage_rtfs(self.config.rtf_max_age),
+        )
+
+    def update(self, sample: GovernorSample) -> Optional[QualityLevel]:
+        """根据一次采样决定是否换档，换档时返回新的档位"""
+        cfg = self.config
+        reason = sample.pressure(cfg)
+        if reason is not None:
+            self._pressure += 1
+            self._calm = 0
+        elif sample.headroom(cfg):
+            self._calm += 1
+            self._pressure = 0
+        else:
+            # 介于两组阈值之间：保持当前档位，重新计数
+            self._pressure = self._calm = 0
+
+        if self._pressure >= cfg.down_after and self.index < len(self.levels) - 1:
+            return self._switch(self.index + 1, f"降档（{reason}）", sample)
+        if self._calm >= cfg.up_after and self.index > 0:
+            return self._switch(self.index - 1, "升档（负载和温度恢复）", sample)
+        return None
+
+    def _switch(self, index: int, why: str, sample: GovernorSample) -> QualityLevel:
+        old = self.level
+        self.index = index
+        self.changes += 1
+        self._pressure = self._calm = 0
+        level = self.level
+        logging.info(
+            f"质量调节 {why}: {old.name} -> {level.name} "
+            f"(max_new_tokens={level.max_new_tokens}, llm={level.llm_model}, "
+            f"tts_threads={level.tts_threads or '全部'}, denoise={level.denoise}); {sample.describe()}"
+        )
+        reset_rtf()
+        self.apply(level)
+        return level
+
+    def start(self) -> None:
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        psutil.cpu_percent(interval=None)  # 第一次调用只建立基准
+        self._process.cpu_percent(interval=None)
+        self._thread = threading.Thread(target=self._run, name="governor", daemon=True)
+        self._thread.start()
+        logging.info(f"质量调节已启动: {len(self.levels)} 档, 采样间隔 {self.config.interval:.1f}秒")
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.config.interval):
+            try:
+                self.update(self.sample())
+            except Exception:
+                logging.exception("质量调节采样失败")
+
+    def stats(self) -> Dict:
+        return {"level": self.level.name, "changes": self.changes}
@@ -0,0 +1,178 @@
+import logging
+import re
+from collections import deque
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Dict, Iterable, List, Optional, Tuple
+
+try:
+    from pypinyin import Style, lazy_pinyin
+except ImportError:  # 没有 pypinyin 时退化为按汉字精确匹配
+    lazy_pinyin = None
+
+# 模糊音：平翘舌、前后鼻音、n/l 不分，ASR 的同音误识别大多落在这里
+_FUZZY_INITIALS = (("zh", "z"), ("ch", "c"), ("sh", "s"), ("n", "l"))
+_FUZZY_FINALS = (("ang", "an"), ("eng", "en"), ("ing", "in"))
+# 唤醒词后面的标点与空白
+_KEYWORD_TAIL_RE = re.compile(r"^[\s,，.。!！?？、~～]+")
+
+
+def _is_cjk(ch: str) -> bool:
+    return "一" <= ch <= "鿿" or "㐀" <= ch <= "䶿"
+
+
+@lru_cache(maxsize=8192)
+def _syllable(ch: str, fuzzy: bool = False) -> str:
+    """单个字符 -> 归一化后的无声调拼音"""
+    if lazy_pinyin is None or not _is_cjk(ch):
+        return ch.lower()
+    py = lazy_pinyin(ch, style=Style.NORMAL)[0]
+    if not fuzzy:
+        return py
+    for src, dst in _FUZZY_INITIALS:
+        if py.startswith(src):
+            py = dst + py[len(src):]
+            break
+    for src, dst in _FUZZY_FINALS:
+        if py.endswith(src):
+            py = py[: -len(src)] + dst
+            break
+    return py
+
+
+def to_syllables(text: str, fuzzy: bool = False) -> Tuple[List[str], List[int]]:
+    """把文本切成音节序列，同时记录每个音节在原文中的字符下标（跳过标点和空白）"""
+    tokens, offsets = [], []
+    for i, ch in enumerate(text):
+        if _is_cjk(ch) or ch.isalnum():
+            tokens.append(_syllable(ch, fuzzy))
+            offsets.append(i)
+    return tokens, offsets
+
+
+@dataclass
+class KeywordMatch:
+    keyword: str
+    start: int  # 原文中的起始字符下标
+    end: int  # 原文中的结束字符下标（不含）
+    distance: int = 0  # 音节编辑距离，0 表示同音精确匹配
+
+
+def strip_keyword(text: str, match: KeywordMatch) -> str:
+    """唤醒词之后的问题；只剩一两个语气词时返回空串"""
+    rest = _KEYWORD_TAIL_RE.sub("", text[match.end:])
+    return rest if len(rest) >= 2 else ""
+
+
+class KeywordMatcher:
+    """
+    文本侧唤醒词匹配器：启动时构建一次拼音 Aho-Corasick 自动机，
+    先做同音精确匹配，未命中时对足够长的关键词做编辑距离容错匹配。
+    fuzzy_pinyin 打开后平翘舌/前后鼻音/n-l 视为相同，召回更高但误唤醒也更多。
+    """
+
+    def __init__(self, keywords: Iterable[str], max_distance: int = 1, fuzzy_pinyin: bool = False):
+        self.keywords = [kw for kw in keywords if kw]
+        self.max_distance = max_distance
+        self.fuzzy_pinyin = fuzzy_pinyin
+        self._patterns = [to_syllables(kw, fuzzy_pinyin)[0] for kw in self.keywords]
+        self._build()
+        logging.info(f"关键词匹配器: {len(self.keywords)} 个关键词, {len(self._goto)} 个状态")
+
+    def _build(self) -> None:
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._out: List[List[int]] = [[]]
+
+        for idx, pattern in enumerate(self._patterns):
+            state = 0
+            for token in pattern:
+                nxt = self._goto[state].get(token)
+                if nxt is None:
+                    nxt = len(self._goto)
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._out.append([])
+                    self._goto[state][token] = nxt
+                state = nxt
+            self._out[state].append(idx)
+
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for token, nxt in self._goto[state].items():
+                queue.append(nxt)
+                f = self._fail[state]
+                while f and token not in self._goto[f]:
+                    f = self._fail[f]
+                self._fail[nxt] = self._goto[f].get(token, 0)
+                self._out[nxt] = self._out[nxt] + self._out[self._fail[nxt]]
+
+    def match(self, text: str) -> Optional[KeywordMatch]:
+        """返回最先出现的关键词（同一位置取最长）及其在原文中的位置"""
+        if not text:
+            return None
+        tokens, offsets = to_syllables(text, self.fuzzy_pinyin)
+        found = self._match_exact(tokens)
+        if found is None and self.max_distance > 0:
+            found = self._match_fuzzy(tokens)
+        if found is None:
+            return None
+        idx, start, end, distance = found
+        return KeywordMatch(
+            keyword=self.keywords[idx],
+            start=offsets[start],
+            end=offsets[end - 1] + 1,
+            distance=distance,
+        )
+
+    def _match_exact(self, tokens: List[str]) -> Optional[Tuple[int, int, int, int]]:
+        state = 0
+        for pos, token in enumerate(tokens):
+            while state and token not in self._goto[state]:
+                state = self._fail[state]
+            state = self._goto[state].get(token, 0)
+            if self._out[state]:
+                idx = max(self._out[state], key=lambda i: len(self._patterns[i]))
+                return idx, pos + 1 - len(self._patterns[idx]), pos + 1, 0
+        return None
+
+    def _match_fuzzy(self, tokens: List[str]) -> Optional[Tuple[int, int, int, int]]:
+        best = None
+        for idx, pattern in enumerate(self._patterns):
+            # 两个音节的关键词容错 1 个音节会严重误唤醒，按长度限制容错
+            allowed = min(self.max_distance, (len(pattern) - 1) // 2)
+            if allowed <= 0:
+                continue
+            hit = _approximate_find(pattern, tokens, allowed)
+            if hit is not None and (best is None or (hit[1], hit[2]) < (best[2], best[3])):
+                best = (idx,) + hit
+        return best
+
+
+def _approximate_find(pattern: List[str], tokens: List[str], allowed: int) -> Optional[Tuple[int, int, int]]:
+    """
+    Sellers 近似子串匹配：返回最先结束的 (start, end, distance)，
+    距离不超过 allowed
+    """
+    m = len(pattern)
+    # cost[j]: pattern[:j] 与以当前位置结尾的某个子串的最小编辑距离；start[j] 为该子串起点
+    cost = list(range(m + 1))
+    start = [0] * (m + 1)
+    for pos, token in enumerate(tokens):
+        new_cost = [0] * (m + 1)
+        new_start = [pos + 1] * (m + 1)
+        for j in range(1, m + 1):
+            sub = cost[j - 1] + (pattern[j - 1] != token)
+            skip_text = cost[j] + 1
+            skip_pattern = new_cost[j - 1] + 1
+            if sub <= skip_text and sub <= skip_pattern:
+                new_cost[j], new_start[j] = sub, start[j - 1]
+            elif skip_text <= skip_pattern:
+                new_cost[j], new_start[j] = skip_text, start[j]
+            else:
+                new_cost[j], new_start[j] = skip_pattern, new_start[j - 1]
+        cost, start = new_cost, new_start
+        if cost[m] <= allowed:
+            return start[m], pos + 1, cost[m]
+    return None
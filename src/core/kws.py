@@ -4,6 +4,8 @@ import sherpa_onnx
 from pathlib import Path
 from typing import Optional, List
 from ..utils.utils import resource_path
+from .energy_gate import EnergyGate
+from .kws_keywords import KeywordEntry, keywords_arg, load_keywords
 
 import os
 import platform
@@ -31,19 +33,21 @@ class KeywordSpotter:
         decoder_path: str,
         joiner_path: str,
         keywords_file: str,
-        num_threads: int = 1,
-        provider: str = "cpu",
+        num_threads: Optional[int] = None,  # None 为全部核心；并行跑多个实例时设为 1
+        provider: Optional[str] = None,
         max_active_paths: int = 4,
         keywords_score: float = 1.0,
         keywords_threshold: float = 0.25,
         num_trailing_blanks: int = 1,
         sample_rate: int = 16000,
+        energy_gate: Optional[EnergyGate] = None,  # 门关闭时不解码，安静环境下几乎不占 CPU
+        keywords: Optional[List[KeywordEntry]] = None,  # 代替 keywords_file 中的词表，用于调 boost/threshold
     ):
         # 验证文件存在性
         self._check_files_exist([tokens_path, encoder_path, decoder_path, joiner_path, keywords_file])
 
-        num_threads = detect_num_threads()
-        provider = detect_provider()
+        num_threads = num_threads or detect_num_threads()
+        provider = provider or detect_provider()
 
         logging.info(f"Number of threads: {num_threads}")
         logging.info(f"Provider: {provider}")
@@ -64,7 +68,15 @@ class KeywordSpotter:
         )
         
         self.sample_rate = sample_rate
-        self.stream = self.keyword_spotter.create_stream()
+        self.energy_gate = energy_gate
+        # 每个唤醒词可以在文件里单独写 :boost 和 #threshold，见 kws_keywords.py
+        entries = keywords if keywords is not None else load_keywords(resource_path(keywords_file))
+        tuned = sum(1 for e in entries if e.boost is not None or e.threshold is not None)
+        logging.info(f"唤醒词: {len(entries)} 个, 其中 {tuned} 个单独设置了 boost/threshold")
+        if keywords is not None:
+            self.stream = self.keyword_spotter.create_stream(keywords_arg(keywords))
+        else:
+            self.stream = self.keyword_spotter.create_stream()
         
     def _check_files_exist(self, files: List[str]):
         for file in files:
@@ -73,6 +85,10 @@ class KeywordSpotter:
 
     def process_audio(self, audio_samples) -> Optional[str]:
         """处理音频数据并返回检测到的关键词"""
+        if self.energy_gate is not None:
+            audio_samples = self.energy_gate.push(audio_samples)
+            if audio_samples is None:
+                return None
         self.stream.accept_waveform(self.sample_rate, audio_samples)
         
         result = None
@@ -0,0 +1,76 @@
+from dataclasses import dataclass, replace
+from typing import Dict, List, Optional
+
+# sherpa-onnx 唤醒词文件的一行：音素/拼音 token，可选的 :boost（解码时给该词的加分）和
+# #threshold（触发阈值，越高越难误唤醒），最后是 @ 后的短语，例如
+#     x iǎo zh ù t óng x ué :1.5 #0.35 @小柱同学
+# 没写的项使用 KeywordSpotter 的全局 keywords_score / keywords_threshold。
+
+
+@dataclass
+class KeywordEntry:
+    tokens: str
+    phrase: str
+    boost: Optional[float] = None
+    threshold: Optional[float] = None
+
+    def line(self) -> str:
+        parts = [self.tokens]
+        if self.boost is not None:
+            parts.append(f":{self.boost:g}")
+        if self.threshold is not None:
+            parts.append(f"#{self.threshold:g}")
+        parts.append(f"@{self.phrase}")
+        return " ".join(parts)
+
+
+def parse_keyword_line(line: str) -> Optional[KeywordEntry]:
+    """解析一行，空行和 # 开头的注释返回 None；没有 @短语 时以 token 本身作为短语"""
+    line = line.strip()
+    if not line or line.startswith("#"):
+        return None
+    body, _, phrase = line.partition("@")
+    tokens, boost, threshold = [], None, None
+    for token in body.split():
+        if token.startswith(":"):
+            boost = float(token[1:])
+        elif token.startswith("#"):
+            threshold = float(token[1:])
+        else:
+            tokens.append(token)
+    if not tokens:
+        raise ValueError(f"唤醒词行缺少 token: {line}")
+    tokens = " ".join(tokens)
+    return KeywordEntry(tokens, phrase.strip() or tokens, boost, threshold)
+
+
+def load_keywords(path: str) -> List[KeywordEntry]:
+    with open(path, encoding="utf-8") as f:
+        return [entry for entry in map(parse_keyword_line, f) if entry is not None]
+
+
+def write_keywords(entries: List[KeywordEntry], path: str) -> None:
+    with open(path, "w", encoding="utf-8") as f:
+        f.writelines(entry.line() + "\n" for entry in entries)
+
+
+def with_overrides(
+    entries: List[KeywordEntry],
+    boosts: Optional[Dict[str, float]] = None,
+    thresholds: Optional[Dict[str, float]] = None,
+) -> List[KeywordEntry]:
+    """按短语覆盖 boost/threshold，返回新列表；未知短语抛出 KeyError，避免调参时拼错不生效"""
+    boosts, thresholds = boosts or {}, thresholds or {}
+    phrases = {entry.phrase for entry in entries}
+    unknown = (set(boosts) | set(thresholds)) - phrases
+    if unknown:
+        raise KeyError(f"唤醒词文件中没有: {', '.join(sorted(unknown))}")
+    return [
+        replace(entry, boost=boosts.get(entry.phrase, entry.boost), threshold=thresholds.get(entry.phrase, entry.threshold))
+        for entry in entries
+    ]
+
+
+def keywords_arg(entries: List[KeywordEntry]) -> str:
+    """KeywordSpotter.create_stream() 接受的格式：多行用 / 连接"""
+    return "/".join(entry.line() for entry in entries)
@@ -0,0 +1,46 @@
+import re
+import logging
+from typing import Optional
+
+_HAN_RE = re.compile(r"[㐀-䶿一-鿿豈-﫿]")
+_KANA_RE = re.compile(r"[぀-ヿ]")
+_HANGUL_RE = re.compile(r"[가-힯ᄀ-ᇿ]")
+_LATIN_WORD_RE = re.compile(r"[A-Za-z]+")
+
+_langid = None
+
+
+def detect_script_language(text: str) -> Optional[str]:
+    """
+    按 Unicode 文字系统粗判语言，无法判断时返回 None。
+    中文里夹几个英文单词仍判为中文：按汉字数与英文单词数比较。
+    """
+    if _KANA_RE.search(text):
+        return "ja"
+    han = len(_HAN_RE.findall(text))
+    hangul = len(_HANGUL_RE.findall(text))
+    if hangul > han:
+        return "ko"
+    latin_words = len(_LATIN_WORD_RE.findall(text))
+    if han and han >= latin_words:
+        return "zh"
+    if latin_words and not han:
+        return "en"
+    return None
+
+
+def classify_with_langid(text: str) -> str:
+    """langid 模型较大，只在启发式规则无法判断时才按需加载"""
+    global _langid
+    if _langid is None:
+        import langid
+        logging.info("加载 langid 语言识别模型")
+        _langid = langid
+    return _langid.classify(text)[0].strip().lower()
+
+
+def detect_language(text: str, hint: Optional[str] = None) -> str:
+    """优先使用识别器输出的语言标签，其次文字系统启发式，最后才用 langid"""
+    if hint:
+        return hint
+    return detect_script_language(text) or classify_with_langid(text)
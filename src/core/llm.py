@@ -1,13 +1,23 @@
-from dataclasses import dataclass
-from transformers import AutoTokenizer, AutoModelForCausalLM, TextStreamer, TextIteratorStreamer
+import copy
+import time
+import logging
+from dataclasses import dataclass, field
+from transformers import AutoTokenizer, AutoModelForCausalLM, StoppingCriteria, StoppingCriteriaList
 import torch
 import random
-from typing import Generator, Optional, List, Dict, Union
+from typing import Callable, Generator, Optional, List, Dict, Union
 
-from threading import Thread
+from threading import Event, Thread, Lock
 from queue import Queue
 
 from ..utils.utils import resource_path
+from ..utils.memory import track_load
+from .memory_budget import Unloadable
+from .generation import GenerationController, GenerationLimits, estimate_speech_seconds
+from .governor import record_rtf
+from .response_cache import ResponseCache
+from .speculative import DraftModelDrafter, PromptLookupDrafter, SpeculativeDecoder
+from .weights import construction_lock, load_model_mmap, mmap_compatible
 
 import warnings
 warnings.filterwarnings('ignore')
@@ -21,6 +31,13 @@ class LLMConfig:
     temperature: float = 0.7
     repetition_penalty: float = 1.2
     top_p: float = 0.92
+    # 在 CPU 上直接 mmap safetensors 权重，多个进程共享同一份页缓存
+    mmap_weights: bool = True
+    # 推测解码：None 关闭；"ngram" 用提示词查找草稿；其他值视为同词表的小草稿模型目录
+    speculative: Optional[str] = None
+    num_draft_tokens: int = 4
+    # 每轮回答的停止条件：句数、估计朗读时长、延迟预算、复读检测
+    limits: GenerationLimits = field(default_factory=GenerationLimits)
     
 # -*- coding: utf-8 -*-
 DEFAULT_SYSTEM_PROMPT = (
@@ -30,34 +47,98 @@ DEFAULT_SYSTEM_PROMPT = (
     "你永远很有耐心，会用轻声细语安抚小朋友，让他们觉得安心和开心。"
 )
 
-class CustomStreamer(TextStreamer):
-    def __init__(self, tokenizer, queue):
-        super().__init__(tokenizer, skip_prompt=True, skip_special_tokens=True)
-        self.queue = queue
+class ControllerStoppingCriteria(StoppingCriteria):
+    """
+    把 GenerationController 接到 generate() 上（单条输入）。
+    给了 queue 时兼做流式输出：每步把 controller.release() 放出的文字入队，
+    最后一个 n-gram 窗口先压住，复读的部分不会流到 TTS。
+    """
+
+    def __init__(self, controller: GenerationController, tokenizer, prompt_length: int, queue: Optional[Queue] = None,
+                 stop: Optional[Event] = None):
+        self.controller = controller
         self.tokenizer = tokenizer
+        self.prompt_length = prompt_length
+        self.queue = queue
+        self.stop = stop
+        self.text = ""
+
+    def __call__(self, input_ids: torch.LongTensor, scores: torch.FloatTensor, **kwargs) -> torch.BoolTensor:
+        tokens = input_ids[0, self.prompt_length:].tolist()
+        text = self.tokenizer.decode(tokens, skip_special_tokens=True)
+        if text.endswith("�"):
+            text = self.text  # 多字节字符还没解码完整，沿用上一步的文本
+        stop = self.controller.check(tokens, text) or (self.stop is not None and self.stop.is_set())
+        self.text = text
+        if self.queue is not None:
+            self._put(self.controller.release(text))
+        return torch.full((input_ids.shape[0],), stop, dtype=torch.bool, device=input_ids.device)
+
+    def flush(self) -> None:
+        """generate() 返回后调用，输出被压住的剩余文字"""
+        self._put(self.controller.release(self.text, final=True))
 
-    def on_finalized_text(self, text: str, stream_end: bool = False):
-        self.queue.put(text)
-        if stream_end:
-            self.queue.put(None)
+    def _put(self, delta: str) -> None:
+        if delta:
+            self.queue.put(delta)
 
-class LocalLLMClient:
-    def __init__(self, config: Union[str, LLMConfig]):
+class LocalLLMClient(Unloadable):
+    def __init__(self, config: Union[str, LLMConfig], cache: Optional[ResponseCache] = None, lazy: bool = False):
         # 如果传入字符串，转换为 LLMConfig
         if isinstance(config, str):
             self.config = LLMConfig(model_path=config)
         else:
             self.config = config
-        self.model, self.tokenizer = self._init_model()
+        self.cache = cache
+        # 分词器很小，始终常驻；模型权重在 lazy 模式下首次使用时才加载
+        self.tokenizer = AutoTokenizer.from_pretrained(resource_path(self.config.model_path))
+        self.model = None
+        self.speculative = None
+        # 系统提示词前缀的 KV cache，由 warmup() 预先计算
+        self._prefix_ids = None
+        self._prefix_cache = None
+        self._warmup_lock = Lock()
+        if not lazy:
+            self.load()
 
-    def _init_model(self):
-        tokenizer = AutoTokenizer.from_pretrained(resource_path(self.config.model_path))
-        model = AutoModelForCausalLM.from_pretrained(
-            resource_path(self.config.model_path), 
-            trust_remote_code=True
-        ).eval().to(self.config.device)
-        print(f'Model Parameters: {sum(p.numel() for p in model.parameters() if p.requires_grad) / 1e6:.2f}M(illion)')
-        return model, tokenizer
+    def is_loaded(self) -> bool:
+        return self.model is not None
+
+    def load(self) -> None:
+        self.model = self._init_model(self.config.model_path)
+        self.speculative = self._init_speculative()
+
+    def unload(self) -> None:
+        with self._warmup_lock:
+            self.model = None
+            self.speculative = None
+            self._prefix_ids = None
+            self._prefix_cache = None
+
+    def _init_model(self, model_path: str, name: str = "llm"):
+        model_dir = resource_path(model_path)
+        with track_load(name) as mem:
+            if self.config.mmap_weights and self.config.device == "cpu" and mmap_compatible(model_dir):
+                model, mem.mapped_files = load_model_mmap(model_dir)
+            else:
+                with construction_lock:
+                    model = AutoModelForCausalLM.from_pretrained(
+                        model_dir,
+                        trust_remote_code=True
+                    ).eval().to(self.config.device)
+        logging.info("Model Parameters: %.2fM(illion)", sum(p.numel() for p in model.parameters()) / 1e6)
+        return model
+
+    def _init_speculative(self) -> Optional[SpeculativeDecoder]:
+        mode = self.config.speculative
+        if not mode:
+            return None
+        if mode == "ngram":
+            drafter = PromptLookupDrafter(self.config.num_draft_tokens)
+        else:
+            drafter = DraftModelDrafter(self._init_model(mode, "llm_draft"), self.config.num_draft_tokens)
+        logging.info(f"推测解码已启用: {mode}, 每次草稿 {self.config.num_draft_tokens} 个 token")
+        return SpeculativeDecoder(self, drafter)
 
     def _prepare_input(self, prompt: str, messages: Optional[List[Dict]] = None) -> str:
         messages = [{"role": "assistant", "content": DEFAULT_SYSTEM_PROMPT}]
@@ -69,67 +150,166 @@ class LocalLLMClient:
             add_generation_prompt=True
         )[-self.config.max_seq_len:]
 
-    def generate_stream_response(self, prompt: str, messages):
+    def _prompt_prefix(self) -> str:
+        # 用占位符渲染模板，占位符之前的部分对所有用户输入都相同
+        placeholder = "\x00"
+        rendered = self.tokenizer.apply_chat_template(
+            [{"role": "assistant", "content": DEFAULT_SYSTEM_PROMPT},
+             {"role": "user", "content": placeholder}],
+            tokenize=False,
+            add_generation_prompt=True
+        )
+        return rendered[:rendered.index(placeholder)]
+
+    def warmup(self) -> None:
+        """预先计算系统提示词前缀的 KV cache，并让权重常驻内存"""
+        self.ensure_loaded()
+        with self._warmup_lock:
+            if self._prefix_cache is not None or self.model is None:
+                return
+            try:
+                ids = self.tokenizer(self._prompt_prefix(), return_tensors="pt").input_ids.to(self.config.device)
+                with torch.no_grad():
+                    out = self.model(ids, use_cache=True)
+                self._prefix_ids = ids
+                self._prefix_cache = out.past_key_values
+                logging.info(f"LLM 前缀缓存已预热: {ids.shape[1]} tokens")
+            except Exception as e:
+                logging.warning(f"LLM 前缀缓存预热失败: {e}")
+
+    def warmup_async(self) -> None:
+        """在后台线程预热，唤醒后孩子说话的同时进行"""
+        if self._prefix_cache is None:
+            Thread(target=self.warmup, daemon=True).start()
+
+    def _prefix_cache_kwargs(self, input_ids) -> Dict:
+        # 只有当输入确实以预热过的前缀开头时才复用 KV cache
+        prefix_ids, prefix_cache = self._prefix_ids, self._prefix_cache
+        if prefix_cache is None:
+            return {}
+        n = prefix_ids.shape[1]
+        if input_ids.shape[1] <= n or not torch.equal(input_ids[0, :n], prefix_ids[0]):
+            return {}
+        return {"past_key_values": copy.deepcopy(prefix_cache)}
+
+    def generate_stream_response(self, prompt: str, messages, controller: Optional[GenerationController] = None):
         try:
-            
+            self.ensure_loaded()
+            model = self.model
             new_prompt = self._prepare_input(prompt, messages)
-            print(f'👶: {prompt}')
+            logging.info("👶: %s", prompt)
             inputs = self.tokenizer(new_prompt, return_tensors="pt", truncation=True).to(self.config.device)
 
-            queue = Queue()
-            streamer = CustomStreamer(self.tokenizer, queue)
-            def _generate():
-                self.model.generate(
-                    inputs.input_ids,
-                    max_new_tokens=self.config.max_new_tokens,
-                    do_sample=True,
-                    temperature=self.config.temperature,
-                    repetition_penalty=self.config.repetition_penalty,
-                    top_p=self.config.top_p,
-                    attention_mask=inputs.attention_mask,
-                    pad_token_id=self.tokenizer.pad_token_id,
-                    eos_token_id=self.tokenizer.eos_token_id,
-                    streamer=streamer
+            cache_kwargs = self._prefix_cache_kwargs(inputs.input_ids)
+            if controller is None:
+                controller = GenerationController(self.config.limits)
+            speculative = self.speculative
+            if speculative is not None:
+                prefix_len = self._prefix_ids.shape[1] if cache_kwargs else 0
+                yield from self._speculate_in_thread(
+                    speculative, inputs.input_ids, cache_kwargs.get("past_key_values"), prefix_len, controller
                 )
+            else:
+                yield from self._generate_in_thread(model, inputs, cache_kwargs, controller)
+
+        except Exception as e:
+            yield f"[ERROR] {str(e)}"
+
+    def _generate_in_thread(self, model, inputs, cache_kwargs, controller: GenerationController):
+        def _generate(queue: Queue, stop: Event):
+            criteria = ControllerStoppingCriteria(controller, self.tokenizer, inputs.input_ids.shape[1], queue, stop)
+            start = time.monotonic()
+            model.generate(
+                inputs.input_ids,
+                **cache_kwargs,
+                max_new_tokens=self.config.max_new_tokens,
+                do_sample=True,
+                temperature=self.config.temperature,
+                repetition_penalty=self.config.repetition_penalty,
+                top_p=self.config.top_p,
+                attention_mask=inputs.attention_mask,
+                pad_token_id=self.tokenizer.pad_token_id,
+                eos_token_id=self.tokenizer.eos_token_id,
+                stopping_criteria=StoppingCriteriaList([criteria]),
+            )
+            criteria.flush()
+            # 生成耗时 / 这段文字的朗读时长，大于 1 说明出字赶不上播放
+            speech = estimate_speech_seconds(criteria.text, self.config.limits.chars_per_second)
+            if speech > 0:
+                record_rtf("llm", (time.monotonic() - start) / speech)
+
+        return self._stream_from_thread(_generate)
+
+    def _speculate_in_thread(self, speculative: SpeculativeDecoder, input_ids, prefix_cache, prefix_len: int,
+                             controller: GenerationController):
+        # 和 generate() 一样放到后台线程：主线程合成、播放上一句时继续出字
+        def _speculate(queue: Queue, stop: Event):
+            for delta in speculative.stream(input_ids, prefix_cache, prefix_len, controller, stop):
+                queue.put(delta)
 
-            Thread(target=_generate).start()
+        return self._stream_from_thread(_speculate)
 
-            counter = 0
+    @staticmethod
+    def _stream_from_thread(produce: Callable[[Queue, Event], None]):
+        """在后台线程里运行 produce(queue, stop)，逐条产出它放进队列的文本"""
+        queue = Queue()
+        stop = Event()
+
+        def _run():
+            try:
+                produce(queue, stop)
+            except Exception as e:
+                queue.put(f"[ERROR] {str(e)}")
+            finally:
+                queue.put(None)
+
+        thread = Thread(target=_run)
+        thread.start()
+        try:
             while True:
                 text = queue.get()
                 if text is None:
                     #"finish_reason": "stop"
                     break
                 yield text
-
-                counter += 1
-                if counter >= 64:
-                    break      
-
-        except Exception as e:
-            yield f"[ERROR] {str(e)}"
-        
+        finally:
+            # 调用方提前关闭生成器（客户端断开、被打断）时让 generate() 在下一个 token 停下，
+            # 等线程退出后再返回，不和下一次生成抢模型
+            stop.set()
+            thread.join()
 
     def get_response(self, prompt: str, messages: Optional[List[Dict]] = None, stream: bool = False):
         random.seed(random.randint(0, 2048))
+        cached = self.cache.get(prompt) if self.cache is not None else None
+        if cached is not None:
+            return self.cache.stream(cached) if stream else cached
+
         if stream:
             def stream_generator():
-                for chunk in self.generate_stream_response(prompt, messages):
+                chunks = []
+                controller = GenerationController(self.config.limits)
+                for chunk in self.generate_stream_response(prompt, messages, controller):
+                    chunks.append(chunk)
                     yield chunk
+                # 只缓存完整生成的回答：被句数/时长/延迟上限截断或复读的回答不缓存
+                if (self.cache is not None and controller.stop_reason is None
+                        and not any(c.startswith("[ERROR]") for c in chunks)):
+                    self.cache.put(prompt, "".join(chunks))
 
             return stream_generator()
         else:        
+            self.ensure_loaded()
+            model = self.model
             new_prompt = self._prepare_input(prompt, messages)
-            print(f'👶: {prompt}')
-            streamer = TextStreamer(self.tokenizer, skip_prompt=True, skip_special_tokens=True)
+            logging.info("👶: %s", prompt)
             with torch.no_grad():
                 inputs = self.tokenizer(
                     new_prompt, 
                     return_tensors='pt', 
                     truncation=True
                 ).to(self.config.device)
-                print('🤖️: ', end='', flush=True)
-                generated_ids = self.model.generate(
+                controller = GenerationController(self.config.limits)
+                generated_ids = model.generate(
                     inputs["input_ids"],
                     max_length=inputs["input_ids"].shape[1] + self.config.max_new_tokens,
                     num_return_sequences=1,
@@ -137,7 +317,9 @@ class LocalLLMClient:
                     attention_mask=inputs["attention_mask"],
                     pad_token_id=self.tokenizer.pad_token_id,
                     eos_token_id=self.tokenizer.eos_token_id,
-                    streamer=streamer,
+                    stopping_criteria=StoppingCriteriaList([
+                        ControllerStoppingCriteria(controller, self.tokenizer, inputs["input_ids"].shape[1])
+                    ]),
                     top_p=self.config.top_p,
                     temperature=self.config.temperature,
                     repetition_penalty=self.config.repetition_penalty,
@@ -148,6 +330,10 @@ class LocalLLMClient:
                     generated_ids[0][inputs["input_ids"].shape[1]:], 
                     skip_special_tokens=True
                 )
-                print('\n')
+                # 因复读停止时去掉最后重复的 n-gram
+                answer = controller.release(answer, final=True)
+                logging.info("🤖️: %s", answer)
+                if self.cache is not None and controller.stop_reason is None:
+                    self.cache.put(prompt, answer)
                 return answer
 
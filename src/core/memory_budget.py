@@ -0,0 +1,153 @@
+import gc
+import time
+import ctypes
+import logging
+import threading
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Dict, Optional
+
+from ..utils.memory import process_memory
+
+
+def _malloc_trim() -> None:
+    # glibc 默认不会把释放的小块内存还给系统，卸载模型后主动收缩一下
+    try:
+        ctypes.CDLL("libc.so.6").malloc_trim(0)
+    except (OSError, AttributeError):
+        pass
+
+
+class Unloadable(ABC):
+    """可以被 MemoryBudget 按需卸载/重新加载的组件；少实现一个方法时实例化就会报错"""
+    budget: Optional["MemoryBudget"] = None
+    budget_name: Optional[str] = None
+
+    @abstractmethod
+    def is_loaded(self) -> bool:
+        ...
+
+    @abstractmethod
+    def load(self) -> None:
+        ...
+
+    @abstractmethod
+    def unload(self) -> None:
+        ...
+
+    def ensure_loaded(self) -> None:
+        """使用前调用：交给预算管理器时由它负责加载并记录最近使用"""
+        if self.budget is not None:
+            self.budget.touch(self.budget_name)
+        elif not self.is_loaded():
+            self.load()
+
+
+@dataclass
+class ComponentStats:
+    pinned: bool = False
+    loads: int = 0
+    unloads: int = 0
+    load_seconds: float = 0.0       # 累计加载耗时
+    last_load_seconds: float = 0.0
+    last_used: float = 0.0
+
+    @property
+    def reload_seconds(self) -> float:
+        """除首次加载外，因卸载而多花的加载时间"""
+        if self.loads <= 1:
+            return 0.0
+        return self.load_seconds * (self.loads - 1) / self.loads
+
+
+class MemoryBudget:
+    """
+    低内存模式下的组件管理：常驻组件（VAD、唤醒词等）只登记不卸载；
+    LLM/TTS 按最近使用排序，进程 RSS 超过上限时从最久未用的开始卸载，下次使用时再加载。
+    最近 min_idle 秒内用过的组件不会被卸载，避免同一轮对话里 LLM 和 TTS 来回加载。
+    """
+
+    def __init__(self, max_rss_mb: Optional[float] = None, min_idle: float = 30.0):
+        self.max_rss = max_rss_mb * 1024 * 1024 if max_rss_mb else None
+        self.min_idle = min_idle
+        self._components: Dict[str, object] = {}
+        self._stats: Dict[str, ComponentStats] = {}
+        self._lru: "OrderedDict[str, None]" = OrderedDict()
+        self._lock = threading.RLock()
+
+    def register(self, name: str, component, pinned: bool = False) -> None:
+        with self._lock:
+            self._components[name] = component
+            self._stats[name] = ComponentStats(pinned=pinned)
+            if not pinned:
+                component.budget = self
+                component.budget_name = name
+                if component.is_loaded():
+                    self._stats[name].loads = 1
+                    self._lru[name] = None
+
+    def touch(self, name: str) -> None:
+        """标记使用；未加载时加载，之后检查预算"""
+        with self._lock:
+            component, stats = self._components[name], self._stats[name]
+            stats.last_used = time.monotonic()
+            if stats.pinned:
+                return
+            if not component.is_loaded():
+                t0 = time.time()
+                component.load()
+                stats.last_load_seconds = time.time() - t0
+                stats.load_seconds += stats.last_load_seconds
+                stats.loads += 1
+                if stats.loads > 1:
+                    logging.info(f"重新加载 {name}，耗时 {stats.last_load_seconds:.2f}秒")
+            self._lru[name] = None
+            self._lru.move_to_end(name)
+            self.enforce(exclude=name)
+
+    def enforce(self, exclude: Optional[str] = None, min_idle: Optional[float] = None) -> int:
+        """RSS 超限时按 LRU 卸载组件，返回卸载的个数；空闲等待（如开始录音）时可传 min_idle=0"""
+        if self.max_rss is None:
+            return 0
+        min_idle = self.min_idle if min_idle is None else min_idle
+        unloaded = 0
+        with self._lock:
+            now = time.monotonic()
+            for name in list(self._lru):
+                rss = process_memory()["Rss"]
+                if rss <= self.max_rss:
+                    break
+                stats = self._stats[name]
+                if name == exclude or now - stats.last_used < min_idle:
+                    continue
+                self._components[name].unload()
+                del self._lru[name]
+                stats.unloads += 1
+                unloaded += 1
+                gc.collect()
+                _malloc_trim()
+                logging.info(f"内存超出上限 ({rss / 1024 / 1024:.0f}MB)，已卸载 {name}")
+            else:
+                if unloaded == 0 and process_memory()["Rss"] > self.max_rss:
+                    logging.warning("内存超出上限，但没有可卸载的空闲组件")
+        return unloaded
+
+    def metrics(self) -> Dict[str, Dict]:
+        mb = 1024 * 1024
+        with self._lock:
+            report = {
+                "rss_mb": round(process_memory()["Rss"] / mb, 1),
+                "max_rss_mb": round(self.max_rss / mb, 1) if self.max_rss else None,
+            }
+            for name, stats in self._stats.items():
+                component = self._components[name]
+                report[name] = {
+                    "pinned": stats.pinned,
+                    "loaded": stats.pinned or component.is_loaded(),
+                    "loads": stats.loads,
+                    "unloads": stats.unloads,
+                    "last_load_seconds": round(stats.last_load_seconds, 2),
+                    "reload_seconds": round(stats.reload_seconds, 2),
+                }
+        return report
@@ -3,16 +3,24 @@ import sounddevice as sd
 import soundfile as sf
 
 import numpy as np
+import math
 import time
+import threading
 import noisereduce as nr
 import sherpa_onnx
+from typing import Callable, Optional
 
 from ..utils.utils import resource_path
+from ..utils.log import RealtimeLogger
+from .endpointing import AdaptiveEndpointer
+from .energy_gate import EnergyGate
 
 from collections import deque
 
 EXCLUDE_KEYWORDS = ["loopback", "mix", "stereo", "virtual", "monitor"]
 
+_rt_log = RealtimeLogger(__name__)  # 录音回调里用，不阻塞 PortAudio 线程
+
 def resolve_input_device(device):
     devices = sd.query_devices()
 
@@ -45,8 +53,38 @@ def resolve_input_device(device):
 
     return None, None
 
+def create_vad(model_path, sample_rate=16000, threshold=0.5, min_silence_duration=0.25, max_speech_duration=20):
+    vad_config = sherpa_onnx.VadModelConfig()
+    vad_config.silero_vad.model = resource_path(model_path)
+
+    vad_config.silero_vad.threshold = threshold
+    vad_config.silero_vad.min_silence_duration = min_silence_duration  # seconds
+    vad_config.silero_vad.min_speech_duration = 0.25  # seconds
+    # If the current segment is larger than this value, then it increases
+    # the threshold to 0.9 internally. After detecting this segment,
+    # it resets the threshold to its original value.
+    vad_config.silero_vad.max_speech_duration = max_speech_duration  # seconds
+
+    vad_config.sample_rate = sample_rate
+    return sherpa_onnx.VoiceActivityDetector(vad_config, buffer_size_in_seconds=30)
+
 class Recorder:
-    def __init__(self, sample_rate=16000, input_device=None, vad_model_path="vad_ckpt/silero_vad.onnx"):
+    def __init__(
+        self,
+        sample_rate=16000,
+        input_device=None,
+        vad_model_path="vad_ckpt/silero_vad.onnx",
+        vad_threshold=0.5,
+        min_silence_duration=0.25,
+        max_speech_duration=20,
+        endpointer: Optional[AdaptiveEndpointer] = None,
+        audio_io=None,
+        energy_gate: Optional[EnergyGate] = None,
+    ):
+        """
+        audio_io: AudioIOProcess，设置时从音频子进程的共享内存采集，不在本进程打开输入流
+        energy_gate: 等待语音期间先过能量门控，门关闭时不运行 Silero VAD
+        """
         self.sample_rate = sample_rate
         device_id, device_name = resolve_input_device("default")
 
@@ -56,23 +94,36 @@ class Recorder:
         self.input_device = device_id
         self.device_name = device_name
 
+        self.vad_model_path = vad_model_path
+        self.min_silence_duration = min_silence_duration
+        self.max_speech_duration = max_speech_duration
+        self.endpointer = endpointer
+        self.audio_io = audio_io
+        self.energy_gate = energy_gate
+
         # 初始化VAD
-        vad_config = sherpa_onnx.VadModelConfig()
-        vad_config.silero_vad.model = resource_path(vad_model_path)
-
-        vad_config.silero_vad.threshold = 0.5
-        vad_config.silero_vad.min_silence_duration = 0.25  # seconds
-        vad_config.silero_vad.min_speech_duration = 0.25  # seconds
-        # If the current segment is larger than this value, then it increases
-        # the threshold to 0.9 internally. After detecting this segment,
-        # it resets the threshold to its original value.
-        vad_config.silero_vad.max_speech_duration = 5  # seconds
-
-        vad_config.sample_rate = sample_rate
-        self.vad = sherpa_onnx.VoiceActivityDetector(vad_config, buffer_size_in_seconds=30)
+        self.vad_threshold = vad_threshold
+        self.vad = self._create_vad(vad_threshold)
         
         self.paused = False
 
+    def _create_vad(self, threshold):
+        return create_vad(
+            self.vad_model_path,
+            sample_rate=self.sample_rate,
+            threshold=threshold,
+            min_silence_duration=self.min_silence_duration,
+            max_speech_duration=self.max_speech_duration,
+        )
+
+    def _adapt_vad_threshold(self):
+        # VAD 阈值只能在创建时设置，噪声底变化明显时在两次录音之间重建
+        threshold = self.endpointer.vad_threshold()
+        if abs(threshold - self.vad_threshold) >= 0.05:
+            logging.info(f"噪声底 {self.endpointer.noise.level_db:.1f}dB, VAD 阈值 {self.vad_threshold:.2f} -> {threshold:.2f}")
+            self.vad_threshold = threshold
+            self.vad = self._create_vad(threshold)
+
     @staticmethod
     def list_devices():
         devices = sd.query_devices()
@@ -81,11 +132,35 @@ class Recorder:
             print(f"{i}: {dev['name']} (输入通道: {dev['max_input_channels']}, 输出通道: {dev['max_output_channels']})")
         return devices
 
-    def record(self, silence_duration=1.2, pre_speech_padding=0.5, enable_noise_reduction=True):
+    def record(
+        self,
+        silence_duration=1.2,
+        pre_speech_padding=0.5,
+        enable_noise_reduction=True,
+        mute_until=0.0,
+        partial_transcriber: Optional[Callable[[np.ndarray], str]] = None,
+        stop_event: Optional[threading.Event] = None,
+    ):
+        """
+        mute_until: 在该时间点（time.time()）之前不触发语音开始，
+        用于唤醒应答播放期间边播边录，避免把应答本身当作用户语音。
+        窗口再延长 VAD 的拖尾（min_silence_duration），录音的起点和前置缓冲都只取窗口之后的音频，
+        应答的回声不会混进问题里
+        partial_transcriber: 配合 endpointer 使用，在每次静音开始时转写已录音频，
+        据此缩短或延长尾部静音超时
+        stop_event: 被设置时如果还没检测到语音就提前返回空音频，用于讲故事时的打断监听
+        """
         chunk_duration = 0.1  # 秒
         chunk_size = int(self.sample_rate * chunk_duration)
         silence_chunks = int(silence_duration / chunk_duration)
 
+        adaptive = self.endpointer is not None and partial_transcriber is not None
+        if self.endpointer is not None:
+            self._adapt_vad_threshold()
+        silence_onset = False
+        onset_id = 0  # 每次静音开始加一，部分转写的结果只对发起它的那次停顿有效
+        partial_worker: Optional[threading.Thread] = None
+
         pre_speech_chunks = int(pre_speech_padding / chunk_duration)
 
         recorded = []
@@ -96,23 +171,46 @@ class Recorder:
 
         # 用于存储最近的若干个音频块，作为前置缓冲
         pre_buffer = deque(maxlen=pre_speech_chunks)
+        if mute_until > time.time():
+            # 应答回声在 VAD 里的拖尾会越过 mute_until
+            mute_until += self.min_silence_duration
+        unmuted_chunks = 0  # 静音窗口结束后收到的块数
+        if adaptive:
+            pending_chunks = math.ceil(self.endpointer.config.max_silence / chunk_duration)
         
         logging.info("Microphone Listening for speech...")
 
         def callback(indata, frames, time_info, status):
-            nonlocal recorded, silence_counter, speech_detected, start_time, recording_done
+            nonlocal recorded, silence_counter, speech_detected, start_time, recording_done, silence_onset, silence_chunks, onset_id, unmuted_chunks
             if status:
-                logging.info(status)
+                _rt_log.warning("音频输入状态: %s", status)
 
             chunk = indata[:, 0]
-            self.vad.accept_waveform(chunk)
+            if time.time() >= mute_until:
+                unmuted_chunks += 1
+            if not speech_detected and self.energy_gate is not None:
+                gated = self.energy_gate.push(chunk)
+                if gated is None:
+                    # 门控关闭：跳过 VAD，只更新预缓存和噪声底
+                    pre_buffer.append(chunk.copy())
+                    if self.endpointer is not None and chunk.any():
+                        self.endpointer.observe_noise(chunk)
+                    return
+                self.vad.accept_waveform(gated)  # 刚打开时带着 lookback，VAD 能看到语音开头
+            else:
+                self.vad.accept_waveform(chunk)
             pre_buffer.append(chunk.copy())  # 无论是否检测到语音，都放入预缓存
+            # 门控关闭期间补的静音块是全零，不计入噪声底
+            if not speech_detected and self.endpointer is not None and not self.vad.is_speech_detected() and chunk.any():
+                self.endpointer.observe_noise(chunk)
             if not speech_detected:
-                if self.vad.is_speech_detected():
-                    logging.info("Speech detected, start recording")
+                if self.vad.is_speech_detected() and unmuted_chunks:
+                    _rt_log.info("Speech detected, start recording")
                     speech_detected = True
                     start_time = time.time()
-                    recorded.extend(pre_buffer)  # 把前面的缓冲加入录音
+                    # 把前面的缓冲加入录音，静音窗口内的块（应答回声）不要
+                    keep = min(len(pre_buffer), unmuted_chunks)
+                    recorded.extend(list(pre_buffer)[-keep:])
                     recorded.append(chunk.copy())
             else:
                 recorded.append(chunk.copy())
@@ -120,22 +218,60 @@ class Recorder:
                     silence_counter = 0
                 else:
                     silence_counter += 1
+                    if silence_counter == 1 and adaptive:
+                        # 交给部分转写线程，结果出来前先按最长超时等待
+                        silence_chunks = pending_chunks
+                        onset_id += 1
+                        silence_onset = True
 
                 if silence_counter >= silence_chunks:
-                    logging.info("Silence detected, stop recording")
+                    _rt_log.info("Silence detected, stop recording", chunks=len(recorded))
                     recording_done = True
                     raise sd.CallbackStop()
 
-        with sd.InputStream(
-            samplerate=self.sample_rate,
-            channels=1,
-            dtype=np.float32,
-            device=self.input_device,
-            blocksize=chunk_size,
-            callback=callback,
-        ):
+        def apply_partial(audio: np.ndarray, onset: int) -> None:
+            # 在单独的线程里转写，录音主循环不会被 ASR 卡住
+            nonlocal silence_chunks
+            try:
+                partial = partial_transcriber(audio)
+            except Exception as e:
+                logging.warning(f"部分转写失败: {e}")
+                return
+            timeout = self.endpointer.silence_timeout(partial)
+            if onset != onset_id or silence_counter == 0:
+                return  # 转写期间孩子又开口了，结果作废
+            silence_chunks = math.ceil(timeout / chunk_duration)
+            logging.info(f"部分转写: {partial}, 静音超时 {timeout:.2f}秒")
+
+        if self.audio_io is not None:
+            stream = self.audio_io.capture_stream(callback, chunk_size)
+        else:
+            stream = sd.InputStream(
+                samplerate=self.sample_rate,
+                channels=1,
+                dtype=np.float32,
+                device=self.input_device,
+                blocksize=chunk_size,
+                callback=callback,
+            )
+        with stream:
             while not recording_done:
-                time.sleep(0.05)
+                if stop_event is not None and stop_event.is_set() and not speech_detected:
+                    break
+                # 同一时间只跑一次部分转写；上一次还没结束时，等它结束后转写最新的录音
+                if silence_onset and (partial_worker is None or not partial_worker.is_alive()):
+                    silence_onset = False
+                    partial_worker = threading.Thread(
+                        target=apply_partial,
+                        args=(np.concatenate(list(recorded)), onset_id),
+                        name="partial-asr",
+                        daemon=True,
+                    )
+                    partial_worker.start()
+                time.sleep(0.02)
+        if partial_worker is not None:
+            # STT 复用内部缓冲，不能和随后的完整转写同时进行
+            partial_worker.join()
 
 
         if recorded:
@@ -0,0 +1,191 @@
+import re
+import time
+import random
+import logging
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+from simhash import Simhash, SimhashIndex
+
+from ..utils.utils import smart_split
+
+try:
+    from opencc import OpenCC
+    _t2s = OpenCC("t2s").convert
+except ImportError:  # opencc 为可选依赖，缺失时使用内置常用字表
+    _t2s = None
+
+# 儿童常问问题里出现的常见繁体字 -> 简体字
+_T2S_TABLE = str.maketrans(
+    "麼們這個說話講嗎為甚會與嗎來時國愛問題學點長開關聽見讓誰還沒對兒歡覺戲貓狗雞魚鳥龍車媽爺奶書畫樂電視"
+    "號幾歲給吃飯睡覺氣熱涼風雲彈鋼琴飛機遊寫讀數們裡麵條蘋葉顏顆綠紅藍黃萬億後邊東問廣場錢園",
+    "么们这个说话讲吗为什会与吗来时国爱问题学点长开关听见让谁还没对儿欢觉戏猫狗鸡鱼鸟龙车妈爷奶书画乐电视"
+    "号几岁给吃饭睡觉气热凉风云弹钢琴飞机游写读数们里面条苹叶颜颗绿红蓝黄万亿后边东问广场钱园",
+)
+
+# 运算符在去标点之前换成汉字，否则 3+5 和 3-5 会变成同一个键
+_OPERATORS = str.maketrans({
+    "+": "加", "＋": "加", "-": "减", "−": "减", "－": "减",
+    "×": "乘", "*": "乘", "÷": "除以", "/": "除以", "=": "等于", "＝": "等于",
+})
+# 标点、空白与常见的句尾语气词
+_PUNCT_RE = re.compile(r"[\s\W_]+", re.UNICODE)
+_TAIL_PARTICLES_RE = re.compile(r"[啊呀呢吧嘛哦哇啦呐]+$")
+# ASR 常见的重复：讲讲讲个故事、讲个故事讲个故事。单字至少重复三次才折叠（保留“谢谢”“星星”），数字不折叠
+_REPEAT_RE = re.compile(r"(\D)\1{2,}|(\D{2,4}?)\2+")
+# 数字和运算词：近似匹配时这些必须完全一致，算术题差一个字答案就不同
+_NUMBERS_RE = re.compile(r"\d+|[零一二两三四五六七八九十百千万加减乘除]")
+
+
+def normalize_prompt(text: str) -> str:
+    """归一化 ASR 文本作为缓存键：繁转简、运算符转汉字、去标点/语气词、折叠重复"""
+    text = _t2s(text) if _t2s else text.translate(_T2S_TABLE)
+    text = _PUNCT_RE.sub("", text.lower().translate(_OPERATORS))
+    text = _REPEAT_RE.sub(lambda m: m.group(1) or m.group(2), text)
+    return _TAIL_PARTICLES_RE.sub("", text) or text
+
+
+def _features(text: str) -> List[str]:
+    # 短中文句子用字二元组作为 simhash 特征
+    if len(text) < 2:
+        return [text]
+    return [text[i:i + 2] for i in range(len(text) - 1)]
+
+
+@dataclass
+class CacheEntry:
+    key: str
+    answer: str
+    created: float
+    serves: int = 0
+
+
+class ResponseCache:
+    """
+    常见问题的回答缓存（可选，挂在 LocalLLMClient.get_response 前面）
+    ttl: 条目有效期（秒）
+    reuse_probability: 命中时直接复用缓存的概率，其余情况重新生成以保持新鲜感
+    max_serves: 单条回答最多复用次数，超过后淘汰并重新生成
+    max_distance: simhash 近似匹配允许的汉明距离，0 表示只做精确匹配
+    """
+
+    def __init__(
+        self,
+        ttl: float = 24 * 3600,
+        reuse_probability: float = 0.8,
+        max_serves: int = 5,
+        max_entries: int = 256,
+        max_distance: int = 3,
+        max_audio_seconds: float = 600.0,
+    ):
+        self.ttl = ttl
+        self.reuse_probability = reuse_probability
+        self.max_serves = max_serves
+        self.max_entries = max_entries
+        self.max_distance = max_distance
+        self.max_audio_seconds = max_audio_seconds
+
+        self._entries: "OrderedDict[str, CacheEntry]" = OrderedDict()
+        self._index = SimhashIndex([], k=max_distance) if max_distance > 0 else None
+        self._hashes: Dict[str, Simhash] = {}
+        self._audio: "OrderedDict[str, Tuple[np.ndarray, int]]" = OrderedDict()
+        self._audio_seconds = 0.0
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+
+    # ---------- 文本回答 ----------
+
+    def get(self, prompt: str) -> Optional[str]:
+        key = normalize_prompt(prompt)
+        if not key:
+            return None
+        with self._lock:
+            entry = self._lookup(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            if random.random() >= self.reuse_probability:
+                # 按策略放弃命中，让模型重新生成并刷新缓存
+                self.misses += 1
+                return None
+            entry.serves += 1
+            if entry.serves >= self.max_serves:
+                self._remove(entry.key)
+            else:
+                self._entries.move_to_end(entry.key)
+            self.hits += 1
+            logging.info(f"回答缓存命中: {prompt} -> {entry.key} (已复用 {entry.serves} 次)")
+            return entry.answer
+
+    def put(self, prompt: str, answer: str) -> None:
+        key = normalize_prompt(prompt)
+        if not key or not answer.strip():
+            return
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = CacheEntry(key=key, answer=answer, created=time.time())
+            if self._index is not None:
+                h = Simhash(_features(key))
+                self._hashes[key] = h
+                self._index.add(key, h)
+            while len(self._entries) > self.max_entries:
+                self._remove(next(iter(self._entries)))
+
+    def _lookup(self, key: str) -> Optional[CacheEntry]:
+        entry = self._entries.get(key)
+        if entry is None and self._index is not None:
+            numbers = _NUMBERS_RE.findall(key)
+            for near in self._index.get_near_dups(Simhash(_features(key))):
+                entry = self._entries.get(near)
+                if entry is not None and _NUMBERS_RE.findall(near) == numbers:
+                    break
+                entry = None
+        if entry is not None and time.time() - entry.created > self.ttl:
+            self._remove(entry.key)
+            return None
+        return entry
+
+    def _remove(self, key: str) -> None:
+        self._entries.pop(key, None)
+        h = self._hashes.pop(key, None)
+        if h is not None:
+            self._index.delete(key, h)
+
+    def stream(self, answer: str) -> Iterator[str]:
+        """以整句为单位回放缓存回答，下游可以立即开始合成"""
+        for sentence in smart_split(answer):
+            yield sentence
+
+    # ---------- 合成音频 ----------
+
+    def get_audio(self, sentence: str) -> Optional[Tuple[np.ndarray, int]]:
+        with self._lock:
+            item = self._audio.get(sentence)
+            if item is not None:
+                self._audio.move_to_end(sentence)
+            return item
+
+    def put_audio(self, sentence: str, samples: np.ndarray, sample_rate: int) -> None:
+        seconds = len(samples) / sample_rate
+        if seconds > self.max_audio_seconds:
+            return
+        with self._lock:
+            old = self._audio.pop(sentence, None)
+            if old is not None:
+                self._audio_seconds -= len(old[0]) / old[1]
+            self._audio[sentence] = (np.asarray(samples, dtype=np.float32), sample_rate)
+            self._audio_seconds += seconds
+            while self._audio_seconds > self.max_audio_seconds:
+                _, (s, sr) = self._audio.popitem(last=False)
+                self._audio_seconds -= len(s) / sr
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
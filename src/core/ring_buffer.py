@@ -0,0 +1,148 @@
+import time
+import threading
+from multiprocessing import shared_memory
+from typing import Optional
+
+import numpy as np
+
+# 控制字段在 _ctrl 中的下标；写/读位置为单调递增的样本计数
+_WRITE = 0
+_READ = 1
+_OVERRUNS = 2
+_UNDERRUNS = 3
+_ACTIVE = 4  # 生产者正在输出一段连续音频，此时读不够数据才算欠载
+_FLUSH = 5   # 生产者请求清空，由消费者执行
+CTRL_SIZE = 8
+
+
+class AudioRingBuffer:
+    """
+    预分配的单生产者/单消费者 float32 环形缓冲区。
+
+    写位置只由生产者修改，读位置只由消费者修改，因此两端都不需要加锁；
+    消费端（音频回调）只做切片拷贝，不分配内存。
+    buffer/ctrl 可以传入外部数组（例如共享内存），用于跨进程。
+    """
+
+    def __init__(self, capacity: int, buffer: Optional[np.ndarray] = None, ctrl: Optional[np.ndarray] = None):
+        if capacity <= 0:
+            raise ValueError("capacity must be positive")
+        self.capacity = capacity
+        self._buf = np.zeros(capacity, dtype=np.float32) if buffer is None else buffer
+        self._ctrl = np.zeros(CTRL_SIZE, dtype=np.int64) if ctrl is None else ctrl
+        if len(self._buf) != capacity or self._ctrl.shape[0] < CTRL_SIZE:
+            raise ValueError("external buffer size mismatch")
+
+    # ---------- 状态 ----------
+
+    def available(self) -> int:
+        """可读样本数"""
+        return int(self._ctrl[_WRITE] - self._ctrl[_READ])
+
+    def free(self) -> int:
+        return self.capacity - self.available()
+
+    @property
+    def overruns(self) -> int:
+        """因缓冲区满被丢弃的样本数"""
+        return int(self._ctrl[_OVERRUNS])
+
+    @property
+    def underruns(self) -> int:
+        """连续输出过程中读不够数据的次数"""
+        return int(self._ctrl[_UNDERRUNS])
+
+    # ---------- 生产者 ----------
+
+    def write(self, samples: np.ndarray) -> int:
+        """非阻塞写入，返回写入的样本数，放不下的部分计入 overruns"""
+        w = int(self._ctrl[_WRITE])
+        n = min(len(samples), self.capacity - (w - int(self._ctrl[_READ])))
+        if n > 0:
+            start = w % self.capacity
+            first = min(n, self.capacity - start)
+            self._buf[start:start + first] = samples[:first]
+            if first < n:
+                self._buf[:n - first] = samples[first:n]
+            self._ctrl[_WRITE] = w + n
+        if n < len(samples):
+            self._ctrl[_OVERRUNS] += len(samples) - n
+        self._ctrl[_ACTIVE] = 1
+        return n
+
+    def write_blocking(self, samples: np.ndarray, stop: Optional[threading.Event] = None, poll: float = 0.005) -> int:
+        """写满时等待消费者腾出空间，stop 被设置时提前返回已写入的样本数"""
+        written = 0
+        while written < len(samples):
+            if stop is not None and stop.is_set():
+                break
+            n = min(len(samples) - written, self.free())
+            if n > 0:
+                written += self.write(samples[written:written + n])
+            else:
+                time.sleep(poll)
+        return written
+
+    def end(self) -> None:
+        """一段连续音频写完，之后读空不再算欠载"""
+        self._ctrl[_ACTIVE] = 0
+
+    def clear(self) -> None:
+        """请求丢弃未播放的数据（由消费者在下一次读取时执行）"""
+        self._ctrl[_FLUSH] = 1
+        self._ctrl[_ACTIVE] = 0
+
+    # ---------- 消费者 ----------
+
+    def read_into(self, out: np.ndarray) -> int:
+        """读取到 out（不足部分补零），返回实际读取的样本数"""
+        r = int(self._ctrl[_READ])
+        w = int(self._ctrl[_WRITE])
+        if self._ctrl[_FLUSH]:
+            r = w
+            self._ctrl[_READ] = r
+            self._ctrl[_FLUSH] = 0
+
+        frames = len(out)
+        n = min(frames, w - r)
+        if n > 0:
+            start = r % self.capacity
+            first = min(n, self.capacity - start)
+            out[:first] = self._buf[start:start + first]
+            if first < n:
+                out[first:n] = self._buf[:n - first]
+            self._ctrl[_READ] = r + n
+        if n < frames:
+            out[n:] = 0
+            if self._ctrl[_ACTIVE]:
+                self._ctrl[_UNDERRUNS] += 1
+        return n
+
+
+class SharedAudioRing(AudioRingBuffer):
+    """
+    放在 multiprocessing.shared_memory 中的 AudioRingBuffer：控制字段在前，样本在后。
+    name=None 时新建（创建方负责 unlink），否则按名字挂载另一个进程创建的同一块内存。
+    两个进程仍然只能各占一端（一个生产者、一个消费者）。
+    """
+
+    def __init__(self, capacity: int, name: Optional[str] = None):
+        self.owner = name is None
+        header = CTRL_SIZE * 8
+        self.shm = shared_memory.SharedMemory(name=name, create=self.owner, size=header + capacity * 4)
+        ctrl = np.ndarray((CTRL_SIZE,), dtype=np.int64, buffer=self.shm.buf)
+        buffer = np.ndarray((capacity,), dtype=np.float32, buffer=self.shm.buf, offset=header)
+        if self.owner:
+            ctrl[:] = 0
+        super().__init__(capacity, buffer=buffer, ctrl=ctrl)
+
+    @property
+    def name(self) -> str:
+        return self.shm.name
+
+    def close(self) -> None:
+        # 先释放指向共享内存的数组视图，否则 SharedMemory.close 会报 BufferError
+        self._buf = self._ctrl = None
+        self.shm.close()
+        if self.owner:
+            self.shm.unlink()
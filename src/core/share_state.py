@@ -1,15 +1,64 @@
+import enum
+import logging
+import queue
 import threading
-from typing import Callable, Optional
+import time
+from collections import defaultdict, deque
+from typing import Callable, Dict, List, NamedTuple, Optional
+
+
+class AssistantState(enum.Enum):
+    IDLE = "idle"            # 等待唤醒词
+    WAKE = "wake"            # 刚被唤醒
+    LISTENING = "listening"  # 录音中
+    THINKING = "thinking"    # 识别 / 生成回答
+    SPEAKING = "speaking"    # 播放合成语音
+
+
+_TRANSITIONS = {
+    AssistantState.IDLE: {AssistantState.LISTENING, AssistantState.WAKE, AssistantState.THINKING, AssistantState.SPEAKING},
+    AssistantState.WAKE: {AssistantState.LISTENING, AssistantState.THINKING, AssistantState.SPEAKING, AssistantState.IDLE},
+    AssistantState.LISTENING: {AssistantState.THINKING, AssistantState.IDLE, AssistantState.SPEAKING},
+    AssistantState.THINKING: {AssistantState.SPEAKING, AssistantState.LISTENING, AssistantState.IDLE, AssistantState.WAKE},
+    AssistantState.SPEAKING: {AssistantState.LISTENING, AssistantState.THINKING, AssistantState.IDLE, AssistantState.WAKE},
+}
+
+
+class Transition(NamedTuple):
+    old: AssistantState
+    new: AssistantState
+    timestamp: float  # time.monotonic()
+    elapsed: float    # 在 old 状态停留的秒数
+
 
 class State:
+    """
+    助手状态机（IDLE / WAKE / LISTENING / THINKING / SPEAKING）。
+
+    _listen 是给音频回调用的标志：回调线程里只读写这个布尔值并向事件队列投递，
+    不加锁也不调用任何订阅者；状态切换与通知都在后台分发线程里完成。
+    分发线程由 start_dispatcher() 显式启动。监听标志引起的 SPEAKING 切换是异步应用的，
+    入队后如果又有显式切换（_seq 变了），这条切换已经过时，直接丢弃，不会覆盖后来的显式切换。
+    """
     _listen = True
-    _lock = threading.Lock()
+    _state = AssistantState.IDLE
+    _since = time.monotonic()
+    _before_speaking = AssistantState.IDLE
+    _durations: Dict[AssistantState, float] = defaultdict(float)
+    _history: deque = deque(maxlen=128)
+    _seq = 0  # 显式切换的序号
+
+    _lock = threading.Lock()  # 只在非实时线程上使用
+    _events: "queue.SimpleQueue" = queue.SimpleQueue()
+    _subscribers: List[Callable[[Transition], None]] = []
     _on_change: Optional[Callable[[bool], None]] = None
+    _dispatcher: Optional[threading.Thread] = None
+
+    # ---------- 音频线程安全的监听标志 ----------
 
     @classmethod
     def listening(cls) -> bool:
-        with cls._lock:
-            return cls._listen
+        return cls._listen
 
     @classmethod
     def pause_listening(cls):
@@ -21,14 +70,127 @@ class State:
 
     @classmethod
     def _set_listen(cls, value: bool):
-        with cls._lock:
-            if cls._listen != value:
-                cls._listen = value
-                if cls._on_change:
-                    cls._on_change(value)
+        # 可能在 PortAudio 回调里调用：只做赋值和无锁入队
+        if cls._listen != value:
+            cls._listen = value
+            cls._events.put(("listen", (value, time.monotonic(), cls._seq)))
 
     @classmethod
     def set_on_change_callback(cls, callback: Callable[[bool], None]):
-        """设置状态变更时触发的回调函数，参数为当前状态（True/False）"""
+        """设置监听状态变更时触发的回调函数，参数为当前状态（True/False），在分发线程中调用"""
+        cls._on_change = callback
+
+    # ---------- 状态机 ----------
+
+    @classmethod
+    def current(cls) -> AssistantState:
+        return cls._state
+
+    @classmethod
+    def transition(cls, new: AssistantState) -> bool:
+        """切换状态，非法切换会被忽略并返回 False"""
+        with cls._lock:
+            cls._seq += 1
+            return cls._apply(new)
+
+    @classmethod
+    def _apply(cls, new: AssistantState, now: Optional[float] = None) -> bool:
+        old = cls._state
+        if new == old:
+            return True
+        if new not in _TRANSITIONS[old]:
+            logging.warning(f"非法状态切换: {old.value} -> {new.value}")
+            return False
+        now = max(now or time.monotonic(), cls._since)
+        elapsed = now - cls._since
+        cls._durations[old] += elapsed
+        if new == AssistantState.SPEAKING:
+            cls._before_speaking = old
+        cls._state = new
+        cls._since = now
+        t = Transition(old, new, now, elapsed)
+        cls._history.append(t)
+        cls._events.put(("state", t))
+        return True
+
+    @classmethod
+    def subscribe(cls, callback: Callable[[Transition], None]):
+        """订阅状态切换，回调在分发线程中执行，不会阻塞音频线程"""
+        cls._subscribers.append(callback)
+
+    @classmethod
+    def unsubscribe(cls, callback: Callable[[Transition], None]):
+        if callback in cls._subscribers:
+            cls._subscribers.remove(callback)
+
+    @classmethod
+    def time_in_states(cls) -> Dict[AssistantState, float]:
+        """各状态累计停留时间（秒），包含当前状态已停留的时间"""
         with cls._lock:
-            cls._on_change = callback
+            durations = dict(cls._durations)
+            durations[cls._state] = durations.get(cls._state, 0.0) + time.monotonic() - cls._since
+        return durations
+
+    @classmethod
+    def history(cls) -> List[Transition]:
+        return list(cls._history)
+
+    @classmethod
+    def reset(cls):
+        with cls._lock:
+            cls._seq += 1
+            cls._listen = True
+            cls._state = AssistantState.IDLE
+            cls._since = time.monotonic()
+            cls._before_speaking = AssistantState.IDLE
+            cls._durations.clear()
+            cls._history.clear()
+
+    @classmethod
+    def wait_idle(cls, timeout: float = 1.0) -> bool:
+        """等待分发线程处理完已入队的事件（主要用于测试）"""
+        done = threading.Event()
+        cls._events.put(("flush", done))
+        return done.wait(timeout)
+
+    # ---------- 分发线程 ----------
+
+    @classmethod
+    def start_dispatcher(cls):
+        if cls._dispatcher is None or not cls._dispatcher.is_alive():
+            cls._dispatcher = threading.Thread(target=cls._dispatch_loop, name="state-dispatcher", daemon=True)
+            cls._dispatcher.start()
+
+    @classmethod
+    def _dispatch_loop(cls):
+        while True:
+            kind, payload = cls._events.get()
+            try:
+                if kind == "listen":
+                    cls._on_listen_changed(*payload)
+                elif kind == "state":
+                    for callback in list(cls._subscribers):
+                        callback(payload)
+                elif kind == "flush":
+                    # 处理过程中可能又产生了新事件，排到它们后面
+                    if cls._events.empty():
+                        payload.set()
+                    else:
+                        cls._events.put((kind, payload))
+            except Exception as e:
+                logging.error(f"状态回调出错: {e}")
+
+    @classmethod
+    def _on_listen_changed(cls, listening: bool, timestamp: float, seq: int):
+        if cls._on_change:
+            cls._on_change(listening)
+        # 播放开始进入 SPEAKING，播放结束回到播放前的状态
+        with cls._lock:
+            if seq != cls._seq:
+                logging.debug(f"丢弃过时的监听状态切换: listening={listening}")
+                return
+            if not listening:
+                cls._apply(AssistantState.SPEAKING, timestamp)
+            elif cls._state == AssistantState.SPEAKING:
+                cls._apply(cls._before_speaking, timestamp)
+
@@ -0,0 +1,227 @@
+import time
+import logging
+import threading
+from dataclasses import dataclass
+from typing import Dict, Iterator, List, Optional
+
+import torch
+
+from .generation import GenerationController
+from .decoding import IncrementalDecoder, crop_cache, detect_seq_dim, from_legacy, sample_tokens, to_legacy
+
+
+class PromptLookupDrafter:
+    """
+    n-gram 草稿：在已有上下文（提示词 + 已生成内容）中查找与末尾 n 个 token 相同的片段，
+    把它后面的 token 作为草稿。讲故事、复述问题时命中率高，且不需要额外模型。
+    """
+
+    def __init__(self, num_draft: int = 4, max_ngram: int = 3):
+        self.num_draft = num_draft
+        self.max_ngram = max_ngram
+
+    def propose(self, ids: List[int]) -> List[int]:
+        for n in range(min(self.max_ngram, len(ids) - 1), 0, -1):
+            tail = ids[-n:]
+            # 从后往前找最近一次出现，最近的上下文更可能延续
+            for start in range(len(ids) - n - 1, -1, -1):
+                if ids[start:start + n] == tail:
+                    follow = ids[start + n:start + n + self.num_draft]
+                    if follow:
+                        return follow
+        return []
+
+    def reset(self) -> None:
+        pass
+
+
+class DraftModelDrafter:
+    """小模型贪心生成草稿；自己维护一份 KV cache，与上一次的输入共享前缀的部分直接复用"""
+
+    def __init__(self, model, num_draft: int = 4):
+        self.model = model
+        self.num_draft = num_draft
+        self._ids: List[int] = []  # 已写入 _cache 的 token
+        self._cache = None
+        self._cache_like = None
+        self._seq_dim = None
+
+    def reset(self) -> None:
+        self._ids, self._cache = [], None
+
+    @torch.no_grad()
+    def _feed(self, tokens: List[int]) -> torch.Tensor:
+        device = next(self.model.parameters()).device
+        past = from_legacy(self._cache, self._cache_like) if self._cache is not None else None
+        out = self.model(torch.tensor([tokens], device=device), past_key_values=past, use_cache=True)
+        self._cache_like = out.past_key_values
+        self._cache = to_legacy(out.past_key_values)
+        if self._seq_dim is None:
+            self._seq_dim = detect_seq_dim(self._cache, len(self._ids) + len(tokens))
+        self._ids.extend(tokens)
+        return out.logits[0, -1]
+
+    def propose(self, ids: List[int]) -> List[int]:
+        common = 0
+        for a, b in zip(self._ids, ids):
+            if a != b:
+                break
+            common += 1
+        # 至少重新喂入最后一个 token 才能拿到下一个位置的 logits
+        common = min(common, len(ids) - 1)
+        if self._cache is not None and common < len(self._ids):
+            if common == 0:
+                self.reset()
+            else:
+                self._cache = crop_cache(self._cache, common, self._seq_dim)
+                self._ids = self._ids[:common]
+
+        drafts = []
+        logits = self._feed(ids[common:])
+        for i in range(self.num_draft):
+            token = int(logits.argmax())
+            drafts.append(token)
+            if i + 1 < self.num_draft:
+                logits = self._feed([token])
+        return drafts
+
+
+@dataclass
+class TurnStats:
+    tokens: int = 0
+    drafted: int = 0
+    accepted: int = 0
+    verify_passes: int = 0
+    seconds: float = 0.0
+    baseline_step: Optional[float] = None  # 主模型单 token 前向耗时
+
+    def report(self) -> Dict[str, Optional[float]]:
+        tps = self.tokens / self.seconds if self.seconds else 0.0
+        return {
+            "tokens": self.tokens,
+            "acceptance_rate": round(self.accepted / self.drafted, 3) if self.drafted else 0.0,
+            "tokens_per_pass": round(self.tokens / self.verify_passes, 2) if self.verify_passes else 0.0,
+            "tokens_per_second": round(tps, 1),
+            "speedup": round(tps * self.baseline_step, 2) if self.baseline_step else None,
+        }
+
+
+class SpeculativeDecoder:
+    """
+    推测解码：草稿器一次提出若干 token，主模型用一次前向同时算出这些位置的分布，
+    逐个位置按主模型的分布采样，采样结果与草稿一致就接受并继续，否则以采样结果结束本轮。
+    输出的每个 token 都来自主模型的分布，与逐 token 生成等价。
+    """
+
+    def __init__(self, llm, drafter):
+        self.llm = llm
+        self.drafter = drafter
+        self.last_turn = TurnStats()
+        self._baseline_step: Optional[float] = None
+        self._seq_dim = None
+
+    @torch.no_grad()
+    def _forward(self, tokens: torch.Tensor, cache):
+        out = self.llm.model(tokens, past_key_values=cache, use_cache=True)
+        return out.logits[0], out.past_key_values
+
+    def _sample(self, logits: torch.Tensor, history: List[int]) -> int:
+        cfg = self.llm.config
+        return int(sample_tokens(logits.unsqueeze(0), [history], cfg.temperature, cfg.top_p, cfg.repetition_penalty)[0])
+
+    def stream(self, input_ids: torch.Tensor, prefix_cache=None, prefix_len: int = 0,
+               controller: Optional[GenerationController] = None,
+               stop: Optional[threading.Event] = None) -> Iterator[str]:
+        """
+        input_ids: (1, seq)；prefix_cache 为前 prefix_len 个 token 已算好的 KV cache（可选）。
+        逐段产出文本增量，结束后统计记录在 last_turn。stop 被设置时在下一轮验证前停下。
+        """
+        cfg = self.llm.config
+        eos = self.llm.tokenizer.eos_token_id
+        device = input_ids.device
+        ids = input_ids[0].tolist()
+        stats = TurnStats()
+        decoder = IncrementalDecoder(self.llm.tokenizer)
+
+        # 预填充：前缀 cache 之后的部分一次算完
+        start = time.time()
+        if prefix_cache is None:
+            prefix_len = 0
+        logits, cache = self._forward(input_ids[:, prefix_len:], prefix_cache)
+        legacy = to_legacy(cache)
+        if self._seq_dim is None:
+            self._seq_dim = detect_seq_dim(legacy, len(ids))
+        cache_len = len(ids)
+        generated: List[int] = []
+        # 重复惩罚的历史包含提示词，与 HF generate 一致
+        pending = self._sample(logits[-1], ids)
+
+        while True:
+            # pending 是已经确定但尚未写入 cache 的 token
+            if pending == eos:
+                break
+            generated.append(pending)
+            stats.tokens += 1
+            delta = decoder.push(pending)
+            done = len(generated) >= cfg.max_new_tokens or self._should_stop(controller, generated, decoder)
+            delta = self._release(controller, decoder, delta)
+            if delta:
+                yield delta
+            if done or (stop is not None and stop.is_set()):
+                break
+
+            # 还没测过主模型单 token 前向耗时时，先不带草稿走一步
+            drafts = self.drafter.propose(ids + generated) if self._baseline_step is not None else []
+            drafts = drafts[:max(0, cfg.max_new_tokens - len(generated) - 1)]
+            fed = torch.tensor([[pending] + drafts], device=device)
+
+            t0 = time.time()
+            logits, cache = self._forward(fed, from_legacy(legacy, cache))
+            step = time.time() - t0
+            stats.verify_passes += 1
+            if not drafts:
+                self._baseline_step = step if self._baseline_step is None else 0.8 * self._baseline_step + 0.2 * step
+
+            accepted, stopped = 0, False
+            for j in range(len(drafts) + 1):
+                token = self._sample(logits[j], ids + generated)
+                if j < len(drafts) and token == drafts[j] and token != eos:
+                    accepted += 1
+                    generated.append(token)
+                    stats.tokens += 1
+                    delta = decoder.push(token)
+                    stopped = len(generated) >= cfg.max_new_tokens or self._should_stop(controller, generated, decoder)
+                    delta = self._release(controller, decoder, delta)
+                    if delta:
+                        yield delta
+                    if stopped:
+                        break
+                    continue
+                pending = token
+                break
+            stats.drafted += len(drafts)
+            stats.accepted += accepted
+
+            # 丢掉被拒绝的草稿在 cache 中的位置
+            cache_len += 1 + accepted
+            legacy = crop_cache(to_legacy(cache), cache_len, self._seq_dim)
+            if stopped:
+                break
+
+        if controller is not None:
+            delta = controller.release(decoder.text, final=True)
+            if delta:
+                yield delta
+        stats.seconds = time.time() - start
+        stats.baseline_step = self._baseline_step
+        self.last_turn = stats
+        logging.info(f"推测解码: {stats.report()}")
+
+    @staticmethod
+    def _should_stop(controller, generated: List[int], decoder: IncrementalDecoder) -> bool:
+        return controller is not None and controller.check(generated, decoder.text)
+
+    @staticmethod
+    def _release(controller, decoder: IncrementalDecoder, delta: str) -> str:
+        # 有 controller 时由它压住最后一个 n-gram 窗口，复读的部分不会输出
+        return delta if controller is None else controller.release(decoder.text)
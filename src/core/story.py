@@ -0,0 +1,204 @@
+import re
+import time
+import logging
+import threading
+from collections import Counter
+from dataclasses import asdict, dataclass
+from typing import List, Optional
+
+import torch
+
+from ..utils.utils import smart_split
+from .decoding import IncrementalDecoder, sample_tokens
+from .generation import GenerationController, GenerationLimits
+
+# “讲个故事”“给我说一个小兔子的故事”“故事吧”
+_STORY_REQUEST_RE = re.compile(r"(讲|说|念|读)[^，。？！,.?!]{0,8}故事|故事(吧|吗|呢|好不好)")
+# 讲故事时孩子说“别讲了”“停下”之类，作为打断
+STOP_STORY_RE = re.compile(r"(别|不要|不用)(再)?(讲|说)了?|停下|停止|不听了")
+
+
+def is_story_request(text: str) -> bool:
+    return bool(_STORY_REQUEST_RE.search(text))
+
+
+@dataclass
+class StoryConfig:
+    ahead_seconds: float = 8.0        # 已合成未播放的音频达到这么多秒时暂停生成
+    resume_seconds: float = 4.0       # 降到这么多秒以下再继续
+    chunk_sentences: int = 2          # 每段续写的句数，写完一段就交给 TTS
+    max_story_seconds: float = 300.0  # 整个故事的朗读时长上限
+    max_tokens: int = 2048
+    context_tokens: int = 448         # KV cache 超过该长度时用提示词 + 故事结尾重新预填充
+    tail_chars: int = 120             # 重新预填充时保留的故事结尾字数
+    penalty_window: int = 256         # 重复惩罚只看最近这么多 token
+    max_sentence_repeats: int = 1     # 同一句话出现超过这么多次视为复读
+
+
+@dataclass
+class StoryStats:
+    chunks: int = 0
+    tokens: int = 0
+    sentences: int = 0
+    speech_seconds: float = 0.0   # 已合成的音频时长
+    paused_seconds: float = 0.0   # 因缓冲已满而暂停生成的时间
+    refreshes: int = 0            # 重新预填充的次数
+    underruns: int = 0            # 讲述过程中播放欠载（故事断档）的次数
+    stop_reason: Optional[str] = None
+
+    def report(self):
+        return {k: round(v, 2) if isinstance(v, float) else v for k, v in asdict(self).items()}
+
+
+class StoryTeller:
+    """
+    长篇讲故事：不受单轮回答的句数/时长限制，一段一段续写。段与段之间保留 KV cache，不重复预填充；
+    播放器里已合成未播放的音频超过 ahead_seconds 时暂停生成，降到 resume_seconds 以下再继续，
+    故事不断档，也不和 TTS 抢 CPU。interrupt() 或 stop_playback() 后在当前 token 处停下。
+    """
+
+    def __init__(self, llm, tts, config: Optional[StoryConfig] = None):
+        self.llm = llm
+        self.tts = tts
+        self.config = config or StoryConfig()
+        self.last_stats = StoryStats()
+        self._interrupted = threading.Event()
+
+    def interrupt(self) -> None:
+        self._interrupted.set()
+
+    def _stopped(self) -> bool:
+        return self._interrupted.is_set() or self.tts.player.killed
+
+    @torch.no_grad()
+    def _forward(self, ids: torch.Tensor, cache):
+        out = self.llm.model(ids, past_key_values=cache, use_cache=True)
+        return out.logits[0, -1], out.past_key_values
+
+    def _prefill(self, text: str):
+        """返回 (最后位置的 logits, cache, cache 长度)；能复用系统提示词前缀缓存时只算剩余部分"""
+        ids = self.llm.tokenizer(text, return_tensors="pt").input_ids.to(self.llm.config.device)
+        cache_kwargs = self.llm._prefix_cache_kwargs(ids)
+        prefix_len = self.llm._prefix_ids.shape[1] if cache_kwargs else 0
+        logits, cache = self._forward(ids[:, prefix_len:], cache_kwargs.get("past_key_values"))
+        return logits, cache, ids.shape[1]
+
+    def _tail(self, story: str) -> str:
+        # 从结尾附近的第一个完整句子开始，续写时不会接在半句话后面
+        tail = story[-self.config.tail_chars:]
+        sentences = smart_split(tail)
+        return "".join(sentences[1:]) if len(sentences) > 1 else tail
+
+    def _wait_for_room(self, stats: StoryStats) -> None:
+        player = self.tts.player
+        if player.buffered_seconds() < self.config.ahead_seconds:
+            return
+        start = time.monotonic()
+        while player.buffered_seconds() > self.config.resume_seconds and not self._stopped():
+            time.sleep(0.05)
+        stats.paused_seconds += time.monotonic() - start
+
+    def _speak(self, sentence: str, stats: StoryStats) -> None:
+        samples, rate = self.tts.render(sentence)
+        if len(samples) == 0:
+            return
+        player = self.tts.player
+        player.start(rate)
+        player.buffer.write_blocking(samples, stop=player.event)
+        stats.speech_seconds += len(samples) / rate
+        stats.sentences += 1
+
+    def tell(self, prompt: str) -> str:
+        cfg = self.config
+        llm = self.llm
+        player = self.tts.player
+        self._interrupted.clear()
+        player.reset()
+        llm.ensure_loaded()
+
+        eos = llm.tokenizer.eos_token_id
+        device = llm.config.device
+        limits = GenerationLimits(
+            max_sentences=cfg.chunk_sentences,
+            max_speech_seconds=cfg.ahead_seconds,
+            chars_per_second=llm.config.limits.chars_per_second,
+            latency_budget=30.0,
+        )
+        controller = GenerationController(limits)
+        stats = StoryStats()
+        underruns = player.buffer.underruns if player.buffer is not None else 0
+        seen: Counter = Counter()
+        recent: List[int] = []
+        story = ""
+
+        prompt_text = llm._prepare_input(prompt)
+        logits, cache, cache_len = self._prefill(prompt_text)
+        logging.info(f"开始讲故事: {prompt}")
+
+        while stats.stop_reason is None:
+            self._wait_for_room(stats)
+            if self._stopped():
+                stats.stop_reason = "interrupted"
+                break
+
+            # 续写一段：每个 token 采样后立即写入 cache，下一段直接从这里接着生成
+            decoder = IncrementalDecoder(llm.tokenizer)
+            chunk: List[int] = []
+            controller.reset()
+            while True:
+                token = int(sample_tokens(
+                    logits.unsqueeze(0), [recent[-cfg.penalty_window:]],
+                    llm.config.temperature, llm.config.top_p, llm.config.repetition_penalty,
+                )[0])
+                if token == eos:
+                    stats.stop_reason = "end"
+                    break
+                chunk.append(token)
+                recent.append(token)
+                decoder.push(token)
+                logits, cache = self._forward(torch.tensor([[token]], device=device), cache)
+                cache_len += 1
+                if self._stopped():
+                    stats.stop_reason = "interrupted"
+                    break
+                if controller.check(chunk, decoder.text):
+                    if controller.stop_reason == "repetition":
+                        stats.stop_reason = "repetition"
+                    break
+                if stats.tokens + len(chunk) >= cfg.max_tokens:
+                    stats.stop_reason = "tokens"
+                    break
+
+            stats.chunks += 1
+            stats.tokens += len(chunk)
+            # 因复读停下时去掉最后重复的 n-gram，不把它念出来
+            text = controller.release(decoder.text, final=True)
+            story += text
+            for sentence in smart_split(text):
+                seen[sentence] += 1
+                if seen[sentence] > cfg.max_sentence_repeats and len(sentence) > 4:
+                    stats.stop_reason = stats.stop_reason or "repetition"
+                    break
+                if self._stopped():
+                    break
+                self._speak(sentence, stats)
+
+            if stats.speech_seconds >= cfg.max_story_seconds:
+                stats.stop_reason = stats.stop_reason or "length"
+            if stats.stop_reason is None and cache_len >= cfg.context_tokens:
+                logits, cache, cache_len = self._prefill(prompt_text + self._tail(story))
+                stats.refreshes += 1
+
+        if self._stopped():
+            stats.stop_reason = "interrupted"
+            player.stop()
+            # 故事已经停下，清掉 stop 状态，否则之后的回答和唤醒应答都写不进缓冲区
+            player.reset()
+        elif player.buffer is not None:
+            player.buffer.end()
+            player.wait_drained()
+        if player.buffer is not None:
+            stats.underruns = player.buffer.underruns - underruns
+        self.last_stats = stats
+        logging.info(f"故事结束: {stats.report()}")
+        return story
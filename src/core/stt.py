@@ -7,12 +7,98 @@ import sherpa_onnx
 
 import tempfile
 import soundfile as sf
+import math
+import threading
+from dataclasses import dataclass, field
+from typing import List, Optional
 
 from src.utils.utils import resource_path
+from src.utils.memory import track_load
+from src.core.audio_input import AudioConverter, StreamPool
+
+_TAG_RE = re.compile(r"<\|(.*?)\|>")
 
 def remove_tags(text: str) -> str:
     return re.sub(r"<\|.*?\|>", "", text)
 
+def _strip_tag(tag: Optional[str]) -> Optional[str]:
+    # "<|zh|>" -> "zh"
+    if not tag:
+        return None
+    m = _TAG_RE.fullmatch(tag.strip())
+    return (m.group(1) if m else tag.strip()) or None
+
+
+# 只有语气词或标点的转写，送进 LLM 只会浪费算力
+_FILLER_RE = re.compile(r"^[嗯啊呃哦噢唔额哈呀诶欸\W_]*$")
+
+
+@dataclass(slots=True)
+class TranscriptionResult:
+    text: str
+    lang: Optional[str] = None     # 识别器给出的语言标签，如 "zh"、"en"、"nospeech"
+    emotion: Optional[str] = None  # SenseVoice 情绪标签，如 "NEUTRAL"、"HAPPY"
+    event: Optional[str] = None    # SenseVoice 事件标签，如 "Speech"、"BGM"
+    tokens: List[str] = field(default_factory=list)
+    timestamps: List[float] = field(default_factory=list)  # 每个 token 的起始时间（秒）
+    confidence: Optional[float] = None  # 模型给出 token 概率时为其几何平均，否则为 None
+    duration: float = 0.0  # 输入音频时长（秒）
+
+    def __str__(self) -> str:
+        return self.text
+
+    @classmethod
+    def from_sense_voice(cls, result, duration: float = 0.0) -> "TranscriptionResult":
+        text = result.text
+        lang = _strip_tag(getattr(result, "lang", None))
+        emotion = _strip_tag(getattr(result, "emotion", None))
+        event = _strip_tag(getattr(result, "event", None))
+        # 旧版本 sherpa-onnx 把标签留在文本里：<|zh|><|NEUTRAL|><|Speech|><|woitn|>...
+        tags = _TAG_RE.findall(text)
+        if tags:
+            text = remove_tags(text)
+            lang = lang or (tags[0] if len(tags) > 0 else None)
+            emotion = emotion or (tags[1] if len(tags) > 1 else None)
+            event = event or (tags[2] if len(tags) > 2 else None)
+        return cls(
+            text=text.strip(),
+            lang=lang,
+            emotion=emotion,
+            event=event,
+            tokens=list(getattr(result, "tokens", []) or []),
+            timestamps=list(getattr(result, "timestamps", []) or []),
+            duration=duration,
+        )
+
+    @classmethod
+    def from_online(cls, result, duration: float = 0.0) -> "TranscriptionResult":
+        # OnlineRecognizer.get_result_all 的结果；ys_probs 为每个 token 的对数概率（部分模型为空）
+        log_probs = list(getattr(result, "ys_probs", []) or [])
+        confidence = math.exp(sum(log_probs) / len(log_probs)) if log_probs else None
+        return cls(
+            text=result.text.strip(),
+            tokens=list(getattr(result, "tokens", []) or []),
+            timestamps=list(getattr(result, "timestamps", []) or []),
+            confidence=confidence,
+            duration=duration,
+        )
+
+    def rejection_reason(self, min_confidence: float = 0.0, max_chars_per_second: float = 12.0) -> Optional[str]:
+        """判断转写是否像噪声误识别，返回拒绝原因；可以送入 LLM 时返回 None"""
+        if not self.text:
+            return "空转写"
+        if _FILLER_RE.match(self.text):
+            return "只有语气词"
+        if self.lang == "nospeech":
+            return "识别器判定无语音"
+        if self.event and self.event != "Speech":
+            return f"非语音事件: {self.event}"
+        if self.confidence is not None and self.confidence < min_confidence:
+            return f"置信度过低: {self.confidence:.2f}"
+        if self.duration > 0 and len(self.text) / self.duration > max_chars_per_second:
+            return f"字数与时长不符: {len(self.text)} 字 / {self.duration:.2f} 秒"
+        return None
+
 class SpeechToText:
     def __init__(self, backend="sensevoice", **kwargs):
         """
@@ -23,12 +109,19 @@ class SpeechToText:
         self.device = kwargs.get("device", "cuda" if torch.cuda.is_available() else "cpu")
 
         logging.info(f"asr model: {backend}")
-        if self.backend == "sensevoice":
-            self._init_sensevoice(kwargs)
-        elif self.backend == "paraformer":
-            self._init_paraformer(kwargs)
-        else:
-            raise ValueError(f"Unknown backend: {self.backend}")
+        with track_load("stt"):
+            if self.backend == "sensevoice":
+                self._init_sensevoice(kwargs)
+            elif self.backend == "paraformer":
+                self._init_paraformer(kwargs)
+            else:
+                raise ValueError(f"Unknown backend: {self.backend}")
+            # 输入统一转成 16kHz 单声道写进复用缓冲区；识别流提前创建好
+            self.sample_rate = 16000
+            self.converter = AudioConverter(self.sample_rate)
+            self._convert_lock = threading.Lock()
+            factory = self.model.create_stream if self.backend == "sensevoice" else self.recognizer.create_stream
+            self.streams = StreamPool(factory, size=kwargs.get("stream_pool_size", 2))
 
     def _init_sensevoice(self, kwargs):
         model_path = resource_path(kwargs.get("model_path", "sherpa/sherpa-onnx-sense-voice-zh-en-ja-ko-yue-2024-07-17"))
@@ -67,39 +160,28 @@ class SpeechToText:
             rule3_min_utterance_length=300,  # it essentially disables this rule
         )
 
-    def transcribe(self, sample_rate, audio):
+    def transcribe(self, sample_rate, audio) -> TranscriptionResult:
+        """audio 可以是任意采样率、(frames,) 或 (frames, channels) 的 float/int16 数组"""
+        stream = self.streams.acquire()
+        with self._convert_lock:
+            # accept_waveform 会拷贝样本，转换缓冲区出锁后即可复用
+            audio = self.converter.convert(audio, sample_rate)
+            duration = len(audio) / self.sample_rate
+            stream.accept_waveform(self.sample_rate, audio)
+
         if self.backend == "sensevoice":
-            stream = self.model.create_stream()
-            stream.accept_waveform(sample_rate, audio)
             self.model.decode_stream(stream)
-            return stream.result.text
+            return TranscriptionResult.from_sense_voice(stream.result, duration=duration)
 
         elif self.backend == "paraformer":
-            # 实时语音识别
-            last_result = ""
-            segment_id = 0
-            results = []
-            
-            stream = self.recognizer.create_stream()
-            stream.accept_waveform(sample_rate, audio)
+            # 整段音频一次送入，结束后取完整结果（不依赖端点检测）
+            stream.input_finished()
             while self.recognizer.is_ready(stream):
                 self.recognizer.decode_stream(stream)
 
-            is_endpoint = self.recognizer.is_endpoint(stream)
-
-            result = self.recognizer.get_result(stream)
-            debug = False
-            if result and (last_result != result):
-                last_result = result
-                if debug: logging.info("\r{}:{}".format(segment_id, result))
-            if is_endpoint:
-                if result:
-                    if debug:logging.info("\r{}:{}".format(segment_id, result))
-                    segment_id += 1
-                    # generator result
-                    #yield result
-                    results.append(result)
-                self.recognizer.reset(stream)
-            return " ".join(results)
+            # paraformer 不输出语言标签，由调用方做文字系统判断
+            return TranscriptionResult.from_online(
+                self.recognizer.get_result_all(stream), duration=duration
+            )
         else:
             raise ValueError(f"Unknown transcribe: {self.backend}")  
\ No newline at end of file
@@ -1,101 +1,206 @@
 import os
 import sys
-import queue
 import threading
 import time
 import logging
 
 import numpy as np
-import sherpa_onnx
 import soundfile as sf
 import sounddevice as sd
 
 from ..utils.utils import resource_path
+from ..utils.memory import track_load
+from ..utils.log import RealtimeLogger
+from ..utils.text_normalizer import normalize_for_tts
 from .share_state import State
-
-buffer = queue.Queue()
-started = False
-stopped = False
-killed = False
-sample_rate = None
-event = threading.Event()
-first_message_time = None
-play_thread_started = False
-play_thread_lock = threading.Lock()
+from .ring_buffer import AudioRingBuffer
+from .memory_budget import Unloadable
+from .tts_models import create_offline_tts, detect_tts_model
+from .governor import record_rtf
+
+PLAYBACK_BUFFER_SECONDS = 30
+DEFAULT_BLOCKSIZE = 1024
+DEFAULT_LATENCY = "low"
+
+_rt_log = RealtimeLogger(__name__)  # 播放/合成回调里用，不阻塞音频线程
+
+class AudioPlayer:
+    """
+    一个输出设备的播放状态：预分配的环形缓冲区 + 常驻输出流。
+    每个会话/设备各自持有一个实例；track_listening=True 时播放会暂停/恢复全局监听状态。
+    io 为 AudioIOProcess 时输出流在音频子进程里，缓冲区是共享内存中的播放环。
+    """
+
+    def __init__(self, device=None, blocksize=DEFAULT_BLOCKSIZE, latency=DEFAULT_LATENCY, track_listening=True, io=None):
+        self.device = device
+        self.blocksize = blocksize
+        self.latency = latency
+        self.track_listening = track_listening
+        self.io = io
+        self.buffer = None  # AudioRingBuffer，按采样率在 start() 中创建
+        self.stream = None
+        self.sample_rate = None
+        self.started = False
+        self.killed = False
+        self.event = threading.Event()
+        self.first_message_time = None
+        self._lock = threading.Lock()
+
+    def start(self, rate):
+        """打开常驻输出流；采样率变化时重建缓冲区和输出流"""
+        with self._lock:
+            if self.io is not None:
+                self.io.set_output_rate(rate)
+                self.sample_rate = rate
+                self.buffer = self.io.playback
+                return
+            if self.stream is not None and self.sample_rate == rate:
+                return
+            if self.stream is not None:
+                self.stream.close()
+            self.sample_rate = rate
+            self.buffer = AudioRingBuffer(int(rate * PLAYBACK_BUFFER_SECONDS))
+            self.stream = sd.OutputStream(
+                channels=1,
+                callback=self.callback,
+                dtype="float32",
+                samplerate=rate,
+                device=self.device,
+                blocksize=self.blocksize,
+                latency=self.latency,
+            )
+            self.stream.start()
+            logging.info(f"输出流: {rate}Hz, blocksize={self.blocksize}, latency={self.stream.latency:.3f}s")
+
+    def callback(self, outdata: np.ndarray, frames: int, cbtime, status: sd.CallbackFlags):
+        # 实时音频线程：只做拷贝，不分配内存、不加锁
+        if self.killed:
+            self.event.set()
+
+        if self.buffer.read_into(outdata[:, 0]) == 0 and self.track_listening:
+            State.resume_listening()  # 启用监听
+
+    def write(self, samples, rate):
+        self.start(rate)
+        self.buffer.write_blocking(samples, stop=self.event)
+        self.buffer.end()
+
+    def wait_drained(self, timeout=None):
+        """等待缓冲区播完（再加上设备本身的输出延迟）"""
+        deadline = None if timeout is None else time.time() + timeout
+        while self.buffer is not None and self.buffer.available() > 0 and not self.killed:
+            if deadline is not None and time.time() > deadline:
+                return False
+            time.sleep(0.005)
+        if not self.killed:
+            time.sleep(self.output_latency())
+        return True
+
+    def output_latency(self) -> float:
+        """写进缓冲区的音频要再过这么久才真正从喇叭出来（秒）"""
+        if self.io is not None:
+            return self.io.output_latency
+        if self.stream is not None:
+            return self.stream.latency
+        return 0.0
+
+    def buffered_seconds(self) -> float:
+        """已写入、尚未播放的音频秒数"""
+        if self.buffer is None:
+            return 0.0
+        return self.buffer.available() / self.sample_rate
+
+    def stats(self):
+        """欠载/溢出计数与当前缓冲的秒数"""
+        if self.buffer is None:
+            return {"underruns": 0, "overruns": 0, "buffered_seconds": 0.0}
+        return {
+            "underruns": self.buffer.underruns,
+            "overruns": self.buffer.overruns,
+            "buffered_seconds": self.buffered_seconds(),
+        }
+
+    def reset(self):
+        """清除上一次 stop() 留下的状态，之后可以继续播放"""
+        self.killed = False
+        self.event.clear()
+
+    def stop(self):
+        self.killed = True
+        if self.buffer is not None:
+            self.buffer.clear()
+        if self.track_listening:
+            State().resume_listening()
+        self.event.set()
+
+
+# 单麦克风模式使用的默认播放器，下面的模块级函数保持原有接口
+default_player = AudioPlayer()
 
 
 def generated_audio_callback(samples: np.ndarray, progress: float):
-    global started, first_message_time
-    if first_message_time is None:
-        first_message_time = time.time()
-    buffer.put(samples)
-    if not started:
-        logging.info("Start playing ...")
-        started = True
+    player = default_player
+    if player.first_message_time is None:
+        player.first_message_time = time.time()
+    player.buffer.write_blocking(samples, stop=player.event)
+    if not player.started:
+        _rt_log.info("Start playing ...")
+        player.started = True
         State.pause_listening() # 禁用监听
-    return 0 if killed else 1
+    return 0 if player.killed else 1
 
 
 def play_audio_callback(outdata: np.ndarray, frames: int, cbtime, status: sd.CallbackFlags):
-    if killed:
-        event.set()
+    default_player.callback(outdata, frames, cbtime, status)
 
-    if buffer.empty():
-        outdata.fill(0)
-        State().resume_listening()  # 启用监听
-        return
-
-    n = 0
-    while n < frames and not buffer.empty():
-        remaining = frames - n
-        k = buffer.queue[0].shape[0]
-
-        if remaining <= k:
-            outdata[n:, 0] = buffer.queue[0][:remaining]
-            buffer.queue[0] = buffer.queue[0][remaining:]
-            n = frames
-            if buffer.queue[0].shape[0] == 0:
-                buffer.get()
-            break
-
-        outdata[n : n + k, 0] = buffer.get()
-        n += k
-
-    if n < frames:
-        outdata[n:, 0] = 0
-
-
-def play_audio():
-    with sd.OutputStream(
-        channels=1,
-        callback=play_audio_callback,
-        dtype="float32",
-        samplerate=sample_rate,
-        blocksize=4096,
-        latency='high',  # 或 0.1
-    ):
-        event.wait()
+
+def start_playback(rate, device=None, blocksize=DEFAULT_BLOCKSIZE, latency=DEFAULT_LATENCY):
+    default_player.device = device
+    default_player.blocksize = blocksize
+    default_player.latency = latency
+    default_player.start(rate)
+
+
+def wait_drained(timeout=None):
+    return default_player.wait_drained(timeout)
+
+
+def playback_stats():
+    return default_player.stats()
+
+
+def play_audio(blocksize=DEFAULT_BLOCKSIZE, latency=DEFAULT_LATENCY):
+    start_playback(default_player.sample_rate, blocksize=blocksize, latency=latency)
+    default_player.event.wait()
     logging.info("Exiting ...")
 
 
 def stop_playback():
-    global killed
-    killed = True
-    State().resume_listening()
-    event.set()
+    default_player.stop()
 
 
-class TextToSpeech:
+class TextToSpeech(Unloadable):
     def __init__(self, 
                  model_dir="sherpa/vits-icefall-zh-aishell3",
                  output_device=None,  # 默认输出设备
                  backend="sherpa-onnx",
                  voice="af_alloy",   
                  speed=1.3,
+                 audio_cache=None,  # 可选的 ResponseCache，用于复用已合成的句子音频
+                 blocksize=DEFAULT_BLOCKSIZE,  # 输出流每次回调的帧数
+                 latency=DEFAULT_LATENCY,  # 设备输出延迟："low"/"high" 或秒数
+                 player=None,  # AudioPlayer，默认使用模块级的 default_player
+                 normalizer=normalize_for_tts,  # 合成前的文本归一化，None 表示原样送入
+                 sid=0,  # 多说话人模型的说话人编号，kokoro 见 https://k2-fsa.github.io/sherpa/onnx/tts/pretrained_models/kokoro.html
+                 num_threads=None,  # ONNX 推理线程数，None 为全部核心
         ):
         self.backend = backend
         self.voice = voice
-        self.speed = speed
+        self.speed = speed  # 越大越快，合成时覆盖模型配置里的 length_scale
+        self.sid = sid
+        self.num_threads = num_threads
+        self.audio_cache = audio_cache
+        self.normalizer = normalizer
         # 如果 output_device 为 None，直接使用 sounddevice 默认设备
         if output_device is None:
             self.output_device = None  # 不做任何修改，使用默认设备
@@ -111,14 +216,93 @@ class TextToSpeech:
         self.model_dir = real_path
         if not os.path.isdir(self.model_dir):
             raise FileNotFoundError(f"Model directory not found: {self.model_dir}")
+        # 模型类型只识别一次，引擎按需创建/卸载时直接复用
+        self.model_files = detect_tts_model(self.model_dir)
+        logging.info(f"TTS 模型: {self.model_files.name} ({self.model_files.kind})")
+
+        self._engine = None
+        self._engine_lock = threading.Lock()  # 多个会话共享同一个引擎时串行合成
+        if player is None:
+            player = default_player
+            player.device = self.output_device
+            player.blocksize = blocksize
+            player.latency = latency
+        self.player = player
 
     def synthesize(self, text):
+        samples, rate = self.render(text)
+        if len(samples) == 0:
+            return
+        self.play(samples, rate)
+
+    def render(self, text):
+        """合成文本但不播放，返回 (samples, sample_rate)"""
+        if self.normalizer is not None:
+            text = self.normalizer(text)
+        if not text:
+            return np.zeros(0, dtype=np.float32), 0
+
+        cached = self.audio_cache.get_audio(text) if self.audio_cache is not None else None
+        if cached is not None:
+            logging.info(f"合成音频缓存命中: {text}")
+            return cached
+
         if self.backend == "sherpa-onnx":
-            self._synthesize_sherpa_onnx(text)
+            samples, rate = self._synthesize_sherpa_onnx(text)
         else:
             raise ValueError(f"Unsupported backend: {self.backend}")
 
-    def _synthesize_sherpa_onnx(self, text):
+        if self.audio_cache is not None and len(samples) > 0:
+            self.audio_cache.put_audio(text, samples, rate)
+        return samples, rate
+
+    def save(self, text, path):
+        """合成文本写入 16 位 WAV/FLAC（按扩展名），不播放；返回音频秒数"""
+        samples, rate = self.render(text)
+        if len(samples) == 0:
+            return 0.0
+        sf.write(path, samples, rate, subtype="PCM_16")
+        return len(samples) / rate
+
+    def play(self, samples, rate, blocking=True):
+        """
+        写入常驻输出流的环形缓冲区播放。blocking=False 时立即返回且不暂停监听，
+        用于唤醒应答这类需要与录音并行的短提示音。
+        stop() 只打断当时正在播放的内容，新的 play() 会清掉它留下的状态。
+        """
+        self.player.reset()
+        self.player.write(samples, rate)
+        if not blocking:
+            return
+
+        # 先写入再暂停监听：缓冲区播空时回调会自动恢复监听
+        State().pause_listening()  # 禁用监听
+        self.player.wait_drained()
+        State().resume_listening()  # 启用监听
+
+    def is_loaded(self) -> bool:
+        return self._engine is not None
+
+    def load(self) -> None:
+        with self._engine_lock:
+            if self._engine is None:
+                with track_load("tts"):
+                    self._engine = self._create_sherpa_onnx()
+
+    def unload(self) -> None:
+        with self._engine_lock:
+            self._engine = None
+
+    def _get_engine(self):
+        # OfflineTts 只在首次使用时创建，之后复用；低内存模式下空闲时可能被卸载
+        self.ensure_loaded()
+        engine = self._engine
+        if engine is None:
+            self.load()
+            engine = self._engine
+        return engine
+
+    def _create_sherpa_onnx(self):
         import torch
         import platform
 
@@ -131,112 +315,36 @@ class TextToSpeech:
             else:
                 return "cpu"
 
-        try:
-            model_files = {
-                "model": None,
-                "lexicon": None,
-                "tokens": None,
-                "dict_dir": None,
-                "rule_fsts": [],
-            }
-
-            lexicons = []
-            for file in os.listdir(self.model_dir):
-                file_path = os.path.join(self.model_dir, file)
-                if file.endswith(".onnx"):
-                    model_files["model"] = file_path
-                elif file == "voices.bin":
-                    model_files["kokoro_voices"] = file_path
-                elif file == "lexicon.txt" or file == "lexicon-us-en.txt" or file == "lexicon-zh.txt":
-                    lexicons.append(file_path)
-                elif file == "tokens.txt":
-                    model_files["tokens"] = file_path
-                elif os.path.isdir(file_path) and file == "espeak-ng-data":
-                    model_files["data_dir"] = file_path
-                elif os.path.isdir(file_path) and file == "dict":
-                    model_files["dict_dir"] = file_path
-                elif file.endswith(".fst"):
-                    model_files["rule_fsts"].append(file_path)
-
-            if not model_files["model"]:
-                raise FileNotFoundError("未找到ONNX模型文件")
-
-            # 拼接多个lexicon路径
-            model_files["lexicon"] = ",".join(lexicons)
-
-            # 获取可选的 voices 字段，若没有则使用空字符串
-            kokoro_voices = model_files.get("kokoro_voices", "")
-            dict_dir = model_files.get("dict_dir", '')
-            data_dir = model_files.get("data_dir", '')
-
-            provider = detect_provider()
-            # https://k2-fsa.github.io/sherpa/onnx/tts/pretrained_models/kokoro.html
-            sid = 0
-            num_threads = os.cpu_count()
-            rule_fsts = ",".join(model_files["rule_fsts"]) if model_files["rule_fsts"] else ""
-
-            tts_config = sherpa_onnx.OfflineTtsConfig(
-                model=sherpa_onnx.OfflineTtsModelConfig(
-                    vits=sherpa_onnx.OfflineTtsVitsModelConfig(
-                        model=model_files["model"],
-                        lexicon=model_files["lexicon"],
-                        dict_dir=model_files["dict_dir"] or '',
-                        tokens=model_files["tokens"],
-                        length_scale=self.speed,  # 设置语速
-                    ),
-                    kokoro=sherpa_onnx.OfflineTtsKokoroModelConfig(
-                        model=model_files["model"],
-                        voices=kokoro_voices,
-                        tokens=model_files["tokens"],
-                        lexicon=model_files["lexicon"],
-                        data_dir=data_dir,
-                        dict_dir=model_files["dict_dir"] or '',
-                        length_scale=self.speed,
-                    ),
-                    provider=provider,
-                    debug=False,
-                    num_threads=num_threads,
-                ),
-                rule_fsts=rule_fsts,
-                max_num_sentences=1,
-            )
-
-            if not tts_config.validate():
-                raise ValueError("TTS 配置无效，请检查模型文件")
-
-            tts = sherpa_onnx.OfflineTts(tts_config)
+        engine = create_offline_tts(self.model_files, self.num_threads, detect_provider())
+        if not 0 <= self.sid < max(engine.num_speakers, 1):
+            logging.warning(f"说话人 {self.sid} 超出范围（共 {engine.num_speakers} 个），改用 0")
+            self.sid = 0
+        return engine
 
-            global sample_rate, play_thread_started, started, stopped
-            sample_rate = tts.sample_rate
-            started = False
-            stopped = False
+    def _synthesize_sherpa_onnx(self, text):
+        try:
+            tts = self._get_engine()
 
             start = time.time()
             #Speech speed. Larger->faster; smaller->slower
-            audio = tts.generate(text, sid=sid, speed=self.speed)
+            with self._engine_lock:
+                audio = tts.generate(text, sid=self.sid, speed=self.speed)
             end = time.time()
             logging.info(f"合成耗时: {end - start:.3f}秒")
 
-            stopped = True
-
             if len(audio.samples) == 0:
                 logging.info("生成失败，无音频")
-                return
+                return np.zeros(0, dtype=np.float32), tts.sample_rate
 
             elapsed_seconds = end - start
             audio_duration = len(audio.samples) / audio.sample_rate
             real_time_factor = elapsed_seconds / audio_duration
-            
-            State().pause_listening()  # 禁用监听
-            
-            # 播放音频
-            sd.play(audio.samples, samplerate=tts.sample_rate, device=self.output_device)
-            sd.wait()
-
-            State().resume_listening()  # 启用监听
 
             logging.info(f"Audio duration: {audio_duration:.3f}s")
             logging.info(f"RTF: {elapsed_seconds:.3f}/{audio_duration:.3f} = {real_time_factor:.3f}")
+            record_rtf("tts", real_time_factor)
+
+            return np.asarray(audio.samples, dtype=np.float32), audio.sample_rate
 
         except Exception as e:
             logging.info(f"[ERROR] 合成失败: {e}")
@@ -244,14 +352,6 @@ class TextToSpeech:
 
 
 if __name__ == "__main__":
-    tts = TextToSpeech(
-        backend="sherpa-onnx",
-        model_dir="/path/to/sherpa-onnx/models",
-        voice="zh-cn",
-        speed=1.0,
-    )
-
-    try:
-        tts.synthesize("你好，世界！", "output.wav")
-    finally:
-        stop_playback()
\ No newline at end of file
+    # 单句合成到文件；批量合成用 python -m src.core.tts_render
+    tts = TextToSpeech(backend="sherpa-onnx", speed=1.0)
+    print(tts.save("你好，世界！", "output.wav"))
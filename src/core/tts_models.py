@@ -0,0 +1,183 @@
+import os
+from dataclasses import dataclass
+from typing import Iterable, List, Optional
+
+# sherpa-onnx 的 TTS 模型目录识别：按目录里的文件判断模型类型，只构建对应的一种配置。
+# 不导入 sherpa_onnx，识别和基准的模型枚举不需要加载推理库。
+
+TTS_KINDS = ("vits", "matcha", "kokoro", "kitten")
+_VOCODER_PREFIXES = ("vocos", "hifigan")
+_LEXICONS = ("lexicon.txt", "lexicon-zh.txt", "lexicon-us-en.txt")
+_FST_ORDER = ("phone", "date", "number")  # 与 sherpa-onnx 示例一致：电话、日期、数字
+
+
+@dataclass
+class TtsModelFiles:
+    kind: str            # TTS_KINDS 之一
+    model: str           # matcha 为声学模型
+    tokens: str
+    lexicon: str = ""    # 多个词典用逗号连接
+    data_dir: str = ""   # espeak-ng-data
+    dict_dir: str = ""   # jieba 词典
+    voices: str = ""     # kokoro/kitten 的 voices.bin
+    vocoder: str = ""    # matcha 的声码器（vocos/hifigan）
+    rule_fsts: str = ""
+
+    @property
+    def name(self) -> str:
+        return os.path.basename(os.path.dirname(self.model))
+
+    def size_bytes(self) -> int:
+        """模型、声码器和音色文件的总大小"""
+        return sum(os.path.getsize(p) for p in (self.model, self.vocoder, self.voices) if p)
+
+
+def _is_vocoder(file: str) -> bool:
+    return file.startswith(_VOCODER_PREFIXES) and file.endswith(".onnx")
+
+
+def _pick_model(files: List[str], prefer_int8: bool) -> str:
+    # 同一目录常同时提供 fp32 和 int8 两个版本
+    int8 = [f for f in files if ".int8." in f]
+    full = [f for f in files if ".int8." not in f]
+    preferred, fallback = (int8, full) if prefer_int8 else (full, int8)
+    return sorted(preferred or fallback)[0]
+
+
+def _fst_key(path: str):
+    name = os.path.basename(path)
+    for i, prefix in enumerate(_FST_ORDER):
+        if name.startswith(prefix):
+            return i, name
+    return len(_FST_ORDER), name
+
+
+def _find_vocoder(model_dir: str) -> str:
+    # 声码器是单独下载的，可能放在模型目录里，也可能放在上一级与其它模型并列
+    for directory in (model_dir, os.path.dirname(os.path.abspath(model_dir))):
+        vocoders = sorted(f for f in os.listdir(directory) if _is_vocoder(f))
+        if vocoders:
+            return os.path.join(directory, vocoders[0])
+    return ""
+
+
+def detect_tts_model(model_dir: str, prefer_int8: bool = False) -> TtsModelFiles:
+    """识别 model_dir 中的 TTS 模型类型和各文件路径，缺少模型或 tokens.txt 时抛出 FileNotFoundError"""
+    entries = sorted(os.listdir(model_dir))
+    models = [f for f in entries if f.endswith(".onnx") and not _is_vocoder(f)]
+    if not models:
+        raise FileNotFoundError(f"未找到ONNX模型文件: {model_dir}")
+    if "tokens.txt" not in entries:
+        raise FileNotFoundError(f"未找到 tokens.txt: {model_dir}")
+
+    def path(name: str) -> str:
+        return os.path.join(model_dir, name) if name in entries else ""
+
+    def subdir(name: str) -> str:
+        return path(name) if os.path.isdir(os.path.join(model_dir, name)) else ""
+
+    dir_name = os.path.basename(os.path.normpath(model_dir)).lower()
+    voices = path("voices.bin")
+    vocoder = _find_vocoder(model_dir) if "matcha" in dir_name or any(map(_is_vocoder, entries)) else ""
+    if voices:
+        kind = "kitten" if "kitten" in dir_name else "kokoro"
+    elif vocoder:
+        kind = "matcha"
+    elif "matcha" in dir_name:
+        raise FileNotFoundError(f"Matcha 模型缺少声码器（vocos/hifigan）: {model_dir}")
+    else:
+        kind = "vits"
+
+    fsts = sorted((os.path.join(model_dir, f) for f in entries if f.endswith(".fst")), key=_fst_key)
+    return TtsModelFiles(
+        kind=kind,
+        model=os.path.join(model_dir, _pick_model(models, prefer_int8)),
+        tokens=path("tokens.txt"),
+        lexicon=",".join(os.path.join(model_dir, f) for f in entries if f in _LEXICONS),
+        data_dir=subdir("espeak-ng-data"),
+        dict_dir=subdir("dict"),
+        voices=voices,
+        vocoder=vocoder,
+        rule_fsts=",".join(fsts),
+    )
+
+
+def find_tts_models(roots: Iterable[str], prefer_int8: bool = False) -> List[TtsModelFiles]:
+    """列出 roots 下一级子目录中的 TTS 模型；ASR、VAD 等同样带 tokens.txt 的目录会被跳过"""
+    found = []
+    for root in roots:
+        if not os.path.isdir(root):
+            continue
+        for entry in sorted(os.listdir(root)):
+            model_dir = os.path.join(root, entry)
+            if not os.path.isdir(model_dir):
+                continue
+            try:
+                files = detect_tts_model(model_dir, prefer_int8)
+            except FileNotFoundError:
+                continue
+            # TTS 模型总要把文字转成音素：词典、espeak 数据或音色文件至少有一个
+            if files.lexicon or files.data_dir or files.voices:
+                found.append(files)
+    return found
+
+
+def build_tts_config(files: TtsModelFiles, num_threads: Optional[int] = None, provider: str = "cpu"):
+    """只为识别出的模型类型构建 OfflineTtsConfig"""
+    import sherpa_onnx
+
+    if files.kind == "vits":
+        family = {"vits": sherpa_onnx.OfflineTtsVitsModelConfig(
+            model=files.model,
+            lexicon=files.lexicon,
+            tokens=files.tokens,
+            data_dir=files.data_dir,
+            dict_dir=files.dict_dir,
+        )}
+    elif files.kind == "matcha":
+        family = {"matcha": sherpa_onnx.OfflineTtsMatchaModelConfig(
+            acoustic_model=files.model,
+            vocoder=files.vocoder,
+            lexicon=files.lexicon,
+            tokens=files.tokens,
+            data_dir=files.data_dir,
+            dict_dir=files.dict_dir,
+        )}
+    elif files.kind == "kokoro":
+        family = {"kokoro": sherpa_onnx.OfflineTtsKokoroModelConfig(
+            model=files.model,
+            voices=files.voices,
+            tokens=files.tokens,
+            lexicon=files.lexicon,
+            data_dir=files.data_dir,
+            dict_dir=files.dict_dir,
+        )}
+    elif files.kind == "kitten":
+        family = {"kitten": sherpa_onnx.OfflineTtsKittenModelConfig(
+            model=files.model,
+            voices=files.voices,
+            tokens=files.tokens,
+            data_dir=files.data_dir,
+        )}
+    else:
+        raise ValueError(f"Unsupported TTS model type: {files.kind}")
+
+    return sherpa_onnx.OfflineTtsConfig(
+        model=sherpa_onnx.OfflineTtsModelConfig(
+            **family,
+            provider=provider,
+            debug=False,
+            num_threads=num_threads or os.cpu_count(),
+        ),
+        rule_fsts=files.rule_fsts,
+        max_num_sentences=1,
+    )
+
+
+def create_offline_tts(files: TtsModelFiles, num_threads: Optional[int] = None, provider: str = "cpu"):
+    import sherpa_onnx
+
+    config = build_tts_config(files, num_threads, provider)
+    if not config.validate():
+        raise ValueError(f"TTS 配置无效，请检查模型文件: {files.name} ({files.kind})")
+    return sherpa_onnx.OfflineTts(config)
@@ -0,0 +1,224 @@
+import argparse
+import json
+import logging
+import multiprocessing
+import os
+import re
+import time
+from dataclasses import asdict, dataclass
+from typing import Iterable, List, Optional, Union
+
+import numpy as np
+
+from ..utils.text_normalizer import normalize_for_tts
+from ..utils.utils import resource_path, smart_split
+from .tts_models import create_offline_tts, detect_tts_model
+
+# 离线批量合成到文件：预先生成故事包、常用语等音频。文本按 smart_split 分句后交给进程池，
+# 每个工作进程常驻一个 OfflineTts（线程数固定为 threads_per_worker），每条文本写成一个 16 位 WAV/FLAC，
+# 另写 manifest.jsonl 记录时长，最后报告吞吐量（音频秒/墙钟秒）。
+#
+# 用法:
+#     python -m src.core.tts_render texts.jsonl -o out/ [--model DIR] [--workers 4] [--threads 1] [--format flac]
+
+FORMATS = ("wav", "flac")
+MANIFEST = "manifest.jsonl"
+
+
+@dataclass
+class RenderItem:
+    id: str
+    text: str
+
+
+@dataclass
+class RenderReport:
+    items: int
+    sentences: int
+    audio_seconds: float
+    wall_seconds: float
+    synth_seconds: float   # 各工作进程合成耗时之和
+    manifest: str
+
+    @property
+    def throughput(self) -> float:
+        """每墙钟秒产出的音频秒数"""
+        return self.audio_seconds / self.wall_seconds if self.wall_seconds else 0.0
+
+    def report(self):
+        out = {k: round(v, 2) if isinstance(v, float) else v for k, v in asdict(self).items()}
+        out["throughput"] = round(self.throughput, 2)
+        return out
+
+
+def load_texts(path: str) -> List[RenderItem]:
+    """读取 .jsonl（每行 {"id": ..., "text": ...}，id 可省略）或纯文本（每行一条）"""
+    items = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            if path.endswith(".jsonl"):
+                record = json.loads(line)
+                items.append(RenderItem(str(record.get("id", f"{len(items):04d}")), record["text"]))
+            else:
+                items.append(RenderItem(f"{len(items):04d}", line))
+    return items
+
+
+def _as_items(texts: Iterable[Union[str, dict, RenderItem]]) -> List[RenderItem]:
+    items = []
+    for t in texts:
+        if isinstance(t, RenderItem):
+            items.append(t)
+        elif isinstance(t, dict):
+            items.append(RenderItem(str(t.get("id", f"{len(items):04d}")), t["text"]))
+        else:
+            items.append(RenderItem(f"{len(items):04d}", t))
+    return items
+
+
+def _file_name(item_id: str, fmt: str) -> str:
+    return re.sub(r"[\\/:*?\"<>|\s]+", "_", item_id) + "." + fmt
+
+
+def to_pcm16(samples: np.ndarray) -> np.ndarray:
+    return (np.clip(samples, -1.0, 1.0) * 32767).astype(np.int16)
+
+
+# ---- 工作进程：initializer 里创建一次 OfflineTts，之后所有句子复用 ----
+
+_worker = {}
+
+
+def _init_worker(model_dir: str, num_threads: int, sid: int, speed: float) -> None:
+    _worker["tts"] = create_offline_tts(detect_tts_model(model_dir), num_threads)
+    _worker["sid"] = sid
+    _worker["speed"] = speed
+
+
+def _synthesize(job):
+    index, sentence = job
+    text = normalize_for_tts(sentence)
+    tts = _worker["tts"]
+    if not text:
+        return index, np.zeros(0, dtype=np.int16), tts.sample_rate, 0.0
+    start = time.perf_counter()
+    audio = tts.generate(text, sid=_worker["sid"], speed=_worker["speed"])
+    elapsed = time.perf_counter() - start
+    # 以 int16 传回主进程，进程间拷贝量减半
+    return index, to_pcm16(np.asarray(audio.samples, dtype=np.float32)), audio.sample_rate, elapsed
+
+
+def render_to_files(
+    texts: Iterable[Union[str, dict, RenderItem]],
+    output_dir: str,
+    model_dir: str = "sherpa/vits-icefall-zh-aishell3",
+    workers: Optional[int] = None,
+    threads_per_worker: int = 1,
+    fmt: str = "wav",
+    sid: int = 0,
+    speed: float = 1.3,
+    gap_seconds: float = 0.15,
+) -> RenderReport:
+    """
+    把每条文本合成为 output_dir 下的一个音频文件，句间插入 gap_seconds 秒静音，并写 manifest.jsonl。
+    workers 默认按 CPU 核数 / threads_per_worker 计算。
+    """
+    import soundfile as sf
+
+    if fmt not in FORMATS:
+        raise ValueError(f"Unsupported format: {fmt}")
+    model_dir = resource_path(model_dir)
+    detect_tts_model(model_dir)  # 在启动进程池之前就暴露模型目录的问题
+    items = _as_items(texts)
+    workers = workers or max(1, (os.cpu_count() or 1) // threads_per_worker)
+    jobs = [(i, s) for i, item in enumerate(items) for s in (smart_split(item.text) or [item.text])]
+    os.makedirs(output_dir, exist_ok=True)
+    manifest_path = os.path.join(output_dir, MANIFEST)
+
+    sentences = [0] * len(items)
+    for i, _ in jobs:
+        sentences[i] += 1
+    remaining = list(sentences)
+    parts = [[] for _ in items]
+    audio_seconds, synth_seconds = 0.0, 0.0
+
+    logging.info(f"离线合成: {len(items)} 条, {len(jobs)} 句, {workers} 个进程 x {threads_per_worker} 线程")
+    start = time.perf_counter()
+    # spawn：不继承调用方（可能已加载 torch/ONNX 线程池）的进程状态
+    ctx = multiprocessing.get_context("spawn")
+    with ctx.Pool(workers, initializer=_init_worker, initargs=(model_dir, threads_per_worker, sid, speed)) as pool, \
+            open(manifest_path, "w", encoding="utf-8") as manifest:
+        # imap 按提交顺序返回，同一条文本的句子依次到齐，写完即释放
+        for index, pcm, rate, elapsed in pool.imap(_synthesize, jobs, chunksize=1):
+            synth_seconds += elapsed
+            if len(pcm):
+                parts[index].append(pcm)
+            remaining[index] -= 1
+            if remaining[index]:
+                continue
+
+            item = items[index]
+            gap = np.zeros(int(gap_seconds * rate), dtype=np.int16)
+            chunks = []
+            for pcm_part in parts[index]:
+                chunks += [pcm_part, gap]
+            audio = np.concatenate(chunks[:-1]) if chunks else np.zeros(0, dtype=np.int16)
+            parts[index] = []
+            duration = len(audio) / rate
+            audio_seconds += duration
+            name = _file_name(item.id, fmt)
+            if len(audio):
+                sf.write(os.path.join(output_dir, name), audio, rate, subtype="PCM_16")
+            else:
+                logging.warning(f"没有合成出音频: {item.id} {item.text}")
+                name = None
+            manifest.write(json.dumps({
+                "id": item.id,
+                "text": item.text,
+                "file": name,
+                "duration": round(duration, 3),
+                "sample_rate": rate,
+                "sentences": sentences[index],
+            }, ensure_ascii=False) + "\n")
+
+    report = RenderReport(
+        items=len(items),
+        sentences=len(jobs),
+        audio_seconds=audio_seconds,
+        wall_seconds=time.perf_counter() - start,
+        synth_seconds=synth_seconds,
+        manifest=manifest_path,
+    )
+    logging.info(f"离线合成完成: {report.report()}")
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="批量合成文本到音频文件")
+    parser.add_argument("input", help=".jsonl（id/text）或每行一条的文本文件")
+    parser.add_argument("--output-dir", "-o", required=True)
+    parser.add_argument("--model", default="sherpa/vits-icefall-zh-aishell3", help="TTS 模型目录，类型自动识别")
+    parser.add_argument("--workers", type=int, default=None, help="工作进程数，默认 CPU 核数 / --threads")
+    parser.add_argument("--threads", type=int, default=1, help="每个工作进程的 ONNX 线程数")
+    parser.add_argument("--format", choices=FORMATS, default="wav")
+    parser.add_argument("--sid", type=int, default=0)
+    parser.add_argument("--speed", type=float, default=1.3)
+    parser.add_argument("--gap", type=float, default=0.15, help="句间静音秒数")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+    report = render_to_files(
+        load_texts(args.input), args.output_dir, args.model,
+        workers=args.workers, threads_per_worker=args.threads, fmt=args.format,
+        sid=args.sid, speed=args.speed, gap_seconds=args.gap,
+    )
+    print(f"{report.items} 条 / {report.sentences} 句, 音频 {report.audio_seconds:.1f} 秒, "
+          f"耗时 {report.wall_seconds:.1f} 秒, 吞吐 {report.throughput:.2f} 音频秒/秒")
+    print(f"清单: {report.manifest}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,153 @@
+import os
+import json
+import struct
+import logging
+import threading
+from contextlib import contextmanager
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+# safetensors 文件格式：8 字节小端头长度 + JSON 头 + 连续的张量数据。
+# 这里直接用 numpy.memmap 映射数据区，张量与页缓存共享物理页，
+# 多个进程加载同一份权重时只占一份内存（PSS 按进程数均摊）。
+
+_NUMPY_DTYPES = {
+    "F64": np.float64, "F32": np.float32, "F16": np.float16,
+    "I64": np.int64, "I32": np.int32, "I16": np.int16, "I8": np.int8,
+    "U8": np.uint8, "BOOL": np.bool_,
+    "BF16": np.uint16,  # numpy 没有 bfloat16，按位读出后在 torch 侧 view 回来
+}
+_FLOAT_DTYPES = {"F64", "F32", "F16", "BF16"}
+
+# _empty_weights 临时替换了全局的 nn.Module.register_parameter，期间其他线程构造的模型
+# （草稿模型、低内存模式下的重新加载）也会被建在 meta 设备上；所有模型构造都要持有这把锁
+construction_lock = threading.RLock()
+
+
+def read_safetensors_header(path: str) -> Tuple[Dict, int]:
+    """返回 (张量元信息, 数据区起始偏移)"""
+    with open(path, "rb") as f:
+        (length,) = struct.unpack("<Q", f.read(8))
+        header = json.loads(f.read(length))
+    header.pop("__metadata__", None)
+    return header, 8 + length
+
+
+def mmap_safetensors(path: str) -> Dict[str, Tuple[np.ndarray, str]]:
+    """把 safetensors 文件映射为 {名字: (numpy 视图, safetensors dtype)}，不读入数据"""
+    header, offset = read_safetensors_header(path)
+    # 写时复制映射：误写只会私有化对应页，不会改到文件
+    data = np.memmap(path, dtype=np.uint8, mode="c", offset=offset)
+    tensors = {}
+    for name, info in header.items():
+        dtype = info["dtype"]
+        if dtype not in _NUMPY_DTYPES:
+            raise ValueError(f"不支持的 dtype {dtype}: {name}")
+        begin, end = info["data_offsets"]
+        array = data[begin:end].view(_NUMPY_DTYPES[dtype]).reshape(info["shape"])
+        tensors[name] = (array, dtype)
+    return tensors
+
+
+def weight_files(model_dir: str) -> List[str]:
+    """模型目录下的 safetensors 权重（支持分片）"""
+    index = os.path.join(model_dir, "model.safetensors.index.json")
+    if os.path.exists(index):
+        with open(index) as f:
+            shards = sorted(set(json.load(f)["weight_map"].values()))
+        return [os.path.join(model_dir, s) for s in shards]
+    single = os.path.join(model_dir, "model.safetensors")
+    return [single] if os.path.exists(single) else []
+
+
+def mmap_compatible(model_dir: str) -> bool:
+    """
+    只有浮点权重以 F32 存储时才走 mmap：from_pretrained 不指定 torch_dtype 时按 float32 加载，
+    直接映射 F16/BF16 会悄悄改变 CPU 推理精度，转换又会复制权重、失去共享页缓存的意义。
+    """
+    files = weight_files(model_dir)
+    if not files:
+        return False
+    dtypes = {
+        info["dtype"]
+        for path in files
+        for info in read_safetensors_header(path)[0].values()
+        if info["dtype"] in _FLOAT_DTYPES
+    }
+    if dtypes - {"F32"}:
+        logging.info(f"权重以 {'/'.join(sorted(dtypes))} 存储，不使用 mmap 加载")
+        return False
+    return True
+
+
+def load_state_dict_mmap(model_dir: str):
+    """返回 (state_dict, 映射的文件列表)；没有 safetensors 时退回 torch.load(mmap=True)"""
+    import torch
+
+    files = weight_files(model_dir)
+    state_dict = {}
+    for path in files:
+        for name, (array, dtype) in mmap_safetensors(path).items():
+            tensor = torch.from_numpy(array)
+            state_dict[name] = tensor.view(torch.bfloat16) if dtype == "BF16" else tensor
+    if files:
+        return state_dict, files
+
+    path = os.path.join(model_dir, "pytorch_model.bin")
+    if os.path.exists(path):
+        # 新版 zip 格式的 .bin 也可以 mmap，需要 torch >= 2.1
+        return torch.load(path, map_location="cpu", mmap=True, weights_only=True), [path]
+    raise FileNotFoundError(f"{model_dir} 下没有 model.safetensors 或 pytorch_model.bin")
+
+
+@contextmanager
+def _empty_weights():
+    """在 meta 设备上创建参数（不分配内存），缓冲区（如 RoPE 频率表）照常在 CPU 上计算"""
+    from torch import nn
+
+    with construction_lock:
+        original = nn.Module.register_parameter
+
+        def register_parameter(module, name, param):
+            original(module, name, param)
+            if param is not None:
+                module._parameters[name] = nn.Parameter(param.to("meta"), requires_grad=param.requires_grad)
+
+        nn.Module.register_parameter = register_parameter
+        try:
+            yield
+        finally:
+            nn.Module.register_parameter = original
+
+
+def load_model_mmap(model_dir: str):
+    """
+    创建一个参数直接指向 mmap 权重的 CausalLM：
+    先在 meta 设备上搭好结构，再用 load_state_dict(assign=True) 把映射出来的张量挂上去，
+    整个过程不会复制权重。返回 (model, 映射的文件列表)。
+    """
+    import torch
+    from transformers import AutoConfig, AutoModelForCausalLM
+
+    config = AutoConfig.from_pretrained(model_dir, trust_remote_code=True)
+    with _empty_weights():
+        model = AutoModelForCausalLM.from_config(config, trust_remote_code=True)
+
+    state_dict, files = load_state_dict_mmap(model_dir)
+    # 与 from_pretrained 的默认精度保持一致；需要转换的张量会被复制，不再共享页缓存
+    default = torch.get_default_dtype()
+    for name, tensor in state_dict.items():
+        if tensor.is_floating_point() and tensor.dtype != default:
+            state_dict[name] = tensor.to(default)
+    model.load_state_dict(state_dict, strict=False, assign=True)
+    if hasattr(model, "tie_weights"):
+        model.tie_weights()
+
+    missing = [name for name, p in model.named_parameters() if p.device.type == "meta"]
+    if missing:
+        raise ValueError(f"权重文件缺少参数: {missing[:5]}{'...' if len(missing) > 5 else ''}")
+    for p in model.parameters():
+        p.requires_grad_(False)
+    logging.info(f"已通过 mmap 加载 {len(state_dict)} 个张量: {', '.join(os.path.basename(f) for f in files)}")
+    return model.eval(), files
@@ -0,0 +1 @@
+# src/server/__init__.py
\ No newline at end of file
@@ -0,0 +1,67 @@
+import sys
+import json
+import base64
+import socket
+import argparse
+from typing import Dict, Iterator
+
+from .daemon import DEFAULT_SOCKET
+
+
+def request(payload: Dict, socket_path: str = DEFAULT_SOCKET, timeout: float = 120.0) -> Iterator[Dict]:
+    """向守护进程发送一个请求，逐条产出响应，直到 done/error"""
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        sock.settimeout(timeout)
+        sock.connect(socket_path)
+        sock.sendall(json.dumps(payload, ensure_ascii=False).encode("utf-8") + b"\n")
+        with sock.makefile("rb") as reader:
+            for line in reader:
+                message = json.loads(line)
+                yield message
+                if message.get("type") in ("done", "error"):
+                    return
+
+
+def main():
+    parser = argparse.ArgumentParser(description="AI doll 守护进程客户端")
+    parser.add_argument("op", choices=["chat", "tts", "stt", "turn", "ping", "stats", "profile"])
+    parser.add_argument("input", nargs="?", help="文本，或 stt/turn 时的 wav 路径")
+    parser.add_argument("--socket", default=DEFAULT_SOCKET)
+    parser.add_argument("--output", "-o", help="tts/turn 时把合成音频依次保存为 <output>-N.wav")
+    parser.add_argument("--seconds", type=float, help="profile 的采样时长，默认用守护进程配置")
+    parser.add_argument("--wait", action="store_true", help="profile 时等采样结束再返回报告")
+    args = parser.parse_args()
+
+    payload = {"op": args.op}
+    if args.op in ("stt", "turn") and args.input and args.input.endswith(".wav"):
+        payload["path"] = args.input
+    elif args.input:
+        payload["text"] = args.input
+    timeout = 120.0
+    if args.op == "profile":
+        if args.seconds is not None:
+            payload["seconds"] = args.seconds
+        if args.wait:
+            payload["wait"] = True
+            timeout += args.seconds or 0.0
+
+    audio_idx = 0
+    for message in request(payload, args.socket, timeout):
+        kind = message.get("type")
+        if kind == "delta":
+            print(message["text"], end="", flush=True)
+        elif kind == "audio":
+            audio_idx += 1
+            if args.output:
+                with open(f"{args.output}-{audio_idx}.wav", "wb") as f:
+                    f.write(base64.b64decode(message["data"]))
+        elif kind == "error":
+            print(f"\n[ERROR] {message['error']}", file=sys.stderr)
+            sys.exit(1)
+        elif kind == "done":
+            print()
+            print(json.dumps(message, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
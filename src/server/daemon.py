@@ -0,0 +1,325 @@
+import io
+import os
+import json
+import base64
+import queue
+import logging
+import threading
+import socketserver
+from dataclasses import dataclass, field
+from typing import Callable, Dict, Iterator, Optional
+
+import numpy as np
+import soundfile as sf
+
+from ..utils.memory import memory_report
+from ..utils.utils import smart_split
+
+DEFAULT_SOCKET = "/tmp/ai-doll.sock"
+
+# 一行一个 JSON 的本地协议：
+#   请求  {"op": "chat" | "tts" | "stt" | "turn" | "ping" | "stats" | "profile", ...}
+#   响应  {"type": "queued"} {"type": "delta"} {"type": "audio"} ... 最后一行为 {"type": "done"} 或 {"type": "error"}
+
+
+def parse_request(line: bytes) -> Dict:
+    """解析一行请求，格式不对时抛出 ValueError"""
+    request = json.loads(line)
+    if not isinstance(request, dict):
+        raise ValueError("请求必须是 JSON 对象")
+    if request.get("op") == "profile" and request.get("seconds") is not None:
+        seconds = request["seconds"]
+        # 响应是在生成器里产出的，这里不先检查的话出错时连接直接断开，收不到 error
+        if isinstance(seconds, bool) or not isinstance(seconds, (int, float)) or not 0 < seconds < float("inf"):
+            raise ValueError(f"seconds 必须是正数: {seconds!r}")
+    return request
+
+
+def encode_wav(samples: np.ndarray, sample_rate: int) -> str:
+    buf = io.BytesIO()
+    sf.write(buf, samples, sample_rate, format="WAV", subtype="PCM_16")
+    return base64.b64encode(buf.getvalue()).decode("ascii")
+
+
+def decode_audio(request: Dict):
+    """请求里的音频：{"path": 本地文件} 或 {"audio": base64 编码的 wav}"""
+    if request.get("path"):
+        source = request["path"]
+    elif request.get("audio"):
+        source = io.BytesIO(base64.b64decode(request["audio"]))
+    else:
+        raise ValueError("缺少 audio 或 path 字段")
+    # 声道合并与重采样由 STT 完成，这里不再拷贝
+    return sf.read(source, dtype="float32")
+
+
+@dataclass
+class Job:
+    request: Dict
+    output: "queue.Queue[Optional[Dict]]" = field(default_factory=queue.Queue)
+    cancelled: threading.Event = field(default_factory=threading.Event)
+
+    def emit(self, message: Dict) -> None:
+        self.output.put(message)
+
+
+class AssistantDaemon:
+    """
+    常驻服务：模型只加载一次，通过 Unix 域套接字给本机其他进程
+    （App、OTA 检查、家长控制服务等）提供文本/语音接口。
+    请求进入有界队列，默认由单个工作线程按顺序执行，响应逐行流式返回。
+    sessions > 1 时改由多会话调度器处理，最多 sessions 个请求同时进行，LLM 生成合并批量解码。
+    """
+
+    def __init__(self, assistant, socket_path: str = DEFAULT_SOCKET, max_queue: int = 16, sessions: int = 1):
+        self.assistant = assistant
+        self.socket_path = socket_path
+        self.jobs: "queue.Queue[Job]" = queue.Queue(maxsize=max_queue)
+        self.handled = 0
+        self._handled_lock = threading.Lock()  # 多个工作线程都会加一
+        self.workers = max(1, sessions)
+        self.scheduler = None
+        self._server: Optional[socketserver.ThreadingUnixStreamServer] = None
+        self._handlers: Dict[str, Callable[[Job], None]] = {
+            "chat": self._chat,
+            "tts": self._tts,
+            "stt": self._stt,
+            "turn": self._turn,
+        }
+        if sessions > 1:
+            from .sessions import Engines, SessionScheduler
+
+            self.scheduler = SessionScheduler(
+                Engines(assistant.stt, assistant.llm, assistant.tts),
+                max_batch=sessions,
+                min_asr_confidence=assistant.config.min_asr_confidence,
+            )
+            self._handlers = dict.fromkeys(self._handlers, self._session_job)
+
+    # ---------- 服务生命周期 ----------
+
+    def serve_forever(self) -> None:
+        if os.path.exists(self.socket_path):
+            os.unlink(self.socket_path)
+
+        daemon = self
+
+        class Handler(socketserver.StreamRequestHandler):
+            def handle(self):
+                for line in self.rfile:
+                    if not line.strip():
+                        continue
+                    try:
+                        messages = daemon.submit(parse_request(line))
+                    except ValueError as e:  # 包括 JSONDecodeError 和非 UTF-8 输入
+                        messages = iter([{"type": "error", "error": f"无效请求: {e}"}])
+                    try:
+                        for message in messages:
+                            self.wfile.write(json.dumps(message, ensure_ascii=False).encode("utf-8") + b"\n")
+                            self.wfile.flush()
+                    except (BrokenPipeError, ConnectionResetError):
+                        return
+
+        for i in range(self.workers):
+            threading.Thread(target=self._worker, name=f"daemon-worker-{i}", daemon=True).start()
+        # 套接字只允许本用户读写，其他本地用户不能驱动助手
+        umask = os.umask(0o177)
+        try:
+            self._server = socketserver.ThreadingUnixStreamServer(self.socket_path, Handler)
+        finally:
+            os.umask(umask)
+        self._server.daemon_threads = True
+        logging.info(f"守护进程已启动: {self.socket_path}, 并发会话 {self.workers}")
+        try:
+            self._server.serve_forever()
+        finally:
+            self._server.server_close()
+            if os.path.exists(self.socket_path):
+                os.unlink(self.socket_path)
+            logging.info("守护进程已退出")
+
+    def shutdown(self) -> None:
+        if self._server is not None:
+            threading.Thread(target=self._server.shutdown, daemon=True).start()
+
+    # ---------- 请求调度 ----------
+
+    def submit(self, request: Dict) -> Iterator[Dict]:
+        """在连接线程中调用：排队等待执行并逐条产出响应"""
+        op = request.get("op")
+        if op == "ping":
+            yield {"type": "done", "pong": True}
+            return
+        if op == "stats":
+            budget = getattr(self.assistant, "memory_budget", None)
+            yield {
+                "type": "done",
+                "queued": self.jobs.qsize(),
+                "handled": self.handled,
+                "memory": memory_report(),
+                "components": budget.metrics() if budget is not None else None,
+                "sessions": self.scheduler.stats() if self.scheduler is not None else None,
+            }
+            return
+        if op == "profile":
+            yield self._profile(request)
+            return
+        if op not in self._handlers:
+            yield {"type": "error", "error": f"未知操作: {op}"}
+            return
+
+        job = Job(request)
+        try:
+            self.jobs.put_nowait(job)
+        except queue.Full:
+            yield {"type": "error", "error": "busy"}
+            return
+        yield {"type": "queued", "position": self.jobs.qsize()}
+
+        try:
+            while True:
+                message = job.output.get()
+                if message is None:
+                    return
+                yield message
+        finally:
+            job.cancelled.set()
+
+    def _profile(self, request: Dict) -> Dict:
+        """{"op": "profile", "seconds": 10, "wait": false}：不进工作队列，正在处理的请求也能被采到"""
+        profiler = getattr(self.assistant, "profiler", None)
+        if profiler is None:
+            return {"type": "error", "error": "未启用性能采样"}
+        seconds = float(request.get("seconds", self.assistant.config.profile_seconds))
+        if not profiler.start(seconds):
+            return {"type": "error", "error": "性能采样已在进行"}
+        if not request.get("wait"):
+            return {"type": "done", "started": True, "seconds": seconds, "output_dir": profiler.output_dir}
+        return {"type": "done", "started": True, **profiler.join().report()}
+
+    def _worker(self) -> None:
+        while True:
+            job = self.jobs.get()
+            if job.cancelled.is_set():
+                continue
+            op = job.request["op"]
+            try:
+                self._handlers[op](job)
+            except Exception as e:
+                logging.error(f"处理 {op} 请求出错: {e}")
+                job.emit({"type": "error", "error": str(e)})
+            finally:
+                with self._handled_lock:
+                    self.handled += 1
+                job.output.put(None)
+
+    # ---------- 各类请求 ----------
+
+    def _reply_stream(self, job: Job, text: str) -> Iterator[str]:
+        """流式生成回答，按完整句子产出"""
+        buffer = ""
+        stream = self.assistant.llm.get_response(text, None, stream=True)
+        try:
+            for delta in stream:
+                if job.cancelled.is_set():
+                    return
+                job.emit({"type": "delta", "text": delta})
+                buffer += delta
+                sentences = smart_split(buffer)
+                for sentence in sentences[:-1]:
+                    yield sentence
+                buffer = sentences[-1] if sentences else buffer
+            if buffer.strip():
+                yield buffer
+        finally:
+            # 请求被取消时停止生成并等生成线程退出，再接下一个请求
+            stream.close()
+
+    def _chat(self, job: Job) -> None:
+        text = job.request["text"]
+        reply = "".join(self._reply_stream(job, text))
+        job.emit({"type": "done", "text": reply})
+
+    def _tts(self, job: Job) -> None:
+        text = job.request["text"]
+        for sentence in smart_split(text):
+            if job.cancelled.is_set():
+                return
+            self._emit_audio(job, sentence)
+        job.emit({"type": "done"})
+
+    def _stt(self, job: Job) -> None:
+        audio, sample_rate = decode_audio(job.request)
+        result = self.assistant.stt.transcribe(sample_rate, audio)
+        job.emit({
+            "type": "done",
+            "text": result.text,
+            "lang": result.lang,
+            "emotion": result.emotion,
+            "rejected": result.rejection_reason(self.assistant.config.min_asr_confidence),
+        })
+
+    def _turn(self, job: Job) -> None:
+        # 完整一轮：语音（或文本）-> 文本 -> 回答 -> 语音，回答按句子边生成边合成
+        text = job.request.get("text")
+        if not text:
+            audio, sample_rate = decode_audio(job.request)
+            result = self.assistant.stt.transcribe(sample_rate, audio)
+            reason = result.rejection_reason(self.assistant.config.min_asr_confidence)
+            if reason:
+                job.emit({"type": "done", "text": result.text, "rejected": reason})
+                return
+            text = result.text
+            job.emit({"type": "transcript", "text": text})
+
+        reply = []
+        for sentence in self._reply_stream(job, text):
+            reply.append(sentence)
+            self._emit_audio(job, sentence)
+        job.emit({"type": "done", "text": "".join(reply)})
+
+    def _session_job(self, job: Job) -> None:
+        """多会话模式：各类请求都交给调度器，把会话的输出转发给客户端"""
+        request, op = job.request, job.request["op"]
+        scheduler = self.scheduler
+        session = scheduler.create_session()
+        try:
+            if op == "tts":
+                scheduler.submit_speech(session, request["text"])
+            elif request.get("text") and op != "stt":
+                scheduler.submit_text(session, request["text"], speak=op == "turn")
+            else:
+                audio, sample_rate = decode_audio(request)
+                scheduler.submit_audio(session, audio, sample_rate, reply=op == "turn")
+            while True:
+                try:
+                    message = session.outputs.get(timeout=0.1)
+                except queue.Empty:
+                    if job.cancelled.is_set():
+                        return
+                    continue
+                if message["type"] == "audio":
+                    message = {
+                        "type": "audio",
+                        "text": message["text"],
+                        "sample_rate": message["sample_rate"],
+                        "format": "wav",
+                        "data": encode_wav(message["samples"], message["sample_rate"]),
+                    }
+                job.emit(message)
+                if message["type"] in ("done", "error"):
+                    return
+        finally:
+            scheduler.close_session(session)
+
+    def _emit_audio(self, job: Job, sentence: str) -> None:
+        samples, rate = self.assistant.tts.render(sentence)
+        if len(samples) == 0:
+            return
+        job.emit({
+            "type": "audio",
+            "text": sentence,
+            "sample_rate": rate,
+            "format": "wav",
+            "data": encode_wav(samples, rate),
+        })
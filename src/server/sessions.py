@@ -0,0 +1,188 @@
+import time
+import queue
+import logging
+import threading
+import itertools
+from dataclasses import dataclass, field
+from typing import Dict, Optional
+
+import numpy as np
+
+from ..core.decoding import BatchRequest, ContinuousBatcher
+from ..core.keyword_matcher import KeywordMatcher, strip_keyword
+from ..core.share_state import AssistantState
+from ..utils.utils import smart_split
+
+
+@dataclass
+class Engines:
+    """多个会话共享的一套模型"""
+    stt: object
+    llm: object
+    tts: object
+
+
+@dataclass
+class Session:
+    id: int
+    is_awake_mode: bool = False
+    state: AssistantState = AssistantState.IDLE
+    # 输出事件：transcript / delta / audio / done，与守护进程协议的字段一致
+    outputs: "queue.Queue[Dict]" = field(default_factory=queue.Queue)
+    turns: int = 0
+    turn_started: float = 0.0
+    latencies: list = field(default_factory=list)
+    reply: str = ""
+    _buffer: str = ""
+    _request: Optional[BatchRequest] = None
+
+
+class SessionScheduler:
+    """
+    多会话流水线：ASR 线程 -> 连续批处理的 LLM -> TTS 线程。
+    三个阶段各自只有一个执行者，不同会话的轮次在阶段之间重叠，
+    LLM 阶段把所有会话的生成合并到同一批解码里。
+    """
+
+    def __init__(self, engines: Engines, max_batch: int = 4, min_asr_confidence: float = 0.3,
+                 keyword_matcher: Optional[KeywordMatcher] = None):
+        self.engines = engines
+        self.min_asr_confidence = min_asr_confidence
+        self.keyword_matcher = keyword_matcher
+        self.batcher = ContinuousBatcher(engines.llm, max_batch=max_batch)
+        self.sessions: Dict[int, Session] = {}
+        self.completed_turns = 0
+
+        self._ids = itertools.count(1)
+        self._asr_jobs: "queue.Queue" = queue.Queue()
+        self._tts_jobs: "queue.Queue" = queue.Queue()
+        self._lock = threading.Lock()
+        for target, name in ((self._asr_worker, "session-asr"), (self._tts_worker, "session-tts")):
+            threading.Thread(target=target, name=name, daemon=True).start()
+
+    def create_session(self, require_wake: bool = False) -> Session:
+        session = Session(id=next(self._ids), is_awake_mode=require_wake and self.keyword_matcher is not None)
+        self.sessions[session.id] = session
+        return session
+
+    def close_session(self, session: Session) -> None:
+        # 客户端断开时停止该会话还在进行的生成，腾出批次位置
+        self.sessions.pop(session.id, None)
+        if session._request is not None:
+            session._request.cancel()
+
+    # ---------- 提交 ----------
+
+    def submit_audio(self, session: Session, audio: np.ndarray, sample_rate: int, reply: bool = True) -> None:
+        """reply=False 时只做识别，识别结果放在 done 消息里"""
+        session.turn_started = time.time()
+        session.state = AssistantState.THINKING
+        self._asr_jobs.put((session, audio, sample_rate, reply))
+
+    def submit_text(self, session: Session, text: str, speak: bool = True) -> None:
+        """speak=False 时只生成文本回答，不合成语音"""
+        session.turn_started = time.time()
+        self._start_reply(session, text, speak)
+
+    def submit_speech(self, session: Session, text: str) -> None:
+        """只把文本合成语音"""
+        session.turn_started = time.time()
+        session.reply = text
+        for sentence in smart_split(text):
+            self._tts_jobs.put((session, sentence))
+        self._tts_jobs.put((session, None))
+
+    # ---------- 各阶段 ----------
+
+    def _asr_worker(self) -> None:
+        while True:
+            session, audio, sample_rate, reply = self._asr_jobs.get()
+            try:
+                result = self.engines.stt.transcribe(sample_rate, audio)
+                reason = result.rejection_reason(self.min_asr_confidence)
+                if not reply:
+                    self._finish_turn(session, {"type": "done", "text": result.text, "lang": result.lang,
+                                                "emotion": result.emotion, "rejected": reason})
+                    continue
+                if reason:
+                    self._finish_turn(session, {"type": "done", "text": result.text, "rejected": reason})
+                    continue
+                text = result.text
+                session.outputs.put({"type": "transcript", "text": text})
+
+                if session.is_awake_mode:
+                    match = self.keyword_matcher.match(text)
+                    if match is None:
+                        self._finish_turn(session, {"type": "done", "text": text, "rejected": "no_keyword"})
+                        continue
+                    session.is_awake_mode = False
+                    text = strip_keyword(text, match)
+                    if not text:
+                        self._finish_turn(session, {"type": "done", "text": "", "woken": True})
+                        continue
+                self._start_reply(session, text)
+            except Exception as e:
+                logging.error(f"会话 {session.id} 识别出错: {e}")
+                self._finish_turn(session, {"type": "error", "error": str(e)})
+
+    def _start_reply(self, session: Session, text: str, speak: bool = True) -> None:
+        session.state = AssistantState.THINKING
+        session.reply = ""
+        session._buffer = ""
+
+        def on_delta(delta: str) -> None:
+            # 在批处理线程中调用：只做切句和入队
+            session.outputs.put({"type": "delta", "text": delta})
+            if not speak:
+                return
+            session._buffer += delta
+            sentences = smart_split(session._buffer)
+            for sentence in sentences[:-1]:
+                self._tts_jobs.put((session, sentence))
+            session._buffer = sentences[-1] if sentences else session._buffer
+
+        def on_done(reply: str) -> None:
+            session._request = None
+            session.reply = reply
+            if not speak:
+                self._finish_turn(session, {"type": "done", "text": reply})
+                return
+            if session._buffer.strip():
+                self._tts_jobs.put((session, session._buffer))
+            session._buffer = ""
+            self._tts_jobs.put((session, None))
+
+        session._request = self.batcher.submit(text, on_delta, on_done)
+
+    def _tts_worker(self) -> None:
+        while True:
+            session, sentence = self._tts_jobs.get()
+            if sentence is None:
+                self._finish_turn(session, {"type": "done", "text": session.reply})
+                continue
+            if session.id not in self.sessions:
+                continue  # 会话已关闭，剩下的句子不必再合成
+            try:
+                samples, rate = self.engines.tts.render(sentence)
+                if len(samples):
+                    session.state = AssistantState.SPEAKING
+                    session.outputs.put({"type": "audio", "text": sentence, "sample_rate": rate, "samples": samples})
+            except Exception as e:
+                logging.error(f"会话 {session.id} 合成出错: {e}")
+
+    def _finish_turn(self, session: Session, message: Dict) -> None:
+        session.turns += 1
+        session.latencies.append(time.time() - session.turn_started)
+        session.state = AssistantState.IDLE
+        with self._lock:
+            self.completed_turns += 1
+        session.outputs.put(message)
+
+    def stats(self) -> Dict:
+        return {
+            "sessions": len(self.sessions),
+            "completed_turns": self.completed_turns,
+            "llm_steps": self.batcher.steps,
+            "llm_tokens": self.batcher.generated_tokens,
+            "mean_batch_size": round(self.batcher.mean_batch_size, 2),
+        }
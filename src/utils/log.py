@@ -0,0 +1,170 @@
+import sys
+import queue
+import logging
+import weakref
+from logging.handlers import QueueHandler, QueueListener
+from typing import Dict, Optional, Tuple
+
+# 非阻塞日志：所有线程（包括 PortAudio 回调和推理线程）只把 LogRecord 放进队列，
+# 格式化和控制台/文件 I/O 都在后台 writer 线程里做。队列满时直接丢弃并计数，绝不等待。
+# 同一调用点在 rate_limit 秒内只输出一条，被压掉的条数附在下一条后面。
+
+DEFAULT_FORMAT = "%(asctime)s - %(levelname)s - %(message)s"
+
+_listener: Optional[QueueListener] = None
+_handler: Optional["NonBlockingQueueHandler"] = None
+_realtime = True
+_realtime_loggers: "weakref.WeakSet[RealtimeLogger]" = weakref.WeakSet()
+
+
+class RateLimitFilter(logging.Filter):
+    """按调用点（文件 + 行号）限流；在调用线程里只做一次字典查找"""
+
+    def __init__(self, interval: float = 1.0):
+        super().__init__()
+        self.interval = interval
+        self.suppressed = 0
+        self._sites: Dict[Tuple[str, int], list] = {}  # 调用点 -> [上次放行时间, 之后被压掉的条数]
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if self.interval <= 0 or record.levelno >= logging.ERROR:
+            return True
+        key = (record.pathname, record.lineno)
+        site = self._sites.get(key)
+        if site is None:
+            self._sites[key] = [record.created, 0]
+            return True
+        if record.created - site[0] < self.interval:
+            site[1] += 1
+            self.suppressed += 1
+            return False
+        if site[1]:
+            record.suppressed = site[1]
+        site[0], site[1] = record.created, 0
+        return True
+
+
+class NonBlockingQueueHandler(QueueHandler):
+    """put_nowait 入队，不拿 handler 锁、不在调用线程格式化消息"""
+
+    def __init__(self, q: queue.Queue):
+        super().__init__(q)
+        self.dropped = 0
+
+    def handle(self, record: logging.LogRecord) -> bool:
+        # 默认实现会先拿 handler 的锁；Queue 本身线程安全，这里省掉
+        rv = self.filter(record)
+        if rv:
+            self.emit(record)
+        return rv
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # 同进程内的队列不需要可 pickle，msg % args 留给 writer 线程
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+class KeyValueFormatter(logging.Formatter):
+    """结构化字段（extra={"fields": {...}}）以 key=value 追加在消息后"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        text = super().format(record)
+        fields = getattr(record, "fields", None)
+        if fields:
+            text += " " + " ".join(f"{k}={v}" for k, v in fields.items())
+        suppressed = getattr(record, "suppressed", 0)
+        if suppressed:
+            text += f" (限流省略 {suppressed} 条)"
+        return text
+
+
+class RealtimeLogger:
+    """
+    给音频回调等实时线程用：未开启时只做一次属性判断就返回，
+    参数用 % 风格延迟格式化，调用方不要传 f-string。
+    """
+
+    def __init__(self, name: str):
+        self.logger = logging.getLogger(name)
+        self.enabled = False
+        self.refresh()
+        _realtime_loggers.add(self)
+
+    def refresh(self) -> None:
+        self.enabled = _handler is not None and _realtime and self.logger.isEnabledFor(logging.INFO)
+
+    def info(self, msg: str, *args, **fields) -> None:
+        if self.enabled:
+            self.logger.info(msg, *args, extra={"fields": fields} if fields else None, stacklevel=2)
+
+    def warning(self, msg: str, *args, **fields) -> None:
+        if self.enabled:
+            self.logger.warning(msg, *args, extra={"fields": fields} if fields else None, stacklevel=2)
+
+
+def setup_logging(
+    level: int = logging.INFO,
+    fmt: str = DEFAULT_FORMAT,
+    filename: Optional[str] = None,
+    rate_limit: float = 1.0,
+    queue_size: int = 10000,
+    realtime: bool = True,
+) -> QueueListener:
+    """
+    把根 logger 换成队列 handler，并启动后台 writer 线程。重复调用会先停掉上一个 writer。
+    realtime=False 时 RealtimeLogger 全部关闭，音频回调里不再产生日志记录。
+    """
+    global _listener, _handler, _realtime
+    shutdown_logging()
+
+    formatter = KeyValueFormatter(fmt)
+    handlers = [logging.StreamHandler(sys.stderr)]
+    if filename:
+        handlers.append(logging.FileHandler(filename, encoding="utf-8"))
+    for h in handlers:
+        h.setFormatter(formatter)
+
+    handler = NonBlockingQueueHandler(queue.Queue(queue_size))
+    handler.addFilter(RateLimitFilter(rate_limit))
+    root = logging.getLogger()
+    for old in root.handlers[:]:
+        root.removeHandler(old)
+    root.addHandler(handler)
+    root.setLevel(level)
+
+    _listener = QueueListener(handler.queue, *handlers, respect_handler_level=True)
+    _listener.start()
+    _handler = handler
+    _realtime = realtime
+    for rt in list(_realtime_loggers):
+        rt.refresh()
+    return _listener
+
+
+def shutdown_logging() -> None:
+    """写完队列里剩余的记录并停止 writer 线程"""
+    global _listener, _handler
+    listener, handler = _listener, _handler
+    _listener = _handler = None
+    for rt in list(_realtime_loggers):
+        rt.enabled = False
+    if listener is not None:
+        listener.stop()
+        for h in listener.handlers:
+            h.close()
+    if handler is not None:
+        logging.getLogger().removeHandler(handler)
+
+
+def logging_stats() -> Dict[str, int]:
+    """队列满丢弃的条数和限流压掉的条数"""
+    if _handler is None:
+        return {"dropped": 0, "suppressed": 0}
+    suppressed = sum(f.suppressed for f in _handler.filters if isinstance(f, RateLimitFilter))
+    return {"dropped": _handler.dropped, "suppressed": suppressed}
+
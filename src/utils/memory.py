@@ -0,0 +1,100 @@
+import os
+import time
+import logging
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Dict, Iterable, Optional
+
+# 只在 Linux 上有 /proc/<pid>/smaps*；其他平台返回 0，不影响功能
+
+
+def _parse_kb(lines: Iterable[str], fields=("Rss", "Pss", "Shared_Clean", "Private_Clean", "Private_Dirty")) -> Dict[str, int]:
+    values = dict.fromkeys(fields, 0)
+    for line in lines:
+        key, _, rest = line.partition(":")
+        if key in values:
+            values[key] += int(rest.split()[0]) * 1024
+    return values
+
+
+def process_memory(pid: str = "self") -> Dict[str, int]:
+    """整个进程的 RSS/PSS（字节）；PSS 把共享页按进程数均摊，多进程共享权重时更能反映真实占用"""
+    try:
+        with open(f"/proc/{pid}/smaps_rollup") as f:
+            return _parse_kb(f)
+    except OSError:
+        return _parse_kb(())
+
+
+def mapped_file_memory(paths: Iterable[str], pid: str = "self") -> Dict[str, int]:
+    """指定文件被 mmap 进来的部分占用的 RSS/PSS"""
+    targets = {os.path.realpath(p) for p in paths}
+    lines, inside = [], False
+    try:
+        with open(f"/proc/{pid}/smaps") as f:
+            for line in f:
+                head = line.split(maxsplit=5)
+                # 映射区头部形如 "7f..-7f.. r--p 00000000 08:01 1234  /path/to/file"
+                if len(head) >= 5 and "-" in head[0] and ":" not in head[0]:
+                    inside = len(head) == 6 and head[5].strip() in targets
+                elif inside:
+                    lines.append(line)
+    except OSError:
+        pass
+    return _parse_kb(lines)
+
+
+@dataclass
+class ComponentMemory:
+    name: str
+    rss_delta: int = 0   # 加载前后进程 RSS 的变化
+    pss_delta: int = 0
+    load_seconds: float = 0.0
+    mapped_files: tuple = ()  # 以 mmap 方式共享的权重文件
+
+    def report(self) -> Dict[str, float]:
+        mb = 1024 * 1024
+        report = {
+            "rss_delta_mb": round(self.rss_delta / mb, 1),
+            "pss_delta_mb": round(self.pss_delta / mb, 1),
+            "load_seconds": round(self.load_seconds, 2),
+        }
+        if self.mapped_files:
+            mapped = mapped_file_memory(self.mapped_files)
+            report["mapped_rss_mb"] = round(mapped["Rss"] / mb, 1)
+            report["mapped_pss_mb"] = round(mapped["Pss"] / mb, 1)
+        return report
+
+
+_components: Dict[str, ComponentMemory] = {}
+
+
+@contextmanager
+def track_load(name: str):
+    """记录一个组件加载时的内存增量，结果可通过 memory_report() 查看"""
+    before = process_memory()
+    t0 = time.time()
+    component = ComponentMemory(name)
+    yield component
+    after = process_memory()
+    component.rss_delta = after["Rss"] - before["Rss"]
+    component.pss_delta = after["Pss"] - before["Pss"]
+    component.load_seconds = time.time() - t0
+    _components[name] = component
+    logging.info(f"{name} 加载完成: {component.report()}")
+
+
+def memory_report(components: Optional[Iterable[str]] = None) -> Dict[str, Dict[str, float]]:
+    mb = 1024 * 1024
+    total = process_memory()
+    report = {
+        "process": {
+            "rss_mb": round(total["Rss"] / mb, 1),
+            "pss_mb": round(total["Pss"] / mb, 1),
+            "shared_clean_mb": round(total["Shared_Clean"] / mb, 1),
+        }
+    }
+    for name, component in _components.items():
+        if components is None or name in components:
+            report[name] = component.report()
+    return report
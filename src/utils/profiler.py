@@ -0,0 +1,170 @@
+import os
+import sys
+import time
+import signal
+import logging
+import threading
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+
+# 采样式性能分析：后台线程定时用 sys._current_frames() 抓所有 Python 线程的调用栈，
+# 输出 collapsed stack（flamegraph.pl、speedscope 可直接读取）和按线程的 CPU 时间。
+# 不启动时不注册任何钩子，也没有后台线程，对正常运行没有开销。
+
+_CLOCK_TICKS = os.sysconf("SC_CLK_TCK") if hasattr(os, "sysconf") else 100
+
+
+def thread_cpu_times() -> Dict[int, Tuple[str, float]]:
+    """/proc/self/task 下每个内核线程的 (名字, 累计 CPU 秒数)；包括 ONNX/torch 的原生线程池"""
+    times = {}
+    try:
+        tids = os.listdir("/proc/self/task")
+    except OSError:
+        return times
+    for tid in tids:
+        try:
+            with open(f"/proc/self/task/{tid}/stat") as f:
+                stat = f.read()
+        except OSError:
+            continue  # 线程已退出
+        # 第二个字段是括号里的线程名，可能含空格，从最后一个右括号之后再按空格切分
+        name = stat[stat.index("(") + 1:stat.rindex(")")]
+        fields = stat[stat.rindex(")") + 2:].split()
+        utime, stime = int(fields[11]), int(fields[12])
+        times[int(tid)] = (name, (utime + stime) / _CLOCK_TICKS)
+    return times
+
+
+@dataclass
+class ThreadCPU:
+    name: str
+    tid: int
+    cpu_seconds: float
+    cpu_percent: float  # 占单核的百分比
+    samples: int = 0    # 被采到的 Python 栈数，原生线程为 0
+
+
+@dataclass
+class ProfileResult:
+    duration: float
+    samples: int
+    collapsed_path: str
+    threads_path: str
+    threads: List[ThreadCPU] = field(default_factory=list)
+
+    def report(self) -> Dict:
+        return {
+            "duration": round(self.duration, 2),
+            "samples": self.samples,
+            "collapsed": self.collapsed_path,
+            "threads": [
+                {"name": t.name, "tid": t.tid, "cpu_percent": round(t.cpu_percent, 1), "samples": t.samples}
+                for t in self.threads
+            ],
+        }
+
+
+class SamplingProfiler:
+    def __init__(self, output_dir: str = "profiles", interval: float = 0.005):
+        self.output_dir = output_dir
+        self.interval = interval
+        self.last_result: Optional[ProfileResult] = None
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+        self._labels: Dict[object, str] = {}
+
+    @property
+    def is_running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self, seconds: float = 10.0) -> bool:
+        """开始采样 seconds 秒，已在运行时返回 False"""
+        with self._lock:
+            if self.is_running:
+                return False
+            self._thread = threading.Thread(target=self._run, args=(seconds,), name="profiler", daemon=True)
+            self._thread.start()
+        logging.info(f"开始性能采样: {seconds:.0f}秒, 间隔 {self.interval * 1000:.0f}ms")
+        return True
+
+    def join(self, timeout: Optional[float] = None) -> Optional[ProfileResult]:
+        thread = self._thread
+        if thread is not None:
+            thread.join(timeout)
+        return self.last_result
+
+    def _label(self, code) -> str:
+        label = self._labels.get(code)
+        if label is None:
+            label = f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+            self._labels[code] = label
+        return label
+
+    def _stack(self, frame) -> str:
+        labels = []
+        while frame is not None:
+            labels.append(self._label(frame.f_code))
+            frame = frame.f_back
+        return ";".join(reversed(labels))
+
+    def _run(self, seconds: float) -> None:
+        me = threading.get_ident()
+        stacks: Counter = Counter()
+        per_thread: Counter = Counter()
+        samples = 0
+        cpu_before = thread_cpu_times()
+        start = time.monotonic()
+        deadline = start + seconds
+
+        while time.monotonic() < deadline:
+            names = {t.ident: t.name for t in threading.enumerate()}
+            for ident, frame in sys._current_frames().items():
+                if ident == me:
+                    continue
+                # 音频回调跑在 PortAudio 的线程里，Python 里显示为 Dummy-N
+                name = names.get(ident, f"thread-{ident}")
+                stacks[f"{name};{self._stack(frame)}"] += 1
+                per_thread[ident] += 1
+            samples += 1
+            time.sleep(self.interval)
+
+        duration = time.monotonic() - start
+        cpu_after = thread_cpu_times()
+        native = {t.native_id: t for t in threading.enumerate() if getattr(t, "native_id", None)}
+        threads = []
+        for tid, (comm, cpu) in cpu_after.items():
+            used = cpu - cpu_before.get(tid, (comm, 0.0))[1]
+            py = native.get(tid)
+            threads.append(ThreadCPU(
+                name=py.name if py is not None else comm,
+                tid=tid,
+                cpu_seconds=used,
+                cpu_percent=used / duration * 100 if duration else 0.0,
+                samples=per_thread.get(py.ident, 0) if py is not None else 0,
+            ))
+        threads.sort(key=lambda t: t.cpu_seconds, reverse=True)
+
+        os.makedirs(self.output_dir, exist_ok=True)
+        prefix = os.path.join(self.output_dir, time.strftime("profile-%Y%m%d-%H%M%S"))
+        with open(prefix + ".collapsed", "w", encoding="utf-8") as f:
+            for stack, count in stacks.most_common():
+                f.write(f"{stack} {count}\n")
+        with open(prefix + ".threads.txt", "w", encoding="utf-8") as f:
+            f.write(f"# 采样 {duration:.1f}秒, {samples} 次, 间隔 {self.interval * 1000:.0f}ms\n")
+            f.write(f"{'tid':>8}  {'CPU %':>7}  {'CPU 秒':>7}  {'样本':>6}  线程\n")
+            for t in threads:
+                f.write(f"{t.tid:>8}  {t.cpu_percent:>7.1f}  {t.cpu_seconds:>7.2f}  {t.samples:>6}  {t.name}\n")
+
+        self.last_result = ProfileResult(duration, samples, prefix + ".collapsed", prefix + ".threads.txt", threads)
+        busiest = ", ".join(f"{t.name} {t.cpu_percent:.0f}%" for t in threads[:3])
+        logging.info(f"性能采样完成: {prefix}.collapsed ({busiest})")
+
+
+def install_signal_handler(profiler: SamplingProfiler, seconds: float = 10.0, signum: int = None) -> bool:
+    """收到 SIGUSR1（默认）时开始采样；只能在主线程调用，不支持的平台返回 False"""
+    signum = signum if signum is not None else getattr(signal, "SIGUSR1", None)
+    if signum is None or threading.current_thread() is not threading.main_thread():
+        return False
+    signal.signal(signum, lambda s, f: profiler.start(seconds))
+    return True
@@ -0,0 +1,192 @@
+import re
+
+# TTS 输入归一化：数字/日期/时间/单位读成中文，去掉 emoji 和 markdown 标记，压缩复读。
+# 所有规则合并成一个预编译的正则，按位置从左到右只扫描一遍，由回调按命中的分组替换。
+
+_DIGITS = "零一二三四五六七八九"
+_SECTION_UNITS = ((3, "千"), (2, "百"), (1, "十"), (0, ""))
+_BIG_UNITS = ("", "万", "亿", "万亿")
+# 数字 2 后面跟这些量词时读“两”
+_LIANG_MEASURES = set("个只位本次天条块张件头匹辆岁点分")
+# “3-5岁”这样后面跟量词的才是范围，否则 - 读作“减”
+_RANGE_MEASURES = "".join(sorted(_LIANG_MEASURES | set("年月日号周秒元角页层楼度人名米克斤里倍遍种")))
+# 读“两”的计量单位；温度仍读“二”
+_LIANG_UNITS = {"km", "kg", "cm", "mm", "ml", "m", "g"}
+# 单字母单位后面可以跟的汉字
+_UNIT_SUFFIXES = "高长宽远重深厚的左多"
+
+_UNITS = {
+    "km/h": "公里每小时",
+    "km": "公里",
+    "kg": "千克",
+    "cm": "厘米",
+    "mm": "毫米",
+    "ml": "毫升",
+    "m": "米",
+    "g": "克",
+    "℃": "摄氏度",
+    "°C": "摄氏度",
+    "°": "度",
+}
+
+_SYMBOLS = {
+    "+": "加",
+    "=": "等于",
+    "&": "和",
+    "×": "乘",
+    "÷": "除以",
+    "~": "到",
+    "～": "到",
+}
+
+_NUMBER = r"\d+(?:\.\d+)?"
+# 单位：单字母的 m/g 后面跟汉字时多半不是单位（3g网络），_UNIT_SUFFIXES 里的字除外（2m高）
+_UNIT = rf"(?:km/h|km|kg|cm|mm|ml|℃|°C|°|[mg](?!(?![{_UNIT_SUFFIXES}])[\u4e00-\u9fff]))(?![A-Za-z])"
+
+_PATTERN = re.compile(
+    "|".join([
+        r"(?P<md_link>\[(?P<link_text>[^\]]+)\]\([^)]*\))",
+        r"(?P<md_mark>\*{1,3}|`{1,3}|^\s*#{1,6}\s*|^\s*[-+]\s+|^\s*>\s*)",
+        r"(?P<emoji>[\U0001F000-\U0001FAFF\u2600-\u27BF\uFE0F\u200D]+)",
+        rf"(?P<date>(?P<dy>\d{{4}})[-/.年](?P<dm>\d{{1,2}})[-/.月](?P<dd>\d{{1,2}})日?)",
+        r"(?P<year>(?P<yy>\d{4})年)",
+        r"(?P<time>(?P<th>\d{1,2})[:：](?P<tm>\d{2})(?!\d))",
+        rf"(?P<percent>(?P<pn>-?{_NUMBER})\s*[%％])",
+        rf"(?P<range>(?P<ra>{_NUMBER})\s*(?:[~～]|-(?=\s*{_NUMBER}\s*(?:[{_RANGE_MEASURES}]|{_UNIT})))"
+        rf"\s*(?P<rb>{_NUMBER})(?:\s*(?P<ru>{_UNIT}))?)",
+        rf"(?P<unit>(?P<un>-?{_NUMBER})\s*(?P<uu>{_UNIT}))",
+        r"(?P<minus>(?<=\d)\s*-\s*(?=\d))",
+        rf"(?P<number>-?{_NUMBER})",
+        r"(?P<symbol>[+=&×÷~～])",
+        r"(?P<latin>[A-Za-z]+)",
+        r"(?P<repeat>(?P<rep>\S{1,4}?)(?P=rep){2,})",
+        r"(?P<space>\s{2,})",
+    ]),
+    re.MULTILINE,
+)
+
+
+def _section(n: int) -> str:
+    """0 < n < 10000"""
+    out, zero = "", False
+    for power, unit in _SECTION_UNITS:
+        d = n // 10 ** power % 10
+        if d == 0:
+            zero = bool(out)
+        else:
+            if zero:
+                out += "零"
+                zero = False
+            out += _DIGITS[d] + unit
+    return out
+
+
+def int_to_chinese(n: int) -> str:
+    """整数按数值读：10010 -> 一万零一十"""
+    if n == 0:
+        return "零"
+    if n < 0:
+        return "负" + int_to_chinese(-n)
+    groups = []
+    while n:
+        groups.append(n % 10000)
+        n //= 10000
+    out, gap = "", False
+    for idx in range(len(groups) - 1, -1, -1):
+        g = groups[idx]
+        if g == 0:
+            gap = bool(out)
+            continue
+        if out and (gap or g < 1000):
+            out += "零"
+        out += _section(g) + _BIG_UNITS[idx]
+        gap = False
+    return out[1:] if out.startswith("一十") else out
+
+
+def digits_to_chinese(digits: str) -> str:
+    """逐位读：2024 -> 二零二四"""
+    return "".join(_DIGITS[int(d)] if d.isdigit() else d for d in digits)
+
+
+def number_to_chinese(text: str) -> str:
+    negative = text.startswith("-")
+    text = text.lstrip("-")
+    integer, _, fraction = text.partition(".")
+    # 以 0 开头或很长的数字（编号、电话）逐位读
+    if (len(integer) > 1 and integer.startswith("0")) or len(integer) > 8:
+        spoken = digits_to_chinese(integer)
+    else:
+        spoken = int_to_chinese(int(integer))
+    if fraction:
+        spoken += "点" + digits_to_chinese(fraction)
+    return ("负" if negative else "") + spoken
+
+
+class TextNormalizer:
+    """
+    keep_latin=False 时去掉英文单词，用于只有中文词典的 VITS 模型；
+    默认保留，交给中英文模型处理。
+    """
+
+    def __init__(self, keep_latin: bool = True):
+        self.keep_latin = keep_latin
+
+    def __call__(self, text: str) -> str:
+        return _PATTERN.sub(self._replace, text).strip()
+
+    normalize = __call__
+
+    def _replace(self, m: re.Match) -> str:
+        kind = m.lastgroup
+        if kind == "md_link":
+            return m["link_text"]
+        if kind in ("md_mark", "emoji"):
+            return ""
+        if kind == "date":
+            return f"{digits_to_chinese(m['dy'])}年{int_to_chinese(int(m['dm']))}月{int_to_chinese(int(m['dd']))}日"
+        if kind == "year":
+            return digits_to_chinese(m["yy"]) + "年"
+        if kind == "time":
+            minutes = int(m["tm"])
+            hour = int(m["th"])
+            spoken = ("两" if hour == 2 else int_to_chinese(hour)) + "点"
+            if minutes:
+                spoken += ("零" if minutes < 10 else "") + int_to_chinese(minutes) + "分"
+            return spoken
+        if kind == "percent":
+            return "百分之" + number_to_chinese(m["pn"])
+        if kind == "range":
+            if m["ru"]:
+                return number_to_chinese(m["ra"]) + "到" + self._measure(m["rb"], m["ru"])
+            return number_to_chinese(m["ra"]) + "到" + self._number(m["rb"], m.end("rb"), m.string)
+        if kind == "unit":
+            return self._measure(m["un"], m["uu"])
+        if kind == "minus":
+            return "减"
+        if kind == "number":
+            return self._number(m.group(), m.end(), m.string)
+        if kind == "symbol":
+            return _SYMBOLS[m.group()]
+        if kind == "latin":
+            return m.group() if self.keep_latin else ""
+        if kind == "repeat":
+            return m["rep"] * 2
+        if kind == "space":
+            return " "
+        return m.group()
+
+    @staticmethod
+    def _measure(number: str, unit: str) -> str:
+        spoken = "两" if number == "2" and unit in _LIANG_UNITS else number_to_chinese(number)
+        return spoken + _UNITS[unit]
+
+    @staticmethod
+    def _number(text: str, end: int, source: str) -> str:
+        if text == "2" and source[end:end + 1] in _LIANG_MEASURES:
+            return "两"
+        return number_to_chinese(text)
+
+
+# 默认实例，供 TTS 直接调用
+normalize_for_tts = TextNormalizer()
@@ -0,0 +1,55 @@
+import threading
+import unittest
+
+import numpy as np
+
+from src.core.audio_input import AudioConverter, StreamPool
+
+
+class TestAudioConverter(unittest.TestCase):
+    def setUp(self):
+        self.converter = AudioConverter(16000, max_seconds=2)
+
+    def test_mixes_channels_and_scales_int16(self):
+        stereo = np.array([[16384, 0], [-16384, -16384], [0, 0]], dtype=np.int16)
+        out = self.converter.convert(stereo, 16000)
+        np.testing.assert_allclose(out, [0.25, -0.5, 0.0])
+        # (channels, frames) 布局按同样方式处理
+        out = self.converter.convert(stereo.T.copy(), 16000)
+        np.testing.assert_allclose(out, [0.25, -0.5, 0.0])
+
+    def test_resamples_into_reused_buffer(self):
+        t = np.arange(48000) / 48000
+        out = self.converter.convert(np.sin(2 * np.pi * 5 * t).astype(np.float32), 48000)
+        self.assertEqual(out.shape, (16000,))
+        self.assertEqual(out.dtype, np.float32)
+        first = out.__array_interface__["data"][0]
+
+        t = np.arange(44100) / 44100
+        out = self.converter.convert(np.sin(2 * np.pi * 5 * t), 44100)
+        self.assertEqual(len(out), 16000)
+        expected = np.sin(2 * np.pi * 5 * np.arange(16000) / 16000)
+        self.assertLess(np.abs(out - expected).max(), 1e-3)
+        self.assertEqual(out.__array_interface__["data"][0], first)
+
+    def test_grows_for_long_input(self):
+        out = self.converter.convert(np.ones(16000 * 5, dtype=np.float32), 16000)
+        self.assertEqual(len(out), 16000 * 5)
+
+
+class TestStreamPool(unittest.TestCase):
+    def test_prefills_and_refills_in_background(self):
+        made = []
+        pool = StreamPool(lambda: made.append(object()) or made[-1], size=2)
+        self.assertEqual(pool.created, 2)
+        streams = {id(pool.acquire()) for _ in range(2)}
+        self.assertEqual(len(streams), 2)
+        for t in threading.enumerate():
+            if t.name == "stt-stream-pool":
+                t.join(timeout=1)
+        self.assertEqual(pool.misses, 0)
+        self.assertEqual(len(pool._free), 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
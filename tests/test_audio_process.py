@@ -0,0 +1,39 @@
+import unittest
+
+import numpy as np
+
+from src.core.audio_process import VadGate
+
+
+class FakeVad:
+    def __init__(self, flags):
+        self.flags = iter(flags)
+        self.speech = False
+
+    def accept_waveform(self, chunk):
+        self.speech = next(self.flags)
+
+    def is_speech_detected(self):
+        return self.speech
+
+    def empty(self):
+        return True
+
+
+class TestVadGate(unittest.TestCase):
+    def test_forwards_pre_roll_speech_and_hangover(self):
+        flags = [False, False, False, True, True, False, False, False, False]
+        gate = VadGate(FakeVad(flags), pre_roll=2, hangover=2)
+        forwarded = []
+        for i in range(len(flags)):
+            forwarded.append([int(c[0]) for c in gate.feed(np.full(4, i, dtype=np.float32))])
+
+        self.assertEqual(forwarded[:3], [[], [], []])
+        self.assertEqual(forwarded[3], [1, 2, 3])  # 语音开始时补发前两块
+        self.assertEqual(forwarded[4:7], [[4], [5], [6]])  # 语音结束后再放行两块
+        self.assertEqual(forwarded[7:], [[], []])
+        self.assertFalse(gate.is_open)
+
+
+if __name__ == "__main__":
+    unittest.main()
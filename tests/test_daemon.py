@@ -0,0 +1,128 @@
+import os
+import json
+import time
+import socket
+import tempfile
+import threading
+import unittest
+from types import SimpleNamespace
+
+import numpy as np
+
+try:
+    from src.server.client import request
+    from src.server.daemon import AssistantDaemon
+except ImportError:  # 需要 soundfile
+    AssistantDaemon = None
+
+
+class FakeLLM:
+    def __init__(self):
+        self.events = []
+        self.endless = False
+
+    def get_response(self, text, messages=None, stream=False):
+        self.events.append(("start", text))
+
+        def generate():
+            try:
+                if self.endless:
+                    while True:
+                        yield "啊"
+                        time.sleep(0.01)
+                for ch in text:
+                    yield ch
+            finally:
+                self.events.append(("closed", text))
+        return generate()
+
+
+class FakeTTS:
+    def render(self, sentence):
+        return np.zeros(160, dtype=np.float32), 16000
+
+
+class FakeAssistant:
+    def __init__(self):
+        self.llm = FakeLLM()
+        self.tts = FakeTTS()
+        self.stt = None
+        self.config = SimpleNamespace(min_asr_confidence=0.3, profile_seconds=10)
+
+
+@unittest.skipIf(AssistantDaemon is None, "需要 soundfile")
+class TestAssistantDaemon(unittest.TestCase):
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self._tmp.name, "doll.sock")
+        self.assistant = FakeAssistant()
+        self.daemon = AssistantDaemon(self.assistant, self.path)
+        self.thread = threading.Thread(target=self.daemon.serve_forever, daemon=True)
+        self.thread.start()
+        deadline = time.time() + 5
+        while self.daemon._server is None or not os.path.exists(self.path):
+            self.assertLess(time.time(), deadline, "守护进程没有启动")
+            time.sleep(0.01)
+
+    def tearDown(self):
+        self.daemon.shutdown()
+        self.thread.join(5)
+        self._tmp.cleanup()
+
+    def connect(self):
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.settimeout(5)
+        sock.connect(self.path)
+        return sock
+
+    def test_chat_round_trip(self):
+        messages = list(request({"op": "chat", "text": "你好。再见。"}, self.path, timeout=5))
+        self.assertEqual(messages[0]["type"], "queued")
+        self.assertEqual("".join(m["text"] for m in messages if m["type"] == "delta"), "你好。再见。")
+        self.assertEqual(messages[-1], {"type": "done", "text": "你好。再见。"})
+
+    def test_tts_round_trip(self):
+        messages = list(request({"op": "tts", "text": "你好。再见。"}, self.path, timeout=5))
+        audio = [m for m in messages if m["type"] == "audio"]
+        self.assertEqual([m["text"] for m in audio], ["你好。", "再见。"])
+        self.assertEqual(audio[0]["format"], "wav")
+        self.assertEqual(messages[-1]["type"], "done")
+
+    def test_malformed_lines_get_error_and_connection_survives(self):
+        with self.connect() as sock, sock.makefile("rb") as reader:
+            sock.sendall(b"{oops\n[1, 2]\n\xff\xfe\n" + json.dumps({"op": "ping"}).encode() + b"\n")
+            replies = [json.loads(reader.readline()) for _ in range(4)]
+        self.assertEqual([r["type"] for r in replies], ["error", "error", "error", "done"])
+        self.assertTrue(replies[-1]["pong"])
+
+    def test_invalid_profile_seconds(self):
+        with self.connect() as sock, sock.makefile("rb") as reader:
+            for seconds in ("abc", -1, True):
+                sock.sendall(json.dumps({"op": "profile", "seconds": seconds}).encode() + b"\n")
+                reply = json.loads(reader.readline())
+                self.assertEqual(reply["type"], "error")
+                self.assertIn("seconds", reply["error"])
+            sock.sendall(json.dumps({"op": "ping"}).encode() + b"\n")
+            self.assertTrue(json.loads(reader.readline())["pong"])
+
+    def test_unknown_op(self):
+        self.assertEqual(list(request({"op": "dance"}, self.path, timeout=5))[0]["type"], "error")
+
+    def test_socket_is_private(self):
+        self.assertEqual(os.stat(self.path).st_mode & 0o777, 0o600)
+
+    def test_cancelled_chat_stops_generation_before_next_job(self):
+        llm = self.assistant.llm
+        llm.endless = True
+        with self.connect() as sock, sock.makefile("rb") as reader:
+            sock.sendall(json.dumps({"op": "chat", "text": "讲个很长的故事"}).encode() + b"\n")
+            self.assertEqual(json.loads(reader.readline())["type"], "queued")
+            self.assertEqual(json.loads(reader.readline())["type"], "delta")
+        llm.endless = False
+        messages = list(request({"op": "chat", "text": "你好"}, self.path, timeout=5))
+        self.assertEqual(messages[-1]["text"], "你好")
+        self.assertEqual(llm.events[:3], [("start", "讲个很长的故事"), ("closed", "讲个很长的故事"), ("start", "你好")])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,141 @@
+import threading
+import unittest
+from types import SimpleNamespace
+
+try:
+    import torch
+    from transformers import LlamaConfig, LlamaForCausalLM
+
+    from src.core.decoding import ContinuousBatcher
+except ImportError:
+    torch = None
+
+from src.core.generation import GenerationLimits
+
+PROMPTS = ["小兔子", "天上为什么有彩虹呢", "一加一"]
+
+
+class FakeTokenizer:
+    eos_token_id = 0
+
+    def __call__(self, text, return_tensors=None, truncation=False):
+        return SimpleNamespace(input_ids=torch.tensor([[ord(c) % 63 + 1 for c in text]]))
+
+    def decode(self, tokens, skip_special_tokens=True):
+        return "".join(chr(0x4E00 + t) for t in tokens)
+
+
+class FakeLLM:
+    """只提供批处理用到的接口，模型是随机初始化的小 Llama"""
+
+    def __init__(self, model, max_new_tokens=12):
+        self.model = model
+        self.tokenizer = FakeTokenizer()
+        self.config = SimpleNamespace(
+            device="cpu", max_new_tokens=max_new_tokens, temperature=0.0, top_p=1.0,
+            repetition_penalty=1.2, limits=GenerationLimits(max_ngram_repeats=100),
+        )
+        self.load_errors = 0
+
+    def ensure_loaded(self):
+        if self.load_errors:
+            self.load_errors -= 1
+            raise MemoryError("加载失败")
+
+    def _prepare_input(self, prompt, messages=None):
+        return prompt
+
+
+def tiny_model():
+    torch.manual_seed(0)
+    config = LlamaConfig(vocab_size=64, hidden_size=32, intermediate_size=64, num_hidden_layers=2,
+                         num_attention_heads=4, num_key_value_heads=4, max_position_embeddings=128)
+    return LlamaForCausalLM(config).double().eval()
+
+
+class NoPositionIds(torch.nn.Module if torch is not None else object):
+    """模仿 MiniMind：forward 不接受 position_ids，位置按 KV 长度推算"""
+
+    def __init__(self, inner):
+        super().__init__()
+        self.inner = inner
+
+    def forward(self, input_ids, attention_mask=None, past_key_values=None, use_cache=False):
+        return self.inner(input_ids, attention_mask=attention_mask, past_key_values=past_key_values,
+                          use_cache=use_cache)
+
+
+class NoAttentionMask(torch.nn.Module if torch is not None else object):
+    """forward 不接受 attention_mask，补齐的位置无法屏蔽"""
+
+    def __init__(self, inner):
+        super().__init__()
+        self.inner = inner
+
+    def forward(self, input_ids, past_key_values=None, use_cache=False):
+        return self.inner(input_ids, past_key_values=past_key_values, use_cache=use_cache)
+
+
+def run_all(batcher, prompts, timeout=30.0):
+    """提交全部请求，返回 [(增量拼接, on_done 收到的文本)]"""
+    results = [None] * len(prompts)
+    deltas = [[] for _ in prompts]
+    done = [threading.Event() for _ in prompts]
+
+    def finish(i):
+        def on_done(text):
+            results[i] = ("".join(deltas[i]), text)
+            done[i].set()
+        return on_done
+
+    for i, prompt in enumerate(prompts):
+        batcher.submit(prompt, deltas[i].append, finish(i))
+    for event in done:
+        assert event.wait(timeout), "请求没有结束"
+    return results
+
+
+@unittest.skipIf(torch is None, "需要 torch 和 transformers")
+class TestContinuousBatcher(unittest.TestCase):
+    def test_batched_matches_sequential(self):
+        model = tiny_model()
+        sequential = run_all(ContinuousBatcher(FakeLLM(model), max_batch=1), PROMPTS)
+        batcher = ContinuousBatcher(FakeLLM(model), max_batch=len(PROMPTS))
+        batched = run_all(batcher, PROMPTS)
+        self.assertEqual(batched, sequential)
+        self.assertGreater(batcher.mean_batch_size, 1.0)
+        for stream, text in batched:
+            self.assertEqual(stream, text)
+
+    def test_model_without_position_ids_still_batches(self):
+        # RoPE 只看相对位置，左侧补齐后整行平移不影响输出
+        model = NoPositionIds(tiny_model())
+        sequential = run_all(ContinuousBatcher(FakeLLM(model), max_batch=1), PROMPTS)
+        batcher = ContinuousBatcher(FakeLLM(model), max_batch=len(PROMPTS))
+        self.assertEqual(batcher.max_batch, len(PROMPTS))
+        self.assertEqual(run_all(batcher, PROMPTS), sequential)
+        self.assertGreater(batcher.mean_batch_size, 1.0)
+
+    def test_model_without_attention_mask_decodes_one_by_one(self):
+        batcher = ContinuousBatcher(FakeLLM(NoAttentionMask(tiny_model())), max_batch=4)
+        self.assertEqual(batcher.max_batch, 1)
+
+    def test_failed_admission_still_finishes_request(self):
+        llm = FakeLLM(tiny_model())
+        batcher = ContinuousBatcher(llm, max_batch=2)
+        llm.load_errors = 1
+        (stream, _), (ok, _) = run_all(batcher, PROMPTS[:2])
+        self.assertTrue(stream.startswith("[ERROR]"))
+        self.assertFalse(ok.startswith("[ERROR]"))
+
+    def test_cancelled_request_leaves_batch(self):
+        batcher = ContinuousBatcher(FakeLLM(tiny_model(), max_new_tokens=10000), max_batch=2)
+        done = threading.Event()
+        req = batcher.submit(PROMPTS[0], lambda delta: None, lambda text: done.set())
+        req.cancel()
+        self.assertTrue(done.wait(30.0))
+        self.assertLess(len(req.decoder.tokens), 10000)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,62 @@
+import unittest
+
+import numpy as np
+
+from src.core.endpointing import AdaptiveEndpointer, EndpointConfig, NoiseFloorTracker
+
+
+class TestAdaptiveEndpointer(unittest.TestCase):
+    def setUp(self):
+        self.endpointer = AdaptiveEndpointer(EndpointConfig())
+        self.cfg = self.endpointer.config
+
+    def test_complete_sentence_shortens_timeout(self):
+        for text in ("小兔子为什么爱吃胡萝卜？", "我想听故事吧", "今天下雨了。", "好的!"):
+            self.assertEqual(self.endpointer.silence_timeout(text), self.cfg.min_silence, text)
+
+    def test_itn_period_is_not_completion(self):
+        # SenseVoice ITN 给每段部分转写都加句号
+        for text in ("小兔子。", "我喜欢小猫。", "我想听故事."):
+            self.assertEqual(self.endpointer.silence_timeout(text), self.cfg.base_silence, text)
+        for text in ("我想要。", "我想要一个。", "妈妈给我买了一个。"):
+            self.assertEqual(self.endpointer.silence_timeout(text), self.cfg.max_silence, text)
+        self.assertEqual(self.endpointer.silence_timeout("天为什么是蓝色。"), self.cfg.min_silence)
+        self.assertEqual(self.endpointer.silence_timeout("为什么。"), self.cfg.base_silence)
+
+    def test_mid_clause_extends_timeout(self):
+        for text in ("我想要", "小猫和", "因为", "我喜欢的是，", "然后", "我想要一个"):
+            self.assertEqual(self.endpointer.silence_timeout(text), self.cfg.max_silence, text)
+
+    def test_unknown_or_empty_uses_base(self):
+        for text in (None, "", "   ", "小兔子"):
+            self.assertEqual(self.endpointer.silence_timeout(text), self.cfg.base_silence, repr(text))
+
+    def test_vad_threshold_follows_noise_floor(self):
+        quiet = np.full(1600, 1e-4, dtype=np.float32)   # -80 dB
+        noisy = np.full(1600, 0.1, dtype=np.float32)    # -20 dB
+        for _ in range(200):
+            self.endpointer.observe_noise(quiet)
+        self.assertAlmostEqual(self.endpointer.vad_threshold(), self.cfg.min_vad_threshold, places=3)
+        for _ in range(200):
+            self.endpointer.observe_noise(noisy)
+        self.assertAlmostEqual(self.endpointer.vad_threshold(), self.cfg.max_vad_threshold, places=3)
+
+        # 介于两者之间时线性插值
+        self.endpointer.noise.level_db = (self.cfg.quiet_db + self.cfg.noisy_db) / 2
+        middle = (self.cfg.min_vad_threshold + self.cfg.max_vad_threshold) / 2
+        self.assertAlmostEqual(self.endpointer.vad_threshold(), middle)
+
+
+class TestNoiseFloorTracker(unittest.TestCase):
+    def test_smoothing_and_silence(self):
+        tracker = NoiseFloorTracker(alpha=0.5, initial_db=-50.0)
+        self.assertAlmostEqual(tracker.update_db(-30.0), -40.0)
+        self.assertAlmostEqual(tracker.update_db(-30.0, alpha=1.0), -30.0)
+        # 全零块按 -120 dB 计，不会出现 log(0)
+        self.assertAlmostEqual(tracker.update(np.zeros(160, dtype=np.float32)), -75.0)
+        self.assertAlmostEqual(NoiseFloorTracker(initial_db=-50.0).update(np.zeros(0, dtype=np.float32)),
+                               -50.0 + 0.05 * (-120.0 + 50.0))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,58 @@
+import unittest
+
+import numpy as np
+
+from src.core.energy_gate import EnergyGate, EnergyGateConfig, frame_features
+
+SR = 16000
+CHUNK = 1600
+
+
+def noise(level, n=CHUNK, seed=0):
+    return (np.random.default_rng(seed).standard_normal(n) * level).astype(np.float32)
+
+
+def tone(level, n=CHUNK, freq=220):
+    return (np.sin(2 * np.pi * freq * np.arange(n) / SR) * level).astype(np.float32)
+
+
+class TestEnergyGate(unittest.TestCase):
+    def test_frame_features(self):
+        db, zcr = frame_features(tone(1.0, freq=1000), 320)
+        self.assertEqual(len(db), 5)
+        np.testing.assert_allclose(db, -3.0, atol=0.1)
+        np.testing.assert_allclose(zcr, 2 * 1000 / SR, atol=0.01)
+
+    def test_stays_closed_in_quiet_room_and_opens_with_lookback(self):
+        gate = EnergyGate(EnergyGateConfig(lookback_seconds=0.3), SR)
+        for i in range(30):
+            self.assertIsNone(gate.push(noise(0.001, seed=i)))
+        out = gate.push(tone(0.1))
+        self.assertTrue(gate.is_open)
+        self.assertEqual(len(out), 3 * CHUNK + CHUNK)  # 0.3 秒历史 + 本块
+        self.assertEqual(len(gate.push(noise(0.001))), CHUNK)
+
+        # 超过 hold_seconds 没有声音后关闭
+        for i in range(12):
+            gate.push(noise(0.001, seed=i))
+        self.assertFalse(gate.is_open)
+        self.assertLess(gate.duty_cycle, 0.5)
+
+    def test_noise_floor_adapts_to_steady_noise(self):
+        # 风扇之类的持续噪声：先把门打开，噪声底慢慢跟上后关闭
+        gate = EnergyGate(sample_rate=SR)
+        for i in range(600):
+            gate.push(noise(0.02, seed=i))
+        self.assertFalse(gate.is_open)
+        self.assertAlmostEqual(gate.noise.level_db, -34, delta=2)
+
+    def test_digital_silence_does_not_lower_floor(self):
+        gate = EnergyGate(sample_rate=SR)
+        before = gate.noise.level_db
+        for _ in range(20):
+            gate.push(np.zeros(CHUNK, dtype=np.float32))
+        self.assertEqual(gate.noise.level_db, before)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,82 @@
+import unittest
+
+from src.core.generation import (
+    GenerationController,
+    GenerationLimits,
+    at_sentence_boundary,
+    count_sentences,
+    estimate_speech_seconds,
+)
+
+
+class TestGenerationController(unittest.TestCase):
+    def test_sentence_helpers(self):
+        self.assertTrue(at_sentence_boundary("小兔子回家了。"))
+        self.assertTrue(at_sentence_boundary("真的吗？”"))
+        self.assertFalse(at_sentence_boundary("圆周率是3."))
+        self.assertFalse(at_sentence_boundary("从前有一只"))
+        self.assertEqual(count_sentences("你好！今天天气真好。我们去玩吧"), 2)
+        self.assertAlmostEqual(estimate_speech_seconds("小兔子", 5.0), 0.6)
+
+    def test_stops_after_max_sentences_at_boundary(self):
+        controller = GenerationController(GenerationLimits(max_sentences=2))
+        tokens = list(range(10))
+        self.assertFalse(controller.check(tokens, "第一句。第二句"))
+        self.assertTrue(controller.check(tokens, "第一句。第二句。"))
+        self.assertEqual(controller.stop_reason, "sentences")
+
+    def test_speech_limit_waits_for_boundary(self):
+        limits = GenerationLimits(max_sentences=10, max_speech_seconds=1.0, chars_per_second=5.0)
+        controller = GenerationController(limits)
+        tokens = list(range(10))
+        # 超出时长但停在句中：继续生成，直到句末或超过硬上限
+        self.assertFalse(controller.check(tokens, "从前有只兔子"))
+        self.assertTrue(controller.check(tokens, "从前有只兔子。"))
+        self.assertEqual(controller.stop_reason, "speech")
+
+        controller.reset()
+        self.assertTrue(controller.check(tokens, "从前有一只小兔子它住在"))
+        self.assertEqual(controller.stop_reason, "speech_hard")
+
+    def test_detects_ngram_repetition(self):
+        controller = GenerationController(GenerationLimits(repeat_ngram=3, max_ngram_repeats=2))
+        self.assertFalse(controller.check([1, 2, 3, 4, 1, 2, 3], "x"))
+        self.assertTrue(controller.check([1, 2, 3, 4, 1, 2, 3, 5, 1, 2, 3], "x"))
+        self.assertEqual(controller.stop_reason, "repetition")
+
+    def stream(self, controller, chars):
+        """模拟流式解码：每个字一个 token，返回实际输出的文字"""
+        tokens, text, out = [], "", []
+        for ch in chars:
+            tokens.append(ord(ch))
+            text += ch
+            stop = controller.check(tokens, text)
+            out.append(controller.release(text, final=stop))
+            if stop:
+                break
+        else:
+            out.append(controller.release(text, final=True))
+        return "".join(out)
+
+    def test_repeated_ngram_is_never_streamed(self):
+        controller = GenerationController(GenerationLimits(max_sentences=10, repeat_ngram=4, max_ngram_repeats=2))
+        streamed = self.stream(controller, "小兔子跳" * 5)
+        self.assertEqual(controller.stop_reason, "repetition")
+        self.assertEqual(streamed, "小兔子跳" * 2)
+
+    def test_held_back_window_is_flushed_at_end(self):
+        controller = GenerationController(GenerationLimits(repeat_ngram=4))
+        tokens, text = [], ""
+        for ch in "小兔子回家":
+            tokens.append(ord(ch))
+            text += ch
+            controller.check(tokens, text)
+        # 最后 3 个 token 先压住
+        self.assertEqual(controller.release(text), "小兔")
+        self.assertEqual(controller.release(text, final=True), "子回家")
+        controller.reset()
+        self.assertEqual(self.stream(controller, "从前有座山。"), "从前有座山。")
+
+
+if __name__ == "__main__":
+    unittest.main()
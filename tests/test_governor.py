@@ -0,0 +1,95 @@
+import os
+import tempfile
+import time
+import unittest
+
+from src.core import governor
+from src.core.governor import (
+    GovernorConfig, GovernorSample, QualityGovernor, QualityLevel, read_temperature, record_rtf, reset_rtf, stage_rtfs,
+)
+
+LEVELS = [
+    QualityLevel("full", 128, "MiniMind2"),
+    QualityLevel("reduced", 96, "MiniMind2", tts_threads=2),
+    QualityLevel("low", 64, "MiniMind2-Small", tts_threads=1, denoise=False),
+]
+
+HOT = GovernorSample(cpu=10.0, temperature=80.0)
+CALM = GovernorSample(cpu=5.0, temperature=50.0, rtf={"tts": 0.3})
+MIDDLE = GovernorSample(cpu=50.0, temperature=70.0)
+
+
+class TestQualityGovernor(unittest.TestCase):
+    def setUp(self):
+        self.applied = []
+        self.gov = QualityGovernor(LEVELS, self.applied.append, GovernorConfig(down_after=2, up_after=3))
+
+    def tearDown(self):
+        reset_rtf()
+
+    def test_steps_down_under_pressure_and_stops_at_bottom(self):
+        self.assertIsNone(self.gov.update(HOT))
+        self.assertEqual(self.gov.update(HOT).name, "reduced")
+        self.gov.update(HOT)
+        self.gov.update(HOT)
+        for _ in range(4):
+            self.gov.update(HOT)
+        self.assertEqual([l.name for l in self.applied], ["reduced", "low"])
+        self.assertEqual(self.gov.level.name, "low")
+
+    def test_hysteresis_between_thresholds(self):
+        self.gov.update(HOT)
+        self.gov.update(HOT)
+        # 介于两组阈值之间不升档，余量计数也会被打断
+        for sample in (CALM, CALM, MIDDLE, CALM, CALM):
+            self.assertIsNone(self.gov.update(sample))
+        self.assertEqual(self.gov.update(CALM).name, "full")
+        self.assertEqual(self.gov.changes, 2)
+
+    def test_identical_levels_are_skipped(self):
+        levels = [LEVELS[0], QualityLevel("same", 128, "MiniMind2"), LEVELS[1]]
+        gov = QualityGovernor(levels, self.applied.append, GovernorConfig(down_after=1))
+        self.assertEqual([l.name for l in gov.levels], ["full", "reduced"])
+        self.assertEqual(gov.update(HOT).name, "reduced")
+
+    def test_default_config_levels_all_differ(self):
+        from src.config.config import Config
+
+        config = Config()
+        self.assertIsNone(config.governor_small_llm)
+        levels = config.governor_levels()
+        self.assertEqual(levels[-1].llm_model, config.llm_model)
+        self.assertEqual(len({l.settings() for l in levels}), len(levels))
+        self.assertEqual(len(QualityGovernor(levels, self.applied.append).levels), len(levels))
+
+    def test_rtf_pressure(self):
+        sample = GovernorSample(cpu=0.0, temperature=None, rtf={"llm": 1.3, "tts": 0.2})
+        self.assertEqual(sample.pressure(self.gov.config), "llm RTF 1.30")
+        self.assertFalse(sample.headroom(self.gov.config))
+
+
+class TestSignals(unittest.TestCase):
+    def tearDown(self):
+        reset_rtf()
+
+    def test_read_temperature_takes_hottest_valid_zone(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            for i, value in enumerate(["48500", "61250", "0", "garbage"]):
+                zone = os.path.join(tmp, f"thermal_zone{i}")
+                os.makedirs(zone)
+                with open(os.path.join(zone, "temp"), "w") as f:
+                    f.write(value + "\n")
+            self.assertAlmostEqual(read_temperature(os.path.join(tmp, "thermal_zone*", "temp")), 61.25)
+            self.assertIsNone(read_temperature(os.path.join(tmp, "missing*", "temp")))
+
+    def test_rtf_average_and_staleness(self):
+        record_rtf("tts", 1.0)
+        record_rtf("tts", 0.0, alpha=0.5)
+        self.assertAlmostEqual(stage_rtfs()["tts"], 0.5)
+        value, _ = governor._rtf["tts"]
+        governor._rtf["tts"] = (value, time.monotonic() - 120)
+        self.assertEqual(stage_rtfs(max_age=60), {})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,37 @@
+import unittest
+from src.core.keyword_matcher import KeywordMatcher, lazy_pinyin
+
+
+class TestKeywordMatcher(unittest.TestCase):
+    def setUp(self):
+        self.matcher = KeywordMatcher(["小智", "你好小柱"])
+
+    def test_exact_match_with_offset(self):
+        text = "嗯，小智，讲个故事"
+        match = self.matcher.match(text)
+        self.assertEqual(match.keyword, "小智")
+        self.assertEqual(text[match.start:match.end], "小智")
+        self.assertEqual(text[match.end:], "，讲个故事")
+
+    @unittest.skipIf(lazy_pinyin is None, "需要 pypinyin")
+    def test_homophones(self):
+        for text in ("小志小志", "晓智你好"):
+            match = self.matcher.match(text)
+            self.assertIsNotNone(match, text)
+            self.assertEqual(match.keyword, "小智")
+
+    def test_edit_distance_skips_punctuation_and_fillers(self):
+        match = self.matcher.match("你好啊，小柱！")
+        self.assertEqual(match.keyword, "你好小柱")
+        self.assertEqual(match.distance, 1)
+        self.assertEqual(match.start, 0)
+
+    def test_short_keyword_is_not_fuzzy(self):
+        self.assertIsNone(self.matcher.match("小猫在哪里"))
+
+    def test_no_match(self):
+        self.assertIsNone(self.matcher.match("今天天气真好"))
+
+
+if __name__ == '__main__':
+    unittest.main()
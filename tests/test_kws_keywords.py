@@ -0,0 +1,41 @@
+import os
+import tempfile
+import unittest
+
+from src.core.kws_keywords import (
+    KeywordEntry, keywords_arg, load_keywords, parse_keyword_line, with_overrides, write_keywords,
+)
+
+
+class TestKeywordFile(unittest.TestCase):
+    def test_parse_plain_and_tuned(self):
+        self.assertEqual(parse_keyword_line("zh ù z i @柱子"), KeywordEntry("zh ù z i", "柱子"))
+        entry = parse_keyword_line("x iǎo zh ù t óng x ué :1.5 #0.35 @小柱同学")
+        self.assertEqual(entry, KeywordEntry("x iǎo zh ù t óng x ué", "小柱同学", 1.5, 0.35))
+        self.assertEqual(entry.line(), "x iǎo zh ù t óng x ué :1.5 #0.35 @小柱同学")
+        self.assertIsNone(parse_keyword_line("   "))
+        self.assertIsNone(parse_keyword_line("# 注释"))
+
+    def test_overrides_and_round_trip(self):
+        entries = [KeywordEntry("zh ù z i", "柱子"), KeywordEntry("zh ū z i", "朱子", threshold=0.3)]
+        tuned = with_overrides(entries, boosts={"柱子": 2.0}, thresholds={"柱子": 0.4})
+        self.assertEqual(tuned[0], KeywordEntry("zh ù z i", "柱子", 2.0, 0.4))
+        self.assertEqual(tuned[1], entries[1])
+        self.assertIsNone(entries[0].threshold)  # 原列表不变
+        self.assertEqual(keywords_arg(tuned), "zh ù z i :2 #0.4 @柱子/zh ū z i #0.3 @朱子")
+        with self.assertRaises(KeyError):
+            with_overrides(entries, thresholds={"小猪": 0.5})
+
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "keywords.txt")
+            write_keywords(tuned, path)
+            self.assertEqual(load_keywords(path), tuned)
+
+    def test_repo_keywords_file_parses(self):
+        entries = load_keywords(os.path.join(os.path.dirname(__file__), "..", "keywords", "keywords.txt"))
+        self.assertIn("小柱同学", [e.phrase for e in entries])
+        self.assertTrue(all(e.tokens for e in entries))
+
+
+if __name__ == "__main__":
+    unittest.main()
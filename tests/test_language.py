@@ -0,0 +1,37 @@
+import unittest
+from unittest import mock
+
+from src.core import language
+from src.core.language import detect_language, detect_script_language
+
+
+class TestDetectLanguage(unittest.TestCase):
+    def test_script_heuristics(self):
+        self.assertEqual(detect_script_language("小兔子为什么爱吃胡萝卜"), "zh")
+        self.assertEqual(detect_script_language("我想听 Peppa Pig 的故事"), "zh")
+        self.assertEqual(detect_script_language("tell me a story"), "en")
+        self.assertEqual(detect_script_language("おはよう"), "ja")
+        # 日文汉字夹假名仍判为日文
+        self.assertEqual(detect_script_language("今日は雨です"), "ja")
+        self.assertEqual(detect_script_language("안녕하세요"), "ko")
+
+    def test_undecidable_text(self):
+        for text in ("", "   ", "123", "？！"):
+            self.assertIsNone(detect_script_language(text), repr(text))
+
+    def test_hint_wins_and_skips_langid(self):
+        with mock.patch.object(language, "classify_with_langid") as classify:
+            self.assertEqual(detect_language("hello", hint="zh"), "zh")
+            self.assertEqual(detect_language("你好"), "zh")
+            classify.assert_not_called()
+
+    def test_falls_back_to_langid(self):
+        with mock.patch.object(language, "classify_with_langid", return_value="fr") as classify:
+            self.assertEqual(detect_language("123"), "fr")
+            # 空标签视为没有提示
+            self.assertEqual(detect_language("123", hint=""), "fr")
+        self.assertEqual(classify.call_count, 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
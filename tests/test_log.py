@@ -0,0 +1,89 @@
+import logging
+import os
+import queue
+import tempfile
+import threading
+import unittest
+
+from src.utils.log import (
+    NonBlockingQueueHandler, RateLimitFilter, RealtimeLogger, logging_stats, setup_logging, shutdown_logging,
+)
+
+
+class TestNonBlockingLogging(unittest.TestCase):
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self._tmp.name, "doll.log")
+
+    def tearDown(self):
+        shutdown_logging()
+        self._tmp.cleanup()
+
+    def read_log(self):
+        shutdown_logging()  # 等 writer 线程写完
+        with open(self.path, encoding="utf-8") as f:
+            return f.read()
+
+    def test_records_from_threads_reach_file(self):
+        setup_logging(fmt="%(message)s", filename=self.path, rate_limit=0)
+        log = logging.getLogger("test.threads")
+        threads = [threading.Thread(target=log.info, args=("线程 %d", i)) for i in range(4)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        text = self.read_log()
+        self.assertEqual(sorted(line for line in text.splitlines() if line.startswith("线程")),
+                         [f"线程 {i}" for i in range(4)])
+
+    def test_rate_limit_per_call_site(self):
+        setup_logging(fmt="%(message)s", filename=self.path, rate_limit=60)
+        log = logging.getLogger("test.rate")
+        for _ in range(5):
+            log.info("溢出")
+        log.error("错误不限流")
+        log.error("错误不限流")
+        self.assertEqual(logging_stats()["suppressed"], 4)
+        text = self.read_log()
+        self.assertEqual(text.count("溢出"), 1)
+        self.assertEqual(text.count("错误不限流"), 2)
+
+    def test_rate_limit_reports_suppressed(self):
+        f = RateLimitFilter(interval=1.0)
+        records = [logging.LogRecord("x", logging.INFO, "a.py", 10, "m", None, None) for _ in range(3)]
+        for i, r in enumerate(records):
+            r.created = 100.0 + i * 0.1
+        late = logging.LogRecord("x", logging.INFO, "a.py", 10, "m", None, None)
+        late.created = 102.0
+        self.assertEqual([f.filter(r) for r in records], [True, False, False])
+        self.assertTrue(f.filter(late))
+        self.assertEqual(late.suppressed, 2)
+
+    def test_full_queue_drops_without_blocking(self):
+        handler = NonBlockingQueueHandler(queue.Queue(1))
+        log = logging.getLogger("test.full")
+        log.propagate = False
+        log.addHandler(handler)
+        try:
+            for i in range(3):
+                log.warning("块 %d", i)
+        finally:
+            log.removeHandler(handler)
+            log.propagate = True
+        self.assertEqual(handler.dropped, 2)
+        self.assertEqual(handler.queue.get_nowait().getMessage(), "块 0")
+
+    def test_realtime_logger_structured_and_disabled(self):
+        rt = RealtimeLogger("test.realtime")
+        self.assertFalse(rt.enabled)  # 未初始化前是空操作
+        setup_logging(fmt="%(message)s", filename=self.path, rate_limit=0)
+        self.assertTrue(rt.enabled)
+        rt.info("开始录音", chunks=3)
+        self.assertIn("开始录音 chunks=3", self.read_log())
+
+        setup_logging(fmt="%(message)s", filename=self.path, rate_limit=0, realtime=False)
+        self.assertFalse(rt.enabled)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,88 @@
+import unittest
+from unittest import mock
+
+from src.core import memory_budget
+from src.core.memory_budget import MemoryBudget, Unloadable
+
+MB = 1024 * 1024
+
+
+class FakeComponent(Unloadable):
+    """加载后占用 size_mb 的假组件，内存记在共享的 usage 里"""
+
+    def __init__(self, usage, size_mb):
+        self.usage = usage
+        self.size = size_mb * MB
+        self.loaded = False
+
+    def is_loaded(self):
+        return self.loaded
+
+    def load(self):
+        self.loaded = True
+        self.usage["Rss"] += self.size
+
+    def unload(self):
+        self.loaded = False
+        self.usage["Rss"] -= self.size
+
+
+class TestMemoryBudget(unittest.TestCase):
+    def setUp(self):
+        self.usage = {"Rss": 100 * MB}
+        patcher = mock.patch.object(memory_budget, "process_memory", lambda: self.usage)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.budget = MemoryBudget(max_rss_mb=400, min_idle=0)
+        self.llm = FakeComponent(self.usage, 200)
+        self.tts = FakeComponent(self.usage, 150)
+        self.budget.register("llm", self.llm)
+        self.budget.register("tts", self.tts)
+
+    def test_incomplete_component_fails_at_construction(self):
+        class NoUnload(Unloadable):
+            def is_loaded(self):
+                return False
+
+            def load(self):
+                pass
+
+        with self.assertRaises(TypeError):
+            NoUnload()
+
+    def test_lazy_load_and_lru_unload(self):
+        self.assertFalse(self.llm.is_loaded())
+        self.llm.ensure_loaded()
+        self.assertTrue(self.llm.is_loaded())
+
+        # 加载 TTS 后超出上限，最久未用的 LLM 被卸载
+        self.tts.ensure_loaded()
+        self.assertTrue(self.tts.is_loaded())
+        self.assertFalse(self.llm.is_loaded())
+
+        self.llm.ensure_loaded()
+        metrics = self.budget.metrics()
+        self.assertEqual(metrics["llm"]["loads"], 2)
+        self.assertEqual(metrics["llm"]["unloads"], 1)
+        self.assertFalse(metrics["tts"]["loaded"])
+
+    def test_recently_used_components_are_kept(self):
+        self.budget.min_idle = 60
+        self.llm.ensure_loaded()
+        self.tts.ensure_loaded()
+        # 同一轮对话里刚用过，宁可超出上限也不来回加载
+        self.assertTrue(self.llm.is_loaded())
+        self.assertEqual(self.budget.enforce(min_idle=0), 1)
+
+    def test_pinned_components_are_never_unloaded(self):
+        vad = FakeComponent(self.usage, 300)
+        vad.load()
+        self.budget.register("vad", vad, pinned=True)
+        self.llm.ensure_loaded()
+        self.budget.enforce()
+        self.assertTrue(vad.is_loaded())
+        self.assertFalse(self.llm.is_loaded())
+
+
+if __name__ == "__main__":
+    unittest.main()
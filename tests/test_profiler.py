@@ -0,0 +1,41 @@
+import tempfile
+import threading
+import unittest
+
+from src.utils.profiler import SamplingProfiler, thread_cpu_times
+
+
+def spin(stop):
+    x = 0
+    while not stop.is_set():
+        x += 1
+
+
+class TestSamplingProfiler(unittest.TestCase):
+    def test_collapsed_stacks_and_thread_cpu(self):
+        stop = threading.Event()
+        worker = threading.Thread(target=spin, args=(stop,), name="busy", daemon=True)
+        worker.start()
+        with tempfile.TemporaryDirectory() as out:
+            profiler = SamplingProfiler(out, interval=0.002)
+            self.assertTrue(profiler.start(0.3))
+            self.assertFalse(profiler.start(0.3))  # 同时只能有一次采样
+            result = profiler.join()
+            stop.set()
+
+            self.assertGreater(result.samples, 0)
+            with open(result.collapsed_path, encoding="utf-8") as f:
+                lines = f.read().splitlines()
+            busy = [line for line in lines if line.startswith("busy;")]
+            self.assertTrue(busy)
+            self.assertIn("spin (test_profiler.py:", busy[0])
+            self.assertTrue(all(line.rsplit(" ", 1)[1].isdigit() for line in lines))
+
+        if thread_cpu_times():  # 只有 Linux 有 /proc/self/task
+            busy_cpu = next(t for t in result.threads if t.name == "busy")
+            self.assertGreater(busy_cpu.cpu_percent, 10)
+            self.assertGreater(busy_cpu.samples, 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
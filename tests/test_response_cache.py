@@ -0,0 +1,98 @@
+import unittest
+from unittest import mock
+
+import numpy as np
+
+from src.core.response_cache import ResponseCache, normalize_prompt
+
+QUESTION = "为什么天上的星星晚上会一闪一闪地眨眼睛"
+
+
+class TestNormalizePrompt(unittest.TestCase):
+    def test_traditional_punctuation_particles_and_repeats(self):
+        self.assertEqual(normalize_prompt("講講講個故事吧！"), "讲个故事")
+        self.assertEqual(normalize_prompt("  你好呀，小柱？"), "你好呀小柱")
+        self.assertEqual(normalize_prompt("讲个故事讲个故事"), "讲个故事")
+
+    def test_arithmetic_and_reduplication_are_kept(self):
+        self.assertEqual(normalize_prompt("1+1等于几"), "1加1等于几")
+        self.assertEqual(normalize_prompt("3-5=?"), "3减5等于")
+        self.assertEqual(normalize_prompt("3×5等于几"), "3乘5等于几")
+        self.assertEqual(normalize_prompt("111加1"), "111加1")
+        self.assertEqual(normalize_prompt("谢谢"), "谢谢")
+        self.assertEqual(normalize_prompt("星星为什么会眨眼"), "星星为什么会眨眼")
+
+    def test_particle_only_text_is_kept(self):
+        self.assertEqual(normalize_prompt("啊"), "啊")
+        self.assertEqual(normalize_prompt("？！"), "")
+
+
+class TestResponseCache(unittest.TestCase):
+    def test_exact_and_near_duplicate_hit(self):
+        cache = ResponseCache(reuse_probability=1.0)
+        cache.put(QUESTION, "因为星光穿过了流动的空气。")
+        self.assertEqual(cache.get(QUESTION + "呀！"), "因为星光穿过了流动的空气。")
+        # ASR 把第二个“一”听成了“回”，simhash 汉明距离 3 以内
+        self.assertEqual(cache.get("为什么天上的星星晚上会一闪回闪地眨眼睛"), "因为星光穿过了流动的空气。")
+        self.assertIsNone(cache.get("天上为什么有彩虹"))
+        self.assertEqual((cache.hits, cache.misses), (2, 1))
+
+    def test_exact_only_without_simhash(self):
+        cache = ResponseCache(reuse_probability=1.0, max_distance=0)
+        cache.put(QUESTION, "答案")
+        self.assertIsNone(cache.get("为什么天上的星星晚上会一闪回闪地眨眼睛"))
+
+    def test_arithmetic_prompts_do_not_collide(self):
+        cache = ResponseCache(reuse_probability=1.0)
+        cache.put("3+5等于几？", "3加5等于8。")
+        for prompt in ("3-5等于几", "35等于几", "3×5等于几", "3+6等于几", "4+5等于几", "三加五等于几"):
+            self.assertIsNone(cache.get(prompt), prompt)
+        self.assertEqual(cache.get("3加5等于几呀"), "3加5等于8。")
+        cache.put("1+1等于几", "等于2。")
+        self.assertIsNone(cache.get("1等于几"))
+        self.assertIsNone(cache.get("11等于几"))
+
+    def test_lru_eviction(self):
+        cache = ResponseCache(reuse_probability=1.0, max_entries=2, max_distance=0)
+        cache.put("小猫怎么叫", "喵喵")
+        cache.put("小狗怎么叫", "汪汪")
+        cache.get("小猫怎么叫")  # 最近用过的不淘汰
+        cache.put("小鸭怎么叫", "嘎嘎")
+        self.assertIsNone(cache.get("小狗怎么叫"))
+        self.assertEqual(cache.get("小猫怎么叫"), "喵喵")
+        self.assertEqual(cache.get("小鸭怎么叫"), "嘎嘎")
+
+    def test_max_serves_ttl_and_reuse_probability(self):
+        cache = ResponseCache(reuse_probability=1.0, max_serves=2, max_distance=0)
+        cache.put("一加一等于几", "等于二。")
+        self.assertEqual(cache.get("一加一等于几"), "等于二。")
+        self.assertEqual(cache.get("一加一等于几"), "等于二。")
+        self.assertIsNone(cache.get("一加一等于几"))
+
+        cache.put("一加一等于几", "等于二。")
+        with mock.patch("src.core.response_cache.time.time", return_value=1e12):
+            self.assertIsNone(cache.get("一加一等于几"))
+
+        cache = ResponseCache(reuse_probability=0.0, max_distance=0)
+        cache.put("一加一等于几", "等于二。")
+        self.assertIsNone(cache.get("一加一等于几"))
+
+    def test_audio_evicted_by_total_seconds(self):
+        cache = ResponseCache(max_audio_seconds=2.0)
+        second = np.zeros(16000, dtype=np.float32)
+        cache.put_audio("第一句。", second, 16000)
+        cache.put_audio("第二句。", second, 16000)
+        cache.get_audio("第一句。")
+        cache.put_audio("第三句。", second, 16000)
+        self.assertIsNone(cache.get_audio("第二句。"))
+        self.assertIsNotNone(cache.get_audio("第一句。"))
+        cache.put_audio("太长了。", np.zeros(16000 * 3, dtype=np.float32), 16000)
+        self.assertIsNone(cache.get_audio("太长了。"))
+
+    def test_stream_replays_sentences(self):
+        cache = ResponseCache()
+        self.assertEqual(list(cache.stream("你好！我是小柱。")), ["你好！", "我是小柱。"])
+
+
+if __name__ == "__main__":
+    unittest.main()
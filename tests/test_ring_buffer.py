@@ -0,0 +1,63 @@
+import unittest
+import numpy as np
+from src.core.ring_buffer import AudioRingBuffer, SharedAudioRing
+
+
+class TestAudioRingBuffer(unittest.TestCase):
+    def setUp(self):
+        self.ring = AudioRingBuffer(8)
+
+    def test_wraparound(self):
+        out = np.empty(4, dtype=np.float32)
+        self.assertEqual(self.ring.write(np.arange(6, dtype=np.float32)), 6)
+        self.assertEqual(self.ring.read_into(out), 4)
+        np.testing.assert_array_equal(out, [0, 1, 2, 3])
+
+        # 写入跨过缓冲区末尾
+        self.assertEqual(self.ring.write(np.arange(6, 12, dtype=np.float32)), 6)
+        out = np.empty(8, dtype=np.float32)
+        self.assertEqual(self.ring.read_into(out), 8)
+        np.testing.assert_array_equal(out, np.arange(4, 12))
+
+    def test_overrun_drops_and_counts(self):
+        self.assertEqual(self.ring.write(np.ones(10, dtype=np.float32)), 8)
+        self.assertEqual(self.ring.overruns, 2)
+        self.assertEqual(self.ring.free(), 0)
+
+    def test_underrun_only_while_active(self):
+        out = np.full(4, 7, dtype=np.float32)
+        self.ring.write(np.ones(2, dtype=np.float32))
+        self.assertEqual(self.ring.read_into(out), 2)
+        np.testing.assert_array_equal(out, [1, 1, 0, 0])
+        self.assertEqual(self.ring.underruns, 1)
+
+        self.ring.end()
+        self.ring.read_into(out)
+        self.assertEqual(self.ring.underruns, 1)
+
+    def test_clear_is_applied_by_consumer(self):
+        out = np.empty(4, dtype=np.float32)
+        self.ring.write(np.ones(4, dtype=np.float32))
+        self.ring.clear()
+        self.assertEqual(self.ring.read_into(out), 0)
+        self.assertEqual(self.ring.available(), 0)
+
+
+class TestSharedAudioRing(unittest.TestCase):
+    def test_attached_ring_shares_data_and_counters(self):
+        producer = SharedAudioRing(8)
+        consumer = SharedAudioRing(8, name=producer.name)
+        try:
+            producer.write(np.arange(10, dtype=np.float32))
+            out = np.empty(8, dtype=np.float32)
+            self.assertEqual(consumer.read_into(out), 8)
+            np.testing.assert_array_equal(out, np.arange(8))
+            self.assertEqual(consumer.overruns, 2)
+            self.assertEqual(producer.available(), 0)
+        finally:
+            consumer.close()
+            producer.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,102 @@
+import unittest
+from dataclasses import dataclass
+
+import numpy as np
+
+from tests.test_decoding import FakeLLM, tiny_model, torch
+
+if torch is not None:
+    from src.server.sessions import Engines, SessionScheduler
+
+
+@dataclass
+class FakeResult:
+    text: str
+    lang: str = "zh"
+    emotion: str = "NEUTRAL"
+
+    def rejection_reason(self, min_confidence):
+        return None if self.text else "empty"
+
+
+class FakeSTT:
+    def __init__(self, text):
+        self.text = text
+
+    def transcribe(self, sample_rate, audio):
+        return FakeResult(self.text)
+
+
+class FakeTTS:
+    def __init__(self):
+        self.sentences = []
+
+    def render(self, text):
+        self.sentences.append(text)
+        return np.ones(160, dtype=np.float32), 16000
+
+
+def drain(session, timeout=30.0):
+    messages = []
+    while True:
+        message = session.outputs.get(timeout=timeout)
+        messages.append(message)
+        if message["type"] in ("done", "error"):
+            return messages
+
+
+@unittest.skipIf(torch is None, "需要 torch 和 transformers")
+class TestSessionScheduler(unittest.TestCase):
+    def make(self, heard="小兔子"):
+        self.tts = FakeTTS()
+        return SessionScheduler(Engines(FakeSTT(heard), FakeLLM(tiny_model()), self.tts), max_batch=2)
+
+    def test_text_turn_streams_and_speaks(self):
+        scheduler = self.make()
+        session = scheduler.create_session()
+        scheduler.submit_text(session, "讲个故事")
+        messages = drain(session)
+        reply = "".join(m["text"] for m in messages if m["type"] == "delta")
+        self.assertEqual(messages[-1], {"type": "done", "text": reply})
+        self.assertEqual("".join(self.tts.sentences), reply)
+        self.assertEqual(session.turns, 1)
+
+    def test_chat_without_speech(self):
+        scheduler = self.make()
+        session = scheduler.create_session()
+        scheduler.submit_text(session, "讲个故事", speak=False)
+        messages = drain(session)
+        self.assertNotIn("audio", [m["type"] for m in messages])
+        self.assertEqual(self.tts.sentences, [])
+
+    def test_audio_transcribe_only_and_rejection(self):
+        scheduler = self.make()
+        session = scheduler.create_session()
+        scheduler.submit_audio(session, np.zeros(1600, np.float32), 16000, reply=False)
+        done = drain(session)[-1]
+        self.assertEqual((done["text"], done["lang"], done["rejected"]), ("小兔子", "zh", None))
+
+        scheduler.engines.stt.text = ""
+        scheduler.submit_audio(session, np.zeros(1600, np.float32), 16000)
+        self.assertEqual(drain(session)[-1]["rejected"], "empty")
+
+    def test_speech_only(self):
+        scheduler = self.make()
+        session = scheduler.create_session()
+        scheduler.submit_speech(session, "你好。晚安。")
+        messages = drain(session)
+        self.assertEqual([m["text"] for m in messages if m["type"] == "audio"], self.tts.sentences)
+        self.assertEqual(messages[-1]["text"], "你好。晚安。")
+
+    def test_concurrent_sessions_share_batch(self):
+        scheduler = self.make()
+        sessions = [scheduler.create_session() for _ in range(2)]
+        for session in sessions:
+            scheduler.submit_text(session, "天上为什么有彩虹", speak=False)
+        for session in sessions:
+            self.assertEqual(drain(session)[-1]["type"], "done")
+        self.assertEqual(scheduler.stats()["completed_turns"], 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,83 @@
+import threading
+import unittest
+from src.core.share_state import AssistantState, State
+
+
+class TestState(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        State.start_dispatcher()
+
+    def setUp(self):
+        State.wait_idle()
+        State.reset()
+        self.transitions = []
+        State.subscribe(self.transitions.append)
+
+    def tearDown(self):
+        State.unsubscribe(self.transitions.append)
+
+    def test_explicit_transitions(self):
+        self.assertTrue(State.transition(AssistantState.LISTENING))
+        self.assertTrue(State.transition(AssistantState.THINKING))
+        self.assertEqual(State.current(), AssistantState.THINKING)
+        # LISTENING 不能直接回到 WAKE
+        State.transition(AssistantState.LISTENING)
+        self.assertFalse(State.transition(AssistantState.WAKE))
+        self.assertEqual(State.current(), AssistantState.LISTENING)
+
+    def test_listen_flag_drives_speaking(self):
+        State.transition(AssistantState.THINKING)
+        State.pause_listening()
+        self.assertFalse(State.listening())
+        self.assertTrue(State.wait_idle())
+        self.assertEqual(State.current(), AssistantState.SPEAKING)
+
+        State.resume_listening()
+        self.assertTrue(State.listening())
+        self.assertTrue(State.wait_idle())
+        self.assertEqual(State.current(), AssistantState.THINKING)
+
+    def test_stale_listen_change_is_dropped(self):
+        # 先卡住分发线程，让播放开始的事件排在后面的显式切换之后才被处理
+        release = threading.Event()
+        blocked = threading.Event()
+
+        def block(transition):
+            if not blocked.is_set():
+                blocked.set()
+                release.wait(5)
+
+        State.subscribe(block)
+        try:
+            State.transition(AssistantState.THINKING)
+            self.assertTrue(blocked.wait(5))
+            State.pause_listening()
+            State.transition(AssistantState.LISTENING)
+            release.set()
+            self.assertTrue(State.wait_idle())
+            self.assertEqual(State.current(), AssistantState.LISTENING)
+
+            State.resume_listening()
+            self.assertTrue(State.wait_idle())
+            self.assertEqual(State.current(), AssistantState.LISTENING)
+        finally:
+            release.set()
+            State.unsubscribe(block)
+
+    def test_subscribers_and_durations(self):
+        State.transition(AssistantState.LISTENING)
+        State.transition(AssistantState.THINKING)
+        self.assertTrue(State.wait_idle())
+        self.assertEqual(
+            [(t.old, t.new) for t in self.transitions],
+            [(AssistantState.IDLE, AssistantState.LISTENING),
+             (AssistantState.LISTENING, AssistantState.THINKING)],
+        )
+        durations = State.time_in_states()
+        self.assertGreaterEqual(durations[AssistantState.LISTENING], 0.0)
+        self.assertIn(AssistantState.THINKING, durations)
+
+
+if __name__ == '__main__':
+    unittest.main()
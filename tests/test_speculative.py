@@ -0,0 +1,122 @@
+import threading
+import unittest
+
+from tests.test_decoding import FakeLLM, tiny_model, torch
+
+if torch is not None:
+    from transformers import LlamaForCausalLM
+
+    from src.core.decoding import sample_tokens
+    from src.core.speculative import DraftModelDrafter, PromptLookupDrafter, SpeculativeDecoder
+
+PROMPT = [5, 9, 17, 5, 9]
+
+
+def greedy_reference(llm, prompt, max_new_tokens):
+    """不带 cache 逐 token 生成，作为推测解码输出的基准"""
+    cfg = llm.config
+    generated = []
+    with torch.no_grad():
+        while len(generated) < max_new_tokens:
+            logits = llm.model(torch.tensor([prompt + generated])).logits[0, -1]
+            token = int(sample_tokens(logits.unsqueeze(0), [prompt + generated], cfg.temperature, cfg.top_p,
+                                      cfg.repetition_penalty)[0])
+            if token == llm.tokenizer.eos_token_id:
+                break
+            generated.append(token)
+    return generated
+
+
+class OracleDrafter:
+    """总是给出基准输出里接下来的 token：草稿应当全部被接受"""
+
+    def __init__(self, reference, prompt_len, num_draft=4):
+        self.reference = reference
+        self.prompt_len = prompt_len
+        self.num_draft = num_draft
+
+    def propose(self, ids):
+        done = len(ids) - self.prompt_len
+        return self.reference[done:done + self.num_draft]
+
+
+class WrongDrafter:
+    """草稿总与主模型不一致：每轮都回退到主模型采样的那一个 token"""
+
+    def __init__(self, reference, prompt_len, num_draft=3):
+        self.reference = reference
+        self.prompt_len = prompt_len
+        self.num_draft = num_draft
+
+    def propose(self, ids):
+        done = len(ids) - self.prompt_len
+        expected = self.reference[done] if done < len(self.reference) else 0
+        # 与正确 token 总是不同
+        return [expected % 62 + 1] * self.num_draft
+
+
+@unittest.skipIf(torch is None, "需要 torch 和 transformers")
+class TestSpeculativeDecoder(unittest.TestCase):
+    def setUp(self):
+        self.llm = FakeLLM(tiny_model(), max_new_tokens=10)
+        # 随机模型可能很早就采到 eos，这里不设 eos，每次都生成满 max_new_tokens
+        self.llm.tokenizer.eos_token_id = -1
+        self.reference = greedy_reference(self.llm, PROMPT, 10)
+        self.expected = self.llm.tokenizer.decode(self.reference)
+
+    def decode(self, drafter):
+        decoder = SpeculativeDecoder(self.llm, drafter)
+        text = "".join(decoder.stream(torch.tensor([PROMPT])))
+        return text, decoder.last_turn
+
+    def test_oracle_drafts_are_accepted(self):
+        text, stats = self.decode(OracleDrafter(self.reference, len(PROMPT)))
+        self.assertEqual(text, self.expected)
+        self.assertEqual(stats.tokens, len(self.reference))
+        self.assertEqual(len(self.reference), 10)
+        self.assertGreater(stats.drafted, 0)
+        self.assertEqual(stats.accepted, stats.drafted)
+        # 第一轮不带草稿测基准耗时，之后每轮接受多个 token
+        self.assertLess(stats.verify_passes, len(self.reference))
+
+    def test_rejected_drafts_fall_back_to_target(self):
+        text, stats = self.decode(WrongDrafter(self.reference, len(PROMPT)))
+        self.assertEqual(text, self.expected)
+        self.assertGreater(stats.drafted, 0)
+        self.assertEqual(stats.accepted, 0)
+        self.assertEqual(stats.report()["acceptance_rate"], 0.0)
+
+    def test_mismatched_draft_model_keeps_target_output(self):
+        torch.manual_seed(1)
+        draft = LlamaForCausalLM(self.llm.model.config).double().eval()
+        text, stats = self.decode(DraftModelDrafter(draft, num_draft=3))
+        self.assertEqual(text, self.expected)
+        self.assertLessEqual(stats.accepted, stats.drafted)
+
+    def test_stop_event_ends_stream(self):
+        stop = threading.Event()
+        decoder = SpeculativeDecoder(self.llm, OracleDrafter(self.reference, len(PROMPT)))
+        stream = decoder.stream(torch.tensor([PROMPT]), stop=stop)
+        first = next(stream)
+        stop.set()
+        self.assertEqual(first + "".join(stream), self.llm.tokenizer.decode(self.reference[:1]))
+
+    def test_prompt_lookup_keeps_target_output(self):
+        text, _ = self.decode(PromptLookupDrafter(num_draft=3))
+        self.assertEqual(text, self.expected)
+
+
+@unittest.skipIf(torch is None, "需要 torch")
+class TestPromptLookupDrafter(unittest.TestCase):
+    def test_longest_recent_match(self):
+        drafter = PromptLookupDrafter(num_draft=2, max_ngram=2)
+        # 末尾 [3, 4] 最近一次出现在下标 4，后面跟着 8, 9
+        self.assertEqual(drafter.propose([3, 4, 5, 6, 3, 4, 8, 9, 3, 4]), [8, 9])
+        # 只有 1-gram 能匹配
+        self.assertEqual(drafter.propose([7, 1, 2, 7]), [1, 2])
+        self.assertEqual(drafter.propose([1, 2, 3]), [])
+        self.assertEqual(drafter.propose([1]), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,205 @@
+import threading
+import unittest
+from types import SimpleNamespace
+
+import numpy as np
+
+from src.core.generation import GenerationLimits
+
+try:
+    import torch
+
+    from src.core.story import StoryConfig, StoryTeller, is_story_request
+except ImportError:
+    torch = None
+
+try:
+    from src.core.ring_buffer import AudioRingBuffer
+    from src.core.tts import AudioPlayer, TextToSpeech
+except ImportError:  # 需要 soundfile 和 sounddevice
+    AudioPlayer = None
+
+RATE = 1000
+SENTENCE_SECONDS = 0.6
+STORY = "小兔去河边。它看见小鱼。小鱼吐泡泡。太阳下山了。小兔回家。妈妈在等它。"
+
+
+class FakeTokenizer:
+    """一个字一个 token，0 为 eos"""
+    eos_token_id = 0
+
+    def __init__(self, vocab):
+        self.vocab = ["<eos>"] + sorted(set(vocab))
+        self.ids = {ch: i for i, ch in enumerate(self.vocab)}
+
+    def __call__(self, text, return_tensors=None):
+        return SimpleNamespace(input_ids=torch.tensor([[self.ids.get(ch, 1) for ch in text]]))
+
+    def decode(self, tokens, skip_special_tokens=True):
+        return "".join(self.vocab[t] for t in tokens if t)
+
+
+class ScriptedModel:
+    """每次前向按剧本给出下一个 token 的 one-hot logits，cache 只记长度"""
+
+    def __init__(self, tokenizer, script):
+        self.size = len(tokenizer.vocab)
+        self.tokens = iter([tokenizer.ids[ch] for ch in script])
+
+    def __call__(self, ids, past_key_values=None, use_cache=True):
+        logits = torch.zeros(1, ids.shape[1], self.size)
+        logits[0, -1, next(self.tokens, 0)] = 1.0
+        return SimpleNamespace(logits=logits, past_key_values=(past_key_values or 0) + ids.shape[1])
+
+
+class FakeLLM:
+    def __init__(self, script):
+        self.tokenizer = FakeTokenizer(script)
+        self.model = ScriptedModel(self.tokenizer, script)
+        self.config = SimpleNamespace(device="cpu", temperature=0.0, top_p=1.0, repetition_penalty=1.0,
+                                      limits=GenerationLimits(chars_per_second=100.0))
+        self._prefix_ids = None
+
+    def ensure_loaded(self):
+        pass
+
+    def _prepare_input(self, prompt, messages=None):
+        return prompt
+
+    def _prefix_cache_kwargs(self, ids):
+        return {}
+
+
+class FakeBuffer:
+    def __init__(self, player):
+        self.player = player
+        self.underruns = 0
+        self.ended = False
+
+    def write_blocking(self, samples, stop=None):
+        self.player.levels_at_write.append(self.player.level)
+        self.player.level += len(samples) / RATE
+        self.player.peak = max(self.player.peak, self.player.level)
+
+    def end(self):
+        self.ended = True
+
+
+class FakePlayer:
+    """每查询一次缓冲量就当作播放掉 0.25 秒"""
+
+    def __init__(self):
+        self.level = 0.0
+        self.peak = 0.0
+        self.levels_at_write = []
+        self.killed = False
+        self.stopped = False
+        self.event = threading.Event()
+        self.buffer = FakeBuffer(self)
+
+    def buffered_seconds(self):
+        level = self.level
+        self.level = max(0.0, self.level - 0.25)
+        return level
+
+    def start(self, rate):
+        pass
+
+    def reset(self):
+        self.killed = False
+
+    def stop(self):
+        self.stopped = True
+
+    def wait_drained(self):
+        self.level = 0.0
+
+
+class FakeTTS:
+    def __init__(self, on_render=None):
+        self.player = FakePlayer()
+        self.sentences = []
+        self.on_render = on_render
+
+    def render(self, sentence):
+        self.sentences.append(sentence)
+        if self.on_render is not None:
+            self.on_render()
+        return np.zeros(int(SENTENCE_SECONDS * RATE), dtype=np.float32), RATE
+
+
+@unittest.skipIf(torch is None, "需要 torch")
+class TestStoryTeller(unittest.TestCase):
+    def tell(self, script, tts=None, **config):
+        self.tts = tts or FakeTTS()
+        self.teller = StoryTeller(FakeLLM(script), self.tts, StoryConfig(**config))
+        story = self.teller.tell("讲个故事")
+        return story, self.teller.last_stats
+
+    def test_story_request(self):
+        self.assertTrue(is_story_request("给我讲一个小兔子的故事"))
+        self.assertFalse(is_story_request("小兔子吃什么"))
+
+    def test_pauses_at_ahead_and_resumes_below_resume(self):
+        story, stats = self.tell(STORY, ahead_seconds=1.0, resume_seconds=0.5)
+        self.assertEqual(story, STORY)
+        self.assertEqual(stats.stop_reason, "end")
+        self.assertEqual(stats.sentences, 6)
+        self.assertEqual(self.tts.sentences, [s + "。" for s in STORY.split("。") if s])
+        self.assertGreater(stats.paused_seconds, 0.0)
+        # 每段开始合成时缓冲都已降到 resume_seconds 以下，整段写完也不超过预算加一段
+        chunk_starts = self.tts.player.levels_at_write[::2]
+        self.assertTrue(all(level <= 0.5 for level in chunk_starts[1:]), chunk_starts)
+        self.assertLessEqual(self.tts.player.peak, 1.0 + 2 * SENTENCE_SECONDS)
+        self.assertTrue(self.tts.player.buffer.ended)
+
+    def test_interrupt_stops_story(self):
+        tts = FakeTTS(on_render=lambda: self.teller.interrupt())
+        story, stats = self.tell(STORY * 4, tts=tts)
+        self.assertEqual(stats.stop_reason, "interrupted")
+        self.assertEqual(stats.chunks, 1)
+        self.assertEqual(tts.sentences, ["小兔去河边。"])
+        self.assertTrue(tts.player.stopped)
+        self.assertFalse(tts.player.buffer.ended)
+
+    def test_repeated_sentence_stops_story(self):
+        story, stats = self.tell("小兔子去河边。小兔子去河边。它看见小鱼。")
+        self.assertEqual(stats.stop_reason, "repetition")
+        self.assertEqual(self.tts.sentences, ["小兔子去河边。"])
+
+
+class FakeAudioIO:
+    """代替音频子进程：播放环就是进程内的环形缓冲区"""
+
+    def __init__(self):
+        self.playback = AudioRingBuffer(10 * RATE)
+        self.output_latency = 0.0
+
+    def set_output_rate(self, rate):
+        pass
+
+
+@unittest.skipIf(torch is None or AudioPlayer is None, "需要 torch、soundfile 和 sounddevice")
+class TestPlaybackAfterInterrupt(unittest.TestCase):
+    def test_play_after_interrupted_story(self):
+        tts = FakeTTS(on_render=lambda: teller.interrupt())
+        tts.player = AudioPlayer(track_listening=False, io=FakeAudioIO())
+        teller = StoryTeller(FakeLLM(STORY * 4), tts, StoryConfig())
+        teller.tell("讲个故事")
+        self.assertEqual(teller.last_stats.stop_reason, "interrupted")
+        self.assertFalse(tts.player.killed)
+
+        # 唤醒应答等普通播放不能被上一次打断留下的状态吞掉
+        speaker = TextToSpeech.__new__(TextToSpeech)
+        speaker.player = tts.player
+        samples = np.ones(RATE // 2, dtype=np.float32)
+        speaker.play(samples, RATE, blocking=False)
+        self.assertEqual(tts.player.buffer.available(), len(samples))
+
+        tts.player.stop()
+        speaker.play(samples, RATE, blocking=False)
+        self.assertEqual(tts.player.buffer.available(), len(samples))
+
+
+if __name__ == "__main__":
+    unittest.main()
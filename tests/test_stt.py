@@ -0,0 +1,46 @@
+import unittest
+from types import SimpleNamespace
+
+try:
+    from src.core.stt import TranscriptionResult
+except ImportError:  # 需要 torch 和 sherpa_onnx
+    TranscriptionResult = None
+
+
+@unittest.skipIf(TranscriptionResult is None, "需要 torch 和 sherpa_onnx")
+class TestRejectionReason(unittest.TestCase):
+    def test_empty_and_filler(self):
+        self.assertEqual(TranscriptionResult(text="").rejection_reason(), "空转写")
+        self.assertEqual(TranscriptionResult(text="嗯啊。。").rejection_reason(), "只有语气词")
+        self.assertEqual(TranscriptionResult(text="？").rejection_reason(), "只有语气词")
+
+    def test_tags(self):
+        self.assertEqual(TranscriptionResult(text="小兔子", lang="nospeech").rejection_reason(), "识别器判定无语音")
+        self.assertEqual(TranscriptionResult(text="小兔子", event="BGM").rejection_reason(), "非语音事件: BGM")
+        self.assertIsNone(TranscriptionResult(text="小兔子", lang="zh", event="Speech").rejection_reason())
+
+    def test_none_confidence_is_not_rejected(self):
+        # SenseVoice 不给 token 概率，confidence 恒为 None，置信度门限不起作用
+        result = TranscriptionResult.from_sense_voice(
+            SimpleNamespace(text="<|zh|><|NEUTRAL|><|Speech|><|woitn|>讲个故事"), duration=1.0)
+        self.assertIsNone(result.confidence)
+        self.assertEqual((result.text, result.lang, result.emotion, result.event),
+                         ("讲个故事", "zh", "NEUTRAL", "Speech"))
+        self.assertIsNone(result.rejection_reason(min_confidence=0.9))
+
+    def test_low_confidence_and_rate(self):
+        low = TranscriptionResult(text="小兔子", confidence=0.2)
+        self.assertEqual(low.rejection_reason(min_confidence=0.3), "置信度过低: 0.20")
+        self.assertIsNone(low.rejection_reason(min_confidence=0.1))
+        fast = TranscriptionResult(text="小兔子为什么爱吃胡萝卜", duration=0.5)
+        self.assertTrue(fast.rejection_reason().startswith("字数与时长不符"))
+        self.assertIsNone(TranscriptionResult(text="小兔子", duration=0.0).rejection_reason())
+
+    def test_online_confidence(self):
+        result = TranscriptionResult.from_online(SimpleNamespace(text="你好", ys_probs=[0.0, 0.0]))
+        self.assertAlmostEqual(result.confidence, 1.0)
+        self.assertIsNone(TranscriptionResult.from_online(SimpleNamespace(text="你好")).confidence)
+
+
+if __name__ == "__main__":
+    unittest.main()
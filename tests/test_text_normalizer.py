@@ -0,0 +1,63 @@
+import unittest
+
+from src.utils.text_normalizer import TextNormalizer, int_to_chinese, number_to_chinese
+
+
+class TestNumbers(unittest.TestCase):
+    def test_int_to_chinese(self):
+        cases = {
+            0: "零", 10: "十", 15: "十五", 20: "二十", 105: "一百零五",
+            1001: "一千零一", 10010: "一万零一十", 120000: "十二万", 100000000: "一亿",
+        }
+        for n, expected in cases.items():
+            self.assertEqual(int_to_chinese(n), expected)
+
+    def test_number_to_chinese(self):
+        self.assertEqual(number_to_chinese("3.14"), "三点一四")
+        self.assertEqual(number_to_chinese("-5"), "负五")
+        self.assertEqual(number_to_chinese("007"), "零零七")
+        self.assertEqual(number_to_chinese("13800138000"), "一三八零零一三八零零零")
+
+
+class TestTextNormalizer(unittest.TestCase):
+    def setUp(self):
+        self.normalize = TextNormalizer()
+
+    def test_dates_times_and_units(self):
+        self.assertEqual(self.normalize("今天是2024-05-01，气温25℃。"), "今天是二零二四年五月一日，气温二十五摄氏度。")
+        self.assertEqual(self.normalize("2024年"), "二零二四年")
+        self.assertEqual(self.normalize("10:05出发"), "十点零五分出发")
+        self.assertEqual(self.normalize("跑了3.5km"), "跑了三点五公里")
+        self.assertEqual(self.normalize("打折50%"), "打折百分之五十")
+        self.assertEqual(self.normalize("3-5岁"), "三到五岁")
+        self.assertEqual(self.normalize("我有2个苹果"), "我有两个苹果")
+        self.assertEqual(self.normalize("1+1=2"), "一加一等于二")
+
+    def test_minus_range_and_liang_units(self):
+        self.assertEqual(self.normalize("5-3=2"), "五减三等于二")
+        self.assertEqual(self.normalize("10-2等于几"), "十减二等于几")
+        self.assertEqual(self.normalize("5 - 3"), "五减三")
+        self.assertEqual(self.normalize("1-2个"), "一到两个")
+        self.assertEqual(self.normalize("在2-3km外"), "在二到三公里外")
+        self.assertEqual(self.normalize("有2m高"), "有两米高")
+        self.assertEqual(self.normalize("我有2g"), "我有两克")
+        self.assertEqual(self.normalize("2℃"), "二摄氏度")
+        self.assertEqual(self.normalize("3g网络"), "三g网络")
+
+    def test_strips_markdown_and_emoji(self):
+        self.assertEqual(self.normalize("**小兔子**跑了🐰🐰"), "小兔子跑了")
+        self.assertEqual(self.normalize("[点这里](http://example.com)"), "点这里")
+        self.assertEqual(self.normalize("# 标题\n- 第一条"), "标题\n第一条")
+
+    def test_collapses_repeats(self):
+        self.assertEqual(self.normalize("哈哈哈哈哈"), "哈哈")
+        self.assertEqual(self.normalize("好的好的好的好的"), "好的好的")
+        self.assertEqual(self.normalize("你好你好"), "你好你好")
+
+    def test_latin(self):
+        self.assertEqual(self.normalize("我喜欢Apple"), "我喜欢Apple")
+        self.assertEqual(TextNormalizer(keep_latin=False)("我喜欢Apple"), "我喜欢")
+
+
+if __name__ == "__main__":
+    unittest.main()
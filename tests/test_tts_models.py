@@ -0,0 +1,71 @@
+import os
+import tempfile
+import unittest
+
+from src.core.tts_models import detect_tts_model, find_tts_models
+
+
+def make_model_dir(root, name, files, dirs=()):
+    model_dir = os.path.join(root, name)
+    os.makedirs(model_dir)
+    for f in files:
+        open(os.path.join(model_dir, f), "wb").close()
+    for d in dirs:
+        os.makedirs(os.path.join(model_dir, d))
+    return model_dir
+
+
+class TestDetectTtsModel(unittest.TestCase):
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.root = self._tmp.name
+
+    def tearDown(self):
+        self._tmp.cleanup()
+
+    def test_vits_with_ordered_rule_fsts(self):
+        model_dir = make_model_dir(self.root, "vits-icefall-zh-aishell3", [
+            "model.onnx", "tokens.txt", "lexicon.txt", "number.fst", "date.fst", "phone.fst",
+        ])
+        files = detect_tts_model(model_dir)
+        self.assertEqual(files.kind, "vits")
+        self.assertTrue(files.model.endswith("model.onnx"))
+        names = [os.path.basename(p) for p in files.rule_fsts.split(",")]
+        self.assertEqual(names, ["phone.fst", "date.fst", "number.fst"])
+
+    def test_kokoro_multi_lexicon(self):
+        model_dir = make_model_dir(self.root, "kokoro-multi-lang-v1_0", [
+            "model.onnx", "voices.bin", "tokens.txt", "lexicon-zh.txt", "lexicon-us-en.txt",
+        ], dirs=["espeak-ng-data", "dict"])
+        files = detect_tts_model(model_dir)
+        self.assertEqual(files.kind, "kokoro")
+        self.assertEqual(len(files.lexicon.split(",")), 2)
+        self.assertTrue(files.data_dir.endswith("espeak-ng-data"))
+        self.assertTrue(files.dict_dir.endswith("dict"))
+
+    def test_matcha_vocoder_in_parent(self):
+        open(os.path.join(self.root, "vocos-22khz-univ.onnx"), "wb").close()
+        model_dir = make_model_dir(self.root, "matcha-icefall-zh-baker", [
+            "model-steps-3.onnx", "tokens.txt", "lexicon.txt",
+        ])
+        files = detect_tts_model(model_dir)
+        self.assertEqual(files.kind, "matcha")
+        self.assertTrue(files.model.endswith("model-steps-3.onnx"))
+        self.assertTrue(files.vocoder.endswith("vocos-22khz-univ.onnx"))
+
+    def test_prefer_int8(self):
+        model_dir = make_model_dir(self.root, "vits-zh", ["model.onnx", "model.int8.onnx", "tokens.txt", "lexicon.txt"])
+        self.assertTrue(detect_tts_model(model_dir).model.endswith("model.onnx"))
+        self.assertTrue(detect_tts_model(model_dir, prefer_int8=True).model.endswith("model.int8.onnx"))
+
+    def test_find_skips_non_tts_dirs(self):
+        make_model_dir(self.root, "sherpa-onnx-sense-voice", ["model.onnx", "tokens.txt"])
+        make_model_dir(self.root, "vad_ckpt", ["silero_vad.onnx"])
+        make_model_dir(self.root, "vits-zh", ["model.onnx", "tokens.txt", "lexicon.txt"])
+        self.assertEqual([f.name for f in find_tts_models([self.root])], ["vits-zh"])
+        with self.assertRaises(FileNotFoundError):
+            detect_tts_model(os.path.join(self.root, "vad_ckpt"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,35 @@
+import json
+import os
+import tempfile
+import unittest
+
+import numpy as np
+
+from src.core.tts_render import RenderItem, _file_name, load_texts, to_pcm16
+
+
+class TestTtsRender(unittest.TestCase):
+    def test_load_jsonl_and_plain(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            jsonl = os.path.join(tmp, "story.jsonl")
+            with open(jsonl, "w", encoding="utf-8") as f:
+                f.write(json.dumps({"id": "rabbit/01", "text": "小兔子醒了。"}, ensure_ascii=False) + "\n\n")
+                f.write(json.dumps({"text": "它去找妈妈。"}, ensure_ascii=False) + "\n")
+            plain = os.path.join(tmp, "phrases.txt")
+            with open(plain, "w", encoding="utf-8") as f:
+                f.write("你好呀！\n\n晚安。\n")
+
+            self.assertEqual(load_texts(jsonl), [RenderItem("rabbit/01", "小兔子醒了。"), RenderItem("0001", "它去找妈妈。")])
+            self.assertEqual(load_texts(plain), [RenderItem("0000", "你好呀！"), RenderItem("0001", "晚安。")])
+
+    def test_file_name_is_flat(self):
+        self.assertEqual(_file_name("rabbit/01 intro", "flac"), "rabbit_01_intro.flac")
+
+    def test_pcm16_clips(self):
+        pcm = to_pcm16(np.array([-2.0, -1.0, 0.0, 0.5, 1.5], dtype=np.float32))
+        self.assertEqual(pcm.dtype, np.int16)
+        self.assertEqual(pcm.tolist(), [-32767, -32767, 0, 16383, 32767])
+
+
+if __name__ == "__main__":
+    unittest.main()
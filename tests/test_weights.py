@@ -0,0 +1,66 @@
+import os
+import json
+import struct
+import tempfile
+import unittest
+
+import numpy as np
+
+from src.core.weights import mmap_compatible, mmap_safetensors, weight_files
+from src.utils.memory import mapped_file_memory
+
+
+def _write_safetensors(path, tensors):
+    header, blobs, offset = {}, [], 0
+    for name, array in tensors.items():
+        data = array.tobytes()
+        dtype = {np.float32: "F32", np.float16: "F16"}[array.dtype.type]
+        header[name] = {"dtype": dtype, "shape": list(array.shape), "data_offsets": [offset, offset + len(data)]}
+        blobs.append(data)
+        offset += len(data)
+    header["__metadata__"] = {"format": "pt"}
+    raw = json.dumps(header).encode("utf-8")
+    with open(path, "wb") as f:
+        f.write(struct.pack("<Q", len(raw)) + raw + b"".join(blobs))
+
+
+class TestMmapSafetensors(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.dir.name, "model.safetensors")
+        self.tensors = {
+            "embed.weight": np.arange(12, dtype=np.float32).reshape(3, 4),
+            "norm.weight": np.ones(4, dtype=np.float32),
+        }
+        _write_safetensors(self.path, self.tensors)
+
+    def tearDown(self):
+        self.dir.cleanup()
+
+    def test_roundtrip(self):
+        loaded = mmap_safetensors(self.path)
+        self.assertEqual(set(loaded), set(self.tensors))
+        for name, (array, dtype) in loaded.items():
+            self.assertEqual(dtype, "F32")
+            np.testing.assert_array_equal(array, self.tensors[name])
+        self.assertEqual(weight_files(self.dir.name), [self.path])
+
+    def test_backed_by_file_mapping(self):
+        array, _ = mmap_safetensors(self.path)["embed.weight"]
+        array.sum()
+        # 数据来自文件映射而不是进程私有内存
+        self.assertGreater(mapped_file_memory([self.path])["Rss"], 0)
+
+    def test_mmap_only_for_float32_weights(self):
+        self.assertTrue(mmap_compatible(self.dir.name))
+        _write_safetensors(self.path, {
+            "embed.weight": np.zeros((3, 4), dtype=np.float16),
+            "norm.weight": np.ones(4, dtype=np.float32),
+        })
+        # F16 权重直接映射会改变推理精度，退回 from_pretrained
+        self.assertFalse(mmap_compatible(self.dir.name))
+        self.assertFalse(mmap_compatible(os.path.join(self.dir.name, "missing")))
+
+
+if __name__ == "__main__":
+    unittest.main()